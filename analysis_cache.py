@@ -0,0 +1,215 @@
+"""
+EDM Shuffle Analysis Cache
+
+On-disk cache of audio analysis results keyed by file content hash plus
+analyzer name and version, so rebuilding soundpack metadata only analyzes
+stems that are new or changed:
+- results live in SQLite as zlib-compressed JSON, one row per
+  (content_hash, analyzer, version)
+- a path index remembers each file's size and mtime with its content hash,
+  so unchanged files are not re-read just to hash them
+- bumping an analyzer's version (e.g. audio_analysis.ANALYZER_VERSION)
+  invalidates its old results; prune() drops them from disk
+
+Renaming or copying a stem keeps its cached results, since they follow the
+content rather than the path.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "audio_analysis.sqlite3")
+HASH_CHUNK_BYTES = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    content_hash TEXT NOT NULL,
+    analyzer TEXT NOT NULL,
+    version TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    result BLOB NOT NULL,
+    PRIMARY KEY (content_hash, analyzer, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """
+    Content-addressed store of analysis results.
+
+    Usage:
+        cache = AnalysisCache()
+        digest = cache.content_hash(path)
+        result = cache.get(digest, "audio_analysis", ANALYZER_VERSION)
+        if result is None:
+            result = analyze_file(path)
+            cache.put(digest, "audio_analysis", ANALYZER_VERSION, result)
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "AnalysisCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # =========================================================================
+    # CONTENT HASHES
+    # =========================================================================
+
+    def content_hash(self, path: str) -> str:
+        """
+        Content hash of a file, reusing the stored hash while size and mtime are unchanged.
+
+        Args:
+            path: File path
+
+        Returns:
+            Hex SHA-256 of the file contents
+        """
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (key,)
+            ).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = hash_file(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime_ns, digest),
+            )
+        return digest
+
+    # =========================================================================
+    # RESULTS
+    # =========================================================================
+
+    def get(self, content_hash: str, analyzer: str, version: str) -> Optional[Any]:
+        """Cached result for this content and analyzer version, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM results WHERE content_hash = ? AND analyzer = ? AND version = ?",
+                (content_hash, analyzer, version),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def get_many(self, content_hashes: Iterable[str], analyzer: str, version: str) -> Dict[str, Any]:
+        """Cached results for several hashes at once, keyed by hash (misses are omitted)."""
+        wanted = list(dict.fromkeys(content_hashes))
+        found: Dict[str, Any] = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(wanted), 500):
+            batch = wanted[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT content_hash, result FROM results WHERE analyzer = ? AND version = ? "
+                    f"AND content_hash IN ({placeholders})",
+                    (analyzer, version, *batch),
+                ).fetchall()
+            for content_hash, blob in rows:
+                found[content_hash] = json.loads(zlib.decompress(blob))
+        return found
+
+    def put(self, content_hash: str, analyzer: str, version: str, result: Any) -> None:
+        """Store a JSON-serializable result."""
+        blob = zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (content_hash, analyzer, version, created_at, result) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (content_hash, analyzer, version, time.time(), blob),
+            )
+
+    # =========================================================================
+    # MAINTENANCE
+    # =========================================================================
+
+    def prune(self, current_versions: Optional[Dict[str, str]] = None,
+              keep_hashes: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+        """
+        Drop stale entries.
+
+        Args:
+            current_versions: analyzer -> current version; results from other
+                versions of these analyzers are deleted
+            keep_hashes: If given, results for any other content are deleted too
+
+        Returns:
+            (results deleted, file index entries deleted)
+        """
+        results_deleted = 0
+        with self._lock, self._conn:
+            for analyzer, version in (current_versions or {}).items():
+                results_deleted += self._conn.execute(
+                    "DELETE FROM results WHERE analyzer = ? AND version != ?", (analyzer, version)
+                ).rowcount
+            if keep_hashes is not None:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (content_hash TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM keep")
+                self._conn.executemany("INSERT OR IGNORE INTO keep VALUES (?)", ((h,) for h in keep_hashes))
+                results_deleted += self._conn.execute(
+                    "DELETE FROM results WHERE content_hash NOT IN (SELECT content_hash FROM keep)"
+                ).rowcount
+            paths = [row[0] for row in self._conn.execute("SELECT path FROM files")]
+            gone = [(path,) for path in paths if not os.path.exists(path)]
+            self._conn.executemany("DELETE FROM files WHERE path = ?", gone)
+        if results_deleted or gone:
+            logger.info(f"🧹 Pruned {results_deleted} cached result(s) and {len(gone)} missing file(s)")
+        return results_deleted, len(gone)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts per analyzer version and the on-disk size."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT analyzer, version, COUNT(*), SUM(LENGTH(result)) FROM results GROUP BY analyzer, version"
+            ).fetchall()
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        return {
+            "analyzers": [
+                {"analyzer": analyzer, "version": version, "entries": count, "bytes": size or 0}
+                for analyzer, version, count, size in rows
+            ],
+            "indexed_files": files,
+            "db_bytes": os.path.getsize(self.path) if self.path != ":memory:" and os.path.exists(self.path) else 0,
+        }
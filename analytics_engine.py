@@ -0,0 +1,532 @@
+"""
+EDM Shuffle Analytics Engine
+
+Columnar analytics over Parquet exports of platform data, backing
+AnalyticsPipelineTool. Raw exports are read with DuckDB and folded into
+hourly and daily rollup tables kept in a local DuckDB file; reports query the
+rollups, so dashboards never rescan raw history.
+
+Export layout (one or more *.parquet files per directory, appended over time):
+- events/: analytics_events / user_activities rows
+  (user_id or userId, event or activity_type, created_at)
+- votes/:  festival_votes rows (user_id, dj_id or artist_id, created_at, vote_weight optional)
+- plays/:  audio play rows (user_id, track_id, created_at, play_duration_sec optional)
+
+Refreshes are incremental: only Parquet files not seen before are read, and
+their aggregates are added to the existing rollup rows. If an already
+ingested file changes or disappears, that source's rollups are rebuilt.
+Rollups keep user_id as a dimension so distinct-user counts stay exact over
+any window. Hour and day buckets are in UTC.
+
+The dashboard charts (engagement_trend, user_retention, feature_usage) are
+served from pre-aggregated cubes: one additive cell per (metric, grain,
+bucket, dimension). Cells are updated from each ingested events batch, so an
+N-day window is a sum over at most N cells per series and retention cohorts
+are never recomputed from raw activity.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import glob
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.path.join("data", "analytics")
+DEFAULT_DB_PATH = os.path.join(".cache", "analytics.duckdb")
+DEFAULT_TOP_N = 10
+
+# =============================================================================
+# ROLLUP DEFINITIONS
+# =============================================================================
+
+# Per export directory: rollup table prefix, dimensions (output column ->
+# candidate source columns, first present wins) and measures (output column
+# -> (expression, column the expression needs, fallback expression)).
+SOURCES: Dict[str, Dict[str, Any]] = {
+    "events": {
+        "rollup": "activity",
+        "dimensions": {"user_id": ["user_id", "userId"], "event": ["event", "activity_type"]},
+        "measures": {"events": ("count(*)", None, None)},
+    },
+    "votes": {
+        "rollup": "votes",
+        "dimensions": {"user_id": ["user_id", "userId"], "dj_id": ["dj_id", "artist_id"]},
+        "measures": {
+            "votes": ("count(*)", None, None),
+            "weight": ("sum(coalesce(vote_weight, 1))", "vote_weight", "count(*)"),
+        },
+    },
+    "plays": {
+        "rollup": "plays",
+        "dimensions": {"user_id": ["user_id", "userId"], "track_id": ["track_id"]},
+        "measures": {
+            "plays": ("count(*)", None, None),
+            "listen_sec": ("sum(coalesce(play_duration_sec, 0))", "play_duration_sec", "0"),
+        },
+    },
+}
+
+METRIC_SOURCES = {
+    "user_engagement": "events",
+    "festival_votes": "votes",
+    "audio_plays": "plays",
+}
+
+GRAINS = {"hourly": ("hour", "hour"), "daily": ("day", "day")}
+
+CUBE_CHARTS = ("engagement_trend", "user_retention", "feature_usage")
+# Bump when cube definitions change; existing events rollups are rebuilt
+CUBES_VERSION = "1"
+
+def parse_time_range(time_range: str, now: Optional[datetime] = None) -> Tuple[str, datetime]:
+    """
+    Rollup grain and window start for a range such as "24h", "7d" or "30d".
+
+    Hour ranges use the hourly rollup from the start of the hour N-1 hours
+    ago; day ranges use the daily rollup from UTC midnight N-1 days ago, so
+    the current hour or day is always included.
+
+    Raises:
+        ValueError: If the range is not <N>h or <N>d
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([hd])\s*", time_range or "")
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"Unsupported time_range '{time_range}'. Use e.g. 24h, 7d or 30d")
+    count, unit = int(match.group(1)), match.group(2)
+    now = now or datetime.now(timezone.utc)
+    if unit == "h":
+        start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=count - 1)
+        return "hourly", start
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=count - 1)
+    return "daily", start
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class AnalyticsEngine:
+    """
+    Incrementally maintained hourly/daily rollups over Parquet exports.
+    """
+
+    def __init__(self, data_dir: str = DEFAULT_DATA_DIR, db_path: str = DEFAULT_DB_PATH):
+        """
+        Args:
+            data_dir: Directory containing the events/, votes/ and plays/ exports
+            db_path: DuckDB file holding the rollups (":memory:" for none)
+
+        Raises:
+            ImportError: If the duckdb package is not installed
+        """
+        # Imported here so importing this module (e.g. via tools) stays light
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("AnalyticsEngine requires the duckdb package; install it with pip install duckdb") from e
+        self.data_dir = data_dir
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = duckdb.connect(db_path)
+        self.conn.execute("SET TimeZone = 'UTC'")
+        self._create_tables()
+
+    def __enter__(self) -> "AnalyticsEngine":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _create_tables(self) -> None:
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingested_files ("
+            "source VARCHAR, path VARCHAR, size BIGINT, mtime DOUBLE, PRIMARY KEY (source, path))"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS engine_meta (key VARCHAR PRIMARY KEY, value VARCHAR)")
+        # Cube cells: metric + grain + bucket + dimension value -> additive count.
+        # Metrics: events, active_users (dim ""), feature_events, feature_users
+        # (dim = event type) and retention (daily, bucket = cohort day, dim = day offset)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cubes ("
+            "metric VARCHAR, grain VARCHAR, bucket TIMESTAMP, dim VARCHAR, value DOUBLE NOT NULL, "
+            "PRIMARY KEY (metric, grain, bucket, dim))"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS user_first_seen (user_id VARCHAR PRIMARY KEY, first_day DATE NOT NULL)")
+        for spec in SOURCES.values():
+            dimensions = list(spec["dimensions"])
+            for grain, (column, _) in GRAINS.items():
+                column_type = "TIMESTAMP" if column == "hour" else "DATE"
+                measure_columns = ", ".join(
+                    f"{name} {'DOUBLE' if name == 'listen_sec' else 'BIGINT'} NOT NULL"
+                    for name in spec["measures"]
+                )
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {spec['rollup']}_{grain} ("
+                    f"{column} {column_type} NOT NULL, "
+                    + "".join(f"{dim} VARCHAR, " for dim in dimensions)
+                    + f"{measure_columns}, "
+                    f"PRIMARY KEY ({column}, {', '.join(dimensions)}))"
+                )
+
+    # -- ingestion -----------------------------------------------------------
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Fold new Parquet exports into the rollups.
+
+        Returns:
+            Number of files ingested per source
+        """
+        ingested = {}
+        version = self.conn.execute("SELECT value FROM engine_meta WHERE key = 'cubes_version'").fetchone()
+        if not version or version[0] != CUBES_VERSION:
+            # Cubes are built while events are ingested, so rebuild those rollups
+            self._reset("events")
+            self.conn.execute("INSERT OR REPLACE INTO engine_meta VALUES ('cubes_version', ?)", [CUBES_VERSION])
+        for source, spec in SOURCES.items():
+            files = sorted(glob.glob(os.path.join(self.data_dir, source, "*.parquet")))
+            stats = {path: (os.path.getsize(path), os.path.getmtime(path)) for path in files}
+            known = {
+                path: (size, mtime)
+                for path, size, mtime in self.conn.execute(
+                    "SELECT path, size, mtime FROM ingested_files WHERE source = ?", [source]
+                ).fetchall()
+            }
+            if any(stats.get(path) != signature for path, signature in known.items()):
+                logger.info(f"🔁 {source} exports changed; rebuilding {spec['rollup']} rollups")
+                self._reset(source)
+                known = {}
+            new_files = [path for path in files if path not in known]
+            if new_files:
+                self._ingest(source, new_files, stats)
+            ingested[source] = len(new_files)
+        return ingested
+
+    def _reset(self, source: str) -> None:
+        rollup = SOURCES[source]["rollup"]
+        self.conn.execute("BEGIN TRANSACTION")
+        try:
+            for grain in GRAINS:
+                self.conn.execute(f"DELETE FROM {rollup}_{grain}")
+            if source == "events":
+                self.conn.execute("DELETE FROM cubes")
+                self.conn.execute("DELETE FROM user_first_seen")
+            self.conn.execute("DELETE FROM ingested_files WHERE source = ?", [source])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _ingest(self, source: str, files: List[str], stats: Dict[str, Tuple[int, float]]) -> None:
+        spec = SOURCES[source]
+        columns = {
+            row[0] for row in self.conn.execute(
+                "DESCRIBE SELECT * FROM read_parquet(?, union_by_name = true)", [files]
+            ).fetchall()
+        }
+
+        select_dims = []
+        # Rows missing a dimension cannot be keyed in the rollups
+        required = ["created_at IS NOT NULL"]
+        for name, candidates in spec["dimensions"].items():
+            present = [column for column in candidates if column in columns]
+            if not present:
+                raise ValueError(f"{source} exports need one of the columns {candidates}")
+            select_dims.append(f'CAST("{present[0]}" AS VARCHAR) AS {name}')
+            required.append(f'"{present[0]}" IS NOT NULL')
+        if "created_at" not in columns:
+            raise ValueError(f"{source} exports need a created_at column")
+        select_measures = [
+            f"{expression if needs is None or needs in columns else fallback} AS {name}"
+            for name, (expression, needs, fallback) in spec["measures"].items()
+        ]
+        dimensions = list(spec["dimensions"])
+        measures = list(spec["measures"])
+
+        self.conn.execute("BEGIN TRANSACTION")
+        try:
+            # Aggregate the new files once at hourly grain, then fold that
+            # batch into both rollups
+            self.conn.execute(
+                "CREATE OR REPLACE TEMP TABLE rollup_batch AS "
+                "SELECT CAST(date_trunc('hour', CAST(created_at AS TIMESTAMPTZ)) AS TIMESTAMP) AS hour, "
+                f"{', '.join(select_dims)}, {', '.join(select_measures)} "
+                "FROM read_parquet(?, union_by_name = true) "
+                f"WHERE {' AND '.join(required)} GROUP BY ALL",
+                [files],
+            )
+            if source == "events":
+                # Must run before the rollups absorb the batch: distinct
+                # counts only grow by pairs the rollups have not seen yet
+                self._update_cubes()
+            for grain, (column, _) in GRAINS.items():
+                bucket = "hour" if column == "hour" else "CAST(hour AS DATE)"
+                updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in measures)
+                self.conn.execute(
+                    f"INSERT INTO {spec['rollup']}_{grain} "
+                    f"SELECT {bucket} AS {column}, {', '.join(dimensions)}, "
+                    f"{', '.join(f'sum({m}) AS {m}' for m in measures)} "
+                    f"FROM rollup_batch GROUP BY ALL "
+                    f"ON CONFLICT DO UPDATE SET {updates}"
+                )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?, ?)",
+                [[source, path, *stats[path]] for path in files],
+            )
+            self.conn.execute("DROP TABLE rollup_batch")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        logger.info(f"📊 Ingested {len(files)} {source} export(s) into {spec['rollup']} rollups")
+
+    # -- cubes ---------------------------------------------------------------
+
+    def _add_cells(self, select_sql: str) -> None:
+        """Add (metric, grain, bucket, dim, value) rows from a query to the cubes."""
+        self.conn.execute(
+            f"INSERT INTO cubes {select_sql} ON CONFLICT DO UPDATE SET value = value + excluded.value"
+        )
+
+    def _update_cubes(self) -> None:
+        """Fold the events batch in rollup_batch into the chart cubes."""
+        for grain, (column, _) in GRAINS.items():
+            bucket = "hour" if column == "hour" else "CAST(hour AS DATE)"
+            table = f"activity_{grain}"
+            self._add_cells(
+                f"SELECT 'events', '{grain}', CAST({bucket} AS TIMESTAMP), '', sum(events) "
+                "FROM rollup_batch GROUP BY ALL"
+            )
+            self._add_cells(
+                f"SELECT 'feature_events', '{grain}', CAST({bucket} AS TIMESTAMP), event, sum(events) "
+                "FROM rollup_batch GROUP BY ALL"
+            )
+            self._add_cells(
+                f"SELECT 'active_users', '{grain}', CAST(b.bucket AS TIMESTAMP), '', count(*) "
+                f"FROM (SELECT DISTINCT {bucket} AS bucket, user_id FROM rollup_batch) b "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {table} a WHERE a.{column} = b.bucket AND a.user_id = b.user_id) "
+                "GROUP BY ALL"
+            )
+            self._add_cells(
+                f"SELECT 'feature_users', '{grain}', CAST(b.bucket AS TIMESTAMP), b.event, count(*) "
+                f"FROM (SELECT DISTINCT {bucket} AS bucket, user_id, event FROM rollup_batch) b "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {table} a WHERE a.{column} = b.bucket "
+                "AND a.user_id = b.user_id AND a.event = b.event) "
+                "GROUP BY ALL"
+            )
+        self._update_retention()
+
+    def _update_retention(self) -> None:
+        """
+        Maintain retention cells: users of cohort (first active day) C active on day C + k.
+
+        Only the batch's new (user, day) pairs are added. Users whose first
+        day moves earlier (late data) have their previous cells moved to
+        the new cohort, so the cost is bounded by the batch plus those users.
+        """
+        self.conn.execute(
+            "CREATE OR REPLACE TEMP TABLE new_days AS "
+            "SELECT DISTINCT b.user_id, CAST(b.hour AS DATE) AS day FROM rollup_batch b "
+            "WHERE NOT EXISTS (SELECT 1 FROM activity_daily a "
+            "WHERE a.day = CAST(b.hour AS DATE) AND a.user_id = b.user_id)"
+        )
+        self.conn.execute(
+            "CREATE OR REPLACE TEMP TABLE moved AS "
+            "SELECT n.user_id, min(n.day) AS new_first, any_value(f.first_day) AS old_first "
+            "FROM new_days n LEFT JOIN user_first_seen f USING (user_id) GROUP BY n.user_id "
+            "HAVING any_value(f.first_day) IS NULL OR min(n.day) < any_value(f.first_day)"
+        )
+        existing_days = "(SELECT DISTINCT user_id, day FROM activity_daily)"
+        self._add_cells(
+            "SELECT 'retention', 'daily', CAST(m.old_first AS TIMESTAMP), "
+            "CAST(d.day - m.old_first AS VARCHAR), -count(*) "
+            f"FROM moved m JOIN {existing_days} d USING (user_id) "
+            "WHERE m.old_first IS NOT NULL GROUP BY ALL"
+        )
+        self._add_cells(
+            "SELECT 'retention', 'daily', CAST(m.new_first AS TIMESTAMP), "
+            "CAST(d.day - m.new_first AS VARCHAR), count(*) "
+            f"FROM moved m JOIN {existing_days} d USING (user_id) GROUP BY ALL"
+        )
+        self._add_cells(
+            "SELECT 'retention', 'daily', CAST(c.first_day AS TIMESTAMP), "
+            "CAST(n.day - c.first_day AS VARCHAR), count(*) "
+            "FROM new_days n JOIN ("
+            "SELECT user_id, new_first AS first_day FROM moved "
+            "UNION ALL SELECT f.user_id, f.first_day FROM user_first_seen f "
+            "WHERE NOT EXISTS (SELECT 1 FROM moved m WHERE m.user_id = f.user_id)"
+            ") c USING (user_id) GROUP BY ALL"
+        )
+        self.conn.execute(
+            "INSERT INTO user_first_seen SELECT user_id, new_first FROM moved "
+            "ON CONFLICT DO UPDATE SET first_day = excluded.first_day"
+        )
+        self.conn.execute("DROP TABLE new_days")
+        self.conn.execute("DROP TABLE moved")
+
+    # -- reports -------------------------------------------------------------
+
+    def _rows(self, sql: str, params: Sequence[Any]) -> List[Dict[str, Any]]:
+        cursor = self.conn.execute(sql, list(params))
+        names = [description[0] for description in cursor.description]
+        return [
+            {name: (value.isoformat() if hasattr(value, "isoformat") else value) for name, value in zip(names, row)}
+            for row in cursor.fetchall()
+        ]
+
+    def report(self, metric_type: str, time_range: str = "7d", top_n: int = DEFAULT_TOP_N,
+               now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Compute a metric over a time range from the rollups.
+
+        Args:
+            metric_type: user_engagement, festival_votes or audio_plays
+            time_range: "<N>h" or "<N>d"
+            top_n: Rows in the breakdown tables
+
+        Returns:
+            Report with summary totals, a per-bucket trend and a breakdown
+
+        Raises:
+            ValueError: If the metric or time range is not supported
+        """
+        if metric_type not in METRIC_SOURCES:
+            raise ValueError(f"Unknown metric_type '{metric_type}'. Use one of {list(METRIC_SOURCES)}")
+        grain, start = parse_time_range(time_range, now)
+        spec = SOURCES[METRIC_SOURCES[metric_type]]
+        table = f"{spec['rollup']}_{grain}"
+        bucket = GRAINS[grain][0]
+        # Buckets are stored as naive UTC timestamps / dates
+        window_start = start.replace(tzinfo=None) if grain == "hourly" else start.date()
+        breakdown_dim = [dim for dim in spec["dimensions"] if dim != "user_id"][0]
+        sums = ", ".join(f"sum({m}) AS {m}" for m in spec["measures"])
+        first_measure = list(spec["measures"])[0]
+
+        summary = self._rows(
+            f"SELECT {sums}, count(DISTINCT user_id) AS unique_users, "
+            f"count(DISTINCT {breakdown_dim}) AS unique_{breakdown_dim.replace('_id', '')}s "
+            f"FROM {table} WHERE {bucket} >= ?",
+            [window_start],
+        )[0]
+        trend = self._rows(
+            f"SELECT {bucket}, {sums}, count(DISTINCT user_id) AS unique_users "
+            f"FROM {table} WHERE {bucket} >= ? GROUP BY {bucket} ORDER BY {bucket}",
+            [window_start],
+        )
+        breakdown = self._rows(
+            f"SELECT {breakdown_dim}, {sums}, count(DISTINCT user_id) AS unique_users "
+            f"FROM {table} WHERE {bucket} >= ? GROUP BY {breakdown_dim} "
+            f"ORDER BY {first_measure} DESC, {breakdown_dim} LIMIT ?",
+            [window_start, top_n],
+        )
+
+        return {
+            "metric_type": metric_type,
+            "time_range": time_range,
+            "granularity": grain,
+            "window_start": window_start.isoformat(),
+            "data_points": len(trend),
+            "summary": {key: value if value is not None else 0 for key, value in summary.items()},
+            "trend": trend,
+            f"top_{breakdown_dim.replace('_id', '')}s": breakdown,
+        }
+
+    def chart(self, chart: str, time_range: str = "7d", now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Dashboard chart data for a time range, summed from the cubes.
+
+        Args:
+            chart: engagement_trend, user_retention or feature_usage
+            time_range: "<N>h" or "<N>d" (retention always uses daily cohorts)
+
+        Raises:
+            ValueError: If the chart or time range is not supported
+        """
+        if chart not in CUBE_CHARTS:
+            raise ValueError(f"Unknown chart '{chart}'. Use one of {list(CUBE_CHARTS)}")
+        grain, start = parse_time_range(time_range, now)
+        today = (now or datetime.now(timezone.utc)).date()
+        report: Dict[str, Any] = {"chart": chart, "time_range": time_range}
+
+        if chart == "user_retention":
+            report.update(self._retention(start.date(), today))
+            return report
+
+        window_start = start.replace(tzinfo=None) if grain == "hourly" else datetime(start.year, start.month, start.day)
+        report.update({"granularity": grain, "window_start": window_start.isoformat()})
+        if chart == "engagement_trend":
+            series = self._rows(
+                "SELECT bucket, "
+                "coalesce(sum(value) FILTER (WHERE metric = 'events'), 0) AS events, "
+                "coalesce(sum(value) FILTER (WHERE metric = 'active_users'), 0) AS active_users "
+                "FROM cubes WHERE metric IN ('events', 'active_users') AND grain = ? AND bucket >= ? "
+                "GROUP BY bucket ORDER BY bucket",
+                [grain, window_start],
+            )
+            report["series"] = series
+            report["data_points"] = len(series)
+            report["total_events"] = sum(point["events"] for point in series)
+        else:
+            # Distinct users per bucket summed over the window: user-days / user-hours
+            features = self._rows(
+                "SELECT dim AS event, "
+                "coalesce(sum(value) FILTER (WHERE metric = 'feature_events'), 0) AS events, "
+                "coalesce(sum(value) FILTER (WHERE metric = 'feature_users'), 0) AS user_buckets "
+                "FROM cubes WHERE metric IN ('feature_events', 'feature_users') AND grain = ? AND bucket >= ? "
+                "GROUP BY dim ORDER BY events DESC, dim",
+                [grain, window_start],
+            )
+            total = sum(feature["events"] for feature in features) or 1
+            for feature in features:
+                feature["share"] = feature["events"] / total
+            report["features"] = features
+            report["data_points"] = len(features)
+        return report
+
+    def _retention(self, first_cohort, today) -> Dict[str, Any]:
+        """Cohort triangle for cohorts starting on or after first_cohort."""
+        cells = self.conn.execute(
+            "SELECT CAST(bucket AS DATE) AS cohort, CAST(dim AS INTEGER) AS day_offset, value "
+            "FROM cubes WHERE metric = 'retention' AND grain = 'daily' AND bucket >= ? AND value != 0 "
+            "ORDER BY cohort, day_offset",
+            [datetime(first_cohort.year, first_cohort.month, first_cohort.day)],
+        ).fetchall()
+
+        cohorts: Dict[Any, Dict[int, float]] = {}
+        for cohort, day_offset, value in cells:
+            cohorts.setdefault(cohort, {})[day_offset] = value
+
+        rows = []
+        retained_by_offset: Dict[int, float] = {}
+        eligible_by_offset: Dict[int, float] = {}
+        for cohort, offsets in sorted(cohorts.items()):
+            size = offsets.get(0, 0)
+            if not size:
+                continue
+            age = (today - cohort).days
+            rows.append({
+                "cohort": cohort.isoformat(),
+                "users": size,
+                "retained": {str(k): v for k, v in sorted(offsets.items()) if k > 0},
+                "rate": {str(k): v / size for k, v in sorted(offsets.items()) if k > 0},
+            })
+            # Weighted average over cohorts old enough to have reached each offset
+            for k in range(1, age + 1):
+                eligible_by_offset[k] = eligible_by_offset.get(k, 0) + size
+                retained_by_offset[k] = retained_by_offset.get(k, 0) + offsets.get(k, 0)
+
+        return {
+            "granularity": "daily",
+            "window_start": first_cohort.isoformat(),
+            "cohorts": rows,
+            "data_points": len(rows),
+            "average_rate": {
+                str(k): retained_by_offset[k] / eligible_by_offset[k] for k in sorted(eligible_by_offset)
+            },
+        }
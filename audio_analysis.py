@@ -0,0 +1,457 @@
+"""
+EDM Shuffle Soundpack Audio Analysis
+
+Measures what public/soundpacks/manifest.json declares by hand (bpm, key,
+duration) from the audio itself, so the mix station syncs to the real tempo:
+- onset strength envelope (spectral flux of the log-magnitude STFT)
+- BPM from the envelope's autocorrelation, refined over its harmonics and
+  snapped to whole bars for loopable stems
+- beat grid (phase of the beat comb that best matches the onsets)
+- key estimate (chroma correlated against Krumhansl-Schmuckler profiles)
+- loudness (RMS and peak level in dBFS)
+
+All per-frame work is vectorized with NumPy: frames are strided views of the
+signal transformed in blocks, and the envelope, chroma and phase searches are
+array reductions. A soundpack directory is analyzed across CPU cores and the
+results are written to a sidecar next to the manifest (manifest.analysis.json)
+without touching the hand-written manifest. Results are cached by content hash
+(analysis_cache.py), so a rebuild only analyzes new or modified stems.
+
+Usage:
+    python audio_analysis.py public/soundpacks --workers 8
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from analysis_cache import DEFAULT_CACHE_PATH, AnalysisCache
+from audio_io import AudioDecodeError, load_audio, resample
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump whenever analysis output changes so cached results are recomputed
+ANALYZER_VERSION = "1"
+
+ANALYSIS_SAMPLE_RATE = 22050
+# Short frames keep onsets sharp; long frames resolve low pitches for chroma
+ONSET_N_FFT = 1024
+CHROMA_N_FFT = 4096
+HOP_LENGTH = 256
+# Frames transformed per block, bounding STFT memory on long files
+STFT_BLOCK_FRAMES = 2048
+
+MIN_BPM = 60.0
+MAX_BPM = 200.0
+PRIOR_BPM = 120.0
+# Below this normalized autocorrelation the stem has no usable pulse (pads, FX)
+MIN_TEMPO_CONFIDENCE = 0.1
+# Loop stems whose length is within this fraction of a whole number of bars
+# get the BPM implied by the loop length
+BAR_SNAP_TOLERANCE = 0.015
+BEATS_PER_BAR = 4
+
+KEY_MIN_CONFIDENCE = 0.5
+PITCH_CLASSES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+# Krumhansl-Schmuckler key profiles, tonic first
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac", ".aiff", ".aif", ".m4a")
+MANIFEST_NAME = "manifest.json"
+SIDECAR_NAME = "manifest.analysis.json"
+# Derived files kept next to the stems: transcoded variants (soundpack_transcode)
+# and waveform peak directories (waveform_peaks)
+VARIANTS_DIR = "variants"
+PEAKS_DIR_SUFFIX = ".peaks"
+CACHE_ANALYZER = "audio_analysis"
+
+# =============================================================================
+# FRAMEWISE FEATURES
+# =============================================================================
+
+def stft_magnitude(signal: np.ndarray, n_fft: int = ONSET_N_FFT, hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """
+    Magnitude spectrogram of shape (frames, n_fft // 2 + 1).
+
+    Frames are centered (frame t covers sample t * hop_length) and taken as
+    strided views of the padded signal, so no per-frame Python loop runs.
+    """
+    padded = np.pad(signal.astype(np.float32), (n_fft // 2, n_fft // 2))
+    if len(padded) < n_fft:
+        padded = np.pad(padded, (0, n_fft - len(padded)))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop_length]
+    window = np.hanning(n_fft).astype(np.float32)
+    blocks = [
+        np.abs(np.fft.rfft(frames[start:start + STFT_BLOCK_FRAMES] * window, axis=1)).astype(np.float32)
+        for start in range(0, len(frames), STFT_BLOCK_FRAMES)
+    ]
+    return np.concatenate(blocks) if blocks else np.zeros((0, n_fft // 2 + 1), dtype=np.float32)
+
+def onset_envelope(magnitude: np.ndarray) -> np.ndarray:
+    """Spectral flux of the log-compressed spectrogram, normalized to [0, 1]."""
+    if len(magnitude) < 2:
+        return np.zeros(len(magnitude), dtype=np.float32)
+    log_magnitude = np.log1p(100.0 * magnitude)
+    flux = np.maximum(np.diff(log_magnitude, axis=0), 0.0).mean(axis=1)
+    envelope = np.concatenate([[0.0], flux]).astype(np.float32)
+    peak = envelope.max()
+    return envelope / peak if peak > 0 else envelope
+
+def _parabolic_peak(values: np.ndarray, index: int) -> float:
+    """Sub-sample position of the peak at index."""
+    if index <= 0 or index >= len(values) - 1:
+        return float(index)
+    left, center, right = values[index - 1], values[index], values[index + 1]
+    denominator = left - 2 * center + right
+    return float(index) if denominator == 0 else index + 0.5 * (left - right) / denominator
+
+def estimate_tempo(envelope: np.ndarray, frame_rate: float,
+                   min_bpm: float = MIN_BPM, max_bpm: float = MAX_BPM) -> Tuple[Optional[float], float]:
+    """
+    Tempo from the autocorrelation of the onset envelope.
+
+    The best lag is picked with a log-normal prior around PRIOR_BPM (to
+    settle octave ambiguity) and refined by averaging the sub-frame peak
+    positions of its multiples.
+
+    Returns:
+        (bpm, confidence) with bpm None when the envelope has no periodicity
+    """
+    centered = envelope - envelope.mean()
+    n = len(centered)
+    if n < 8 or not np.any(centered):
+        return None, 0.0
+
+    spectrum = np.fft.rfft(centered, 2 * n)
+    autocorrelation = np.fft.irfft(np.abs(spectrum) ** 2)[:n]
+    autocorrelation /= autocorrelation[0]
+
+    min_lag = max(1, int(frame_rate * 60.0 / max_bpm))
+    max_lag = min(int(np.ceil(frame_rate * 60.0 / min_bpm)), n - 2)
+    if max_lag <= min_lag:
+        return None, 0.0
+    lags = np.arange(min_lag, max_lag + 1)
+    prior = np.exp(-0.5 * np.log2(60.0 * frame_rate / lags / PRIOR_BPM) ** 2)
+    best = int(lags[np.argmax(autocorrelation[lags] * prior)])
+    confidence = float(max(autocorrelation[best], 0.0))
+
+    if confidence < MIN_TEMPO_CONFIDENCE:
+        return None, confidence
+
+    # Follow the peaks at multiples of the period, re-centering on the
+    # running estimate so the search window does not drift; only lags up to
+    # half the envelope have enough overlap to be reliable
+    period = _parabolic_peak(autocorrelation, best)
+    estimates, weights = [period], [1]
+    for multiple in range(2, 9):
+        target = int(round(period * multiple))
+        if target + 2 >= n // 2:
+            break
+        local = target - 2 + int(np.argmax(autocorrelation[target - 2:target + 3]))
+        estimates.append(_parabolic_peak(autocorrelation, local) / multiple)
+        weights.append(multiple)
+        period = float(np.average(estimates, weights=weights))
+    return 60.0 * frame_rate / period, confidence
+
+def snap_to_bars(bpm: float, duration_sec: float) -> float:
+    """Use the loop-implied tempo when the stem is (almost) a whole number of bars long."""
+    beats = duration_sec * bpm / 60.0
+    bars = round(beats / BEATS_PER_BAR)
+    if bars < 1:
+        return bpm
+    snapped = 60.0 * bars * BEATS_PER_BAR / duration_sec
+    return snapped if abs(snapped - bpm) / bpm <= BAR_SNAP_TOLERANCE else bpm
+
+def beat_grid(envelope: np.ndarray, frame_rate: float, bpm: float, phase_steps: int = 64) -> Dict[str, Any]:
+    """
+    Beat positions for a fixed tempo.
+
+    Every candidate phase of the beat comb is scored at once by sampling the
+    envelope on a (phases x beats) grid; the best phase gives the grid.
+    """
+    period = frame_rate * 60.0 / bpm
+    beat_count = int((len(envelope) - 1) / period) + 2
+    # Phases start slightly before zero: onsets right at the start of a stem
+    # register a frame or two early in the envelope
+    phases = np.linspace(-0.25 * period, 0.75 * period, phase_steps, endpoint=False)
+    positions = phases[:, None] + np.arange(beat_count)[None, :] * period
+    valid = positions <= len(envelope) - 1
+    samples = np.interp(positions, np.arange(len(envelope)), envelope) * valid
+    scores = samples.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+    best = int(np.argmax(scores))
+    beats = np.maximum(positions[best][valid[best]], 0.0) / frame_rate
+    return {
+        "first_beat_sec": round(float(beats[0]), 4) if len(beats) else 0.0,
+        "interval_sec": round(60.0 / bpm, 6),
+        "beats_sec": [round(float(beat), 3) for beat in beats],
+    }
+
+def chroma(magnitude: np.ndarray, sample_rate: int, n_fft: int = CHROMA_N_FFT) -> np.ndarray:
+    """Energy per pitch class (12 values) from bins between 55 Hz and 5 kHz."""
+    frequencies = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    usable = (frequencies >= 55.0) & (frequencies <= 5000.0)
+    pitch_classes = (np.round(12 * np.log2(frequencies[usable] / 440.0)).astype(int) + 69) % 12
+    energy = (magnitude[:, usable] ** 2).sum(axis=0)
+    return np.bincount(pitch_classes, weights=energy, minlength=12)
+
+def estimate_key(chroma_vector: np.ndarray) -> Tuple[Optional[str], float]:
+    """
+    Best of the 24 major/minor keys by profile correlation.
+
+    Returns:
+        (key, confidence) with keys named like the manifest ("C", "Am") and
+        None when no key correlates well (e.g. percussion)
+    """
+    if not np.any(chroma_vector):
+        return None, 0.0
+    profiles = np.stack(
+        [np.roll(MAJOR_PROFILE, tonic) for tonic in range(12)]
+        + [np.roll(MINOR_PROFILE, tonic) for tonic in range(12)]
+    )
+    profiles = (profiles - profiles.mean(axis=1, keepdims=True)) / profiles.std(axis=1, keepdims=True)
+    spread = chroma_vector.std()
+    if spread == 0:
+        return None, 0.0
+    normalized = (chroma_vector - chroma_vector.mean()) / spread
+    correlations = profiles @ normalized / 12.0
+    best = int(np.argmax(correlations))
+    confidence = float(correlations[best])
+    if confidence < KEY_MIN_CONFIDENCE:
+        return None, confidence
+    tonic = PITCH_CLASSES[best % 12]
+    return (tonic if best < 12 else f"{tonic}m"), confidence
+
+def level_dbfs(audio: np.ndarray) -> Dict[str, float]:
+    """RMS and sample peak level of all channels in dBFS."""
+    floor = 1e-10
+    rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64)))) if audio.size else 0.0
+    peak = float(np.max(np.abs(audio))) if audio.size else 0.0
+    return {
+        "rms_dbfs": round(20 * np.log10(max(rms, floor)), 2),
+        "peak_dbfs": round(20 * np.log10(max(peak, floor)), 2),
+    }
+
+# =============================================================================
+# ANALYSIS
+# =============================================================================
+
+def analyze_audio(audio: np.ndarray, sample_rate: int) -> Dict[str, Any]:
+    """
+    Analyze decoded audio of shape (frames,) or (frames, channels).
+
+    Returns:
+        Dictionary with duration_sec, bpm, bpm_confidence, beat_grid, key,
+        key_confidence, rms_dbfs and peak_dbfs
+    """
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    duration = audio.shape[0] / sample_rate
+    result: Dict[str, Any] = {"duration_sec": round(duration, 4), **level_dbfs(audio)}
+
+    mono = resample(audio.mean(axis=1), sample_rate, ANALYSIS_SAMPLE_RATE)
+    frame_rate = ANALYSIS_SAMPLE_RATE / HOP_LENGTH
+
+    envelope = onset_envelope(stft_magnitude(mono, ONSET_N_FFT))
+    bpm, bpm_confidence = estimate_tempo(envelope, frame_rate)
+    if bpm is not None:
+        bpm = snap_to_bars(bpm, duration)
+        result["bpm"] = round(bpm, 2)
+        result["bpm_confidence"] = round(bpm_confidence, 3)
+        result["beat_grid"] = beat_grid(envelope, frame_rate, bpm)
+    else:
+        result["bpm"] = None
+        result["bpm_confidence"] = 0.0
+
+    # Chroma only needs the long-term spectrum, so a coarser hop is enough
+    chroma_magnitude = stft_magnitude(mono, CHROMA_N_FFT, CHROMA_N_FFT // 2)
+    key, key_confidence = estimate_key(chroma(chroma_magnitude, ANALYSIS_SAMPLE_RATE))
+    result["key"] = key or "N/A"
+    result["key_confidence"] = round(key_confidence, 3)
+    return result
+
+def analyze_file(path: str) -> Dict[str, Any]:
+    """Decode and analyze one audio file."""
+    audio, sample_rate = load_audio(path)
+    return analyze_audio(audio, sample_rate)
+
+def _analyze_task(path: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """Worker entry point: never raises, so one bad file does not stop the pool."""
+    try:
+        return path, analyze_file(path), None
+    except (AudioDecodeError, OSError, ValueError) as e:
+        return path, None, str(e)
+
+def analyze_files(paths: Iterable[str], workers: Optional[int] = None) -> Iterable[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Analyze files in parallel across processes.
+
+    Yields:
+        (path, result, error) in input order
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) == 1:
+        for path in paths:
+            yield _analyze_task(path)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        yield from executor.map(_analyze_task, paths)
+
+# =============================================================================
+# SOUNDPACKS
+# =============================================================================
+
+def find_audio_files(root: str) -> List[str]:
+    """
+    Audio files under a soundpack directory, relative to it, sorted.
+
+    Derived files in variants/ and *.peaks directories are not stems and
+    are skipped.
+    """
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = [
+            name for name in subdirectories
+            if name != VARIANTS_DIR and not name.endswith(PEAKS_DIR_SUFFIX)
+        ]
+        for name in files:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/"))
+    return sorted(found)
+
+def load_manifest(root: str) -> Dict[str, Any]:
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"soundPacks": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def declared_stems(manifest: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Manifest stem entries keyed by their file path."""
+    return {
+        stem["file"]: {**stem, "pack_id": pack.get("id")}
+        for pack in manifest.get("soundPacks", [])
+        for stem in pack.get("stems", [])
+        if stem.get("file")
+    }
+
+def compare_with_declared(result: Dict[str, Any], declared: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach the hand-entered manifest values and how far the measurements drift from them."""
+    comparison: Dict[str, Any] = {
+        "stem_id": declared.get("id"),
+        "pack_id": declared.get("pack_id"),
+        "declared": {key: declared.get(key) for key in ("bpm", "key", "duration")},
+    }
+    if isinstance(declared.get("bpm"), (int, float)) and result.get("bpm"):
+        comparison["bpm_drift"] = round(result["bpm"] - declared["bpm"], 2)
+    if declared.get("key") and result.get("key"):
+        comparison["key_matches"] = declared["key"] == result["key"]
+    return comparison
+
+def write_json_atomic(path: str, data: Any) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    # mkstemp creates 0600 files; these are served as static assets
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+def analyze_soundpacks(root: str, workers: Optional[int] = None,
+                       sidecar_path: Optional[str] = None,
+                       cache: Optional[AnalysisCache] = None) -> Dict[str, Any]:
+    """
+    Analyze every audio file under a soundpack directory and write the sidecar.
+
+    Args:
+        root: Soundpack directory containing manifest.json
+        workers: Worker processes (defaults to the CPU count)
+        sidecar_path: Output path (defaults to <root>/manifest.analysis.json)
+        cache: Analysis cache; only files whose content hash has no result for
+            the current ANALYZER_VERSION are decoded and analyzed
+
+    Returns:
+        The sidecar contents
+    """
+    declared = declared_stems(load_manifest(root))
+    files = find_audio_files(root)
+    missing = sorted(set(declared) - set(files))
+    if missing:
+        logger.warning(f"⚠️ {len(missing)} manifest stem(s) have no audio file: {missing}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    hashes: Dict[str, str] = {}
+    if cache is not None:
+        hashes = {relative: cache.content_hash(os.path.join(root, relative)) for relative in files}
+        cached = cache.get_many(hashes.values(), CACHE_ANALYZER, ANALYZER_VERSION)
+        results = {relative: cached[digest] for relative, digest in hashes.items() if digest in cached}
+    pending = [relative for relative in files if relative not in results]
+
+    logger.info(f"🎚️ Analyzing {len(pending)} of {len(files)} stem(s) in {root} ({len(results)} cached)")
+    errors: Dict[str, str] = {}
+    for relative, (_, result, error) in zip(pending, analyze_files((os.path.join(root, f) for f in pending), workers)):
+        if error:
+            logger.warning(f"⚠️ Could not analyze {relative}: {error}")
+            errors[relative] = error
+            continue
+        if cache is not None:
+            cache.put(hashes[relative], CACHE_ANALYZER, ANALYZER_VERSION, result)
+        results[relative] = result
+
+    stems: Dict[str, Any] = {}
+    for relative in files:
+        if relative not in results:
+            continue
+        # Declared values are compared on every run since the manifest may change without the audio
+        stem = dict(results[relative])
+        if relative in hashes:
+            stem["content_hash"] = hashes[relative]
+        if relative in declared:
+            stem.update(compare_with_declared(stem, declared[relative]))
+        stems[relative] = stem
+
+    sidecar = {
+        "analyzer_version": ANALYZER_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "stems": stems,
+        "errors": errors,
+        "missing_files": missing,
+    }
+    write_json_atomic(sidecar_path or os.path.join(root, SIDECAR_NAME), sidecar)
+    logger.info(f"✅ Wrote analysis for {len(stems)} stem(s) ({len(pending) - len(errors)} analyzed, "
+                f"{len(errors)} error(s))")
+    return sidecar
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze soundpack stems (BPM, beat grid, key, loudness)")
+    parser.add_argument("root", nargs="?", default=os.path.join("public", "soundpacks"),
+                        help="Soundpack directory containing manifest.json")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", help=f"Sidecar path (default: <root>/{SIDECAR_NAME})")
+    parser.add_argument("--cache", default=os.getenv("AUDIO_ANALYSIS_CACHE", DEFAULT_CACHE_PATH),
+                        help="Analysis cache database (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-analyze every stem without reading or writing the cache")
+    parser.add_argument("--prune", action="store_true", help="Drop cached results from older analyzer versions")
+    args = parser.parse_args()
+    if args.no_cache:
+        analyze_soundpacks(args.root, args.workers, args.output)
+        return
+    with AnalysisCache(args.cache) as cache:
+        analyze_soundpacks(args.root, args.workers, args.output, cache)
+        if args.prune:
+            cache.prune({CACHE_ANALYZER: ANALYZER_VERSION})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+EDM Shuffle Audio I/O
+
+Decoding of soundpack stems into NumPy arrays for the Python audio pipeline.
+
+Decoders are tried in order:
+- soundfile (libsndfile; MP3 needs libsndfile >= 1.1), if installed
+- the standard library wave module, for PCM WAV files
+- ffmpeg on PATH, for MP3 / OGG / anything else it understands
+
+Audio is returned as float32 in [-1, 1] with shape (frames, channels).
+"""
+
+from typing import Optional, Tuple
+import logging
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+logger = logging.getLogger(__name__)
+
+class AudioDecodeError(Exception):
+    """Raised when no available decoder can read an audio file."""
+
+def _read_wave(path: str) -> Tuple[np.ndarray, int]:
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        # Sign-extend packed 24-bit samples into int32
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (packed[:, 0].astype(np.int32) | (packed[:, 1].astype(np.int32) << 8)
+                | (packed[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise AudioDecodeError(f"Unsupported WAV sample width {width} in {path}")
+    return data.reshape(-1, channels), sample_rate
+
+def _read_ffmpeg(path: str, sample_rate: Optional[int]) -> Tuple[np.ndarray, int]:
+    if sample_rate is None:
+        sample_rate = 44100
+    command = ["ffmpeg", "-v", "error", "-i", path, "-f", "f32le", "-ac", "2", "-ar", str(sample_rate), "-"]
+    completed = subprocess.run(command, capture_output=True, check=False)
+    if completed.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg could not decode {path}: {completed.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(completed.stdout, dtype="<f4").reshape(-1, 2).copy(), sample_rate
+
+def resample(audio: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Polyphase resampling along the first axis."""
+    if sample_rate == target_rate:
+        return audio
+    from math import gcd
+    from scipy.signal import resample_poly
+    divisor = gcd(sample_rate, target_rate)
+    return resample_poly(audio, target_rate // divisor, sample_rate // divisor, axis=0).astype(np.float32)
+
+def load_audio(path: str, sample_rate: Optional[int] = None, mono: bool = False) -> Tuple[np.ndarray, int]:
+    """
+    Decode an audio file.
+
+    Args:
+        path: Audio file path
+        sample_rate: Resample to this rate (None keeps the file's rate)
+        mono: Average channels into a single channel
+
+    Returns:
+        (audio, sample_rate) with audio of shape (frames, channels), or
+        (frames,) when mono is True
+
+    Raises:
+        AudioDecodeError: If no decoder can read the file
+    """
+    audio = None
+    if soundfile is not None:
+        try:
+            audio, rate = soundfile.read(path, dtype="float32", always_2d=True)
+        except RuntimeError as e:
+            logger.debug(f"soundfile could not read {path}: {e}")
+    if audio is None and path.lower().endswith(".wav"):
+        try:
+            audio, rate = _read_wave(path)
+        except (wave.Error, EOFError) as e:
+            logger.debug(f"wave could not read {path}: {e}")
+    if audio is None and shutil.which("ffmpeg"):
+        audio, rate = _read_ffmpeg(path, sample_rate)
+    if audio is None:
+        raise AudioDecodeError(f"No decoder available for {path}; install soundfile or ffmpeg")
+
+    if sample_rate is not None and rate != sample_rate:
+        audio = resample(audio, rate, sample_rate)
+        rate = sample_rate
+    if mono:
+        audio = audio.mean(axis=1)
+    return np.ascontiguousarray(audio, dtype=np.float32), rate
+
+def write_wav(path: str, audio: np.ndarray, sample_rate: int) -> None:
+    """Write float audio of shape (frames,) or (frames, channels) as 16-bit PCM WAV."""
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).round().astype("<i2")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(audio.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+
+class AudioStreamWriter:
+    """
+    Incremental 16-bit writer for audio rendered in chunks.
+
+    WAV is written with the standard library. When total_frames is known up
+    front the header is written once and never patched, so the target may be
+    a pipe such as stdout. FLAC needs soundfile.
+
+    Usage:
+        with AudioStreamWriter("set.wav", 44100, 2, total_frames=frames) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, target, sample_rate: int, channels: int, format: str = "wav",
+                 total_frames: Optional[int] = None):
+        self.format = format.lower()
+        self.channels = channels
+        self.frames_written = 0
+        self.clipped_samples = 0
+        self.peak = 0.0
+        self._wav = None
+        self._sound_file = None
+        if self.format == "wav":
+            self._wav = wave.open(target, "wb")
+            self._wav.setnchannels(channels)
+            self._wav.setsampwidth(2)
+            self._wav.setframerate(sample_rate)
+            if total_frames is not None:
+                self._wav.setnframes(total_frames)
+        elif self.format == "flac":
+            if soundfile is None:
+                raise AudioDecodeError("Writing FLAC requires soundfile (pip install soundfile)")
+            self._sound_file = soundfile.SoundFile(target, "w", samplerate=sample_rate, channels=channels,
+                                                   format="FLAC", subtype="PCM_16")
+        else:
+            raise ValueError(f"Unsupported output format {format!r}; expected wav or flac")
+
+    def write(self, chunk: np.ndarray) -> None:
+        if chunk.ndim == 1:
+            chunk = chunk[:, None]
+        if len(chunk):
+            magnitude = np.abs(chunk)
+            self.peak = max(self.peak, float(magnitude.max()))
+            self.clipped_samples += int(np.count_nonzero(magnitude > 1.0))
+        pcm = (np.clip(chunk, -1.0, 1.0) * 32767.0).round().astype("<i2")
+        if self._wav is not None:
+            self._wav.writeframesraw(pcm.tobytes())
+        else:
+            self._sound_file.write(pcm)
+        self.frames_written += len(chunk)
+
+    def close(self) -> None:
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+        if self._sound_file is not None:
+            self._sound_file.close()
+            self._sound_file = None
+
+    def __enter__(self) -> "AudioStreamWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -13,10 +13,21 @@ All crew workflows are documented with TODO comments where implementation is nee
 
 from crewai import Crew, Task, Process
 from agents import get_all_agents, get_agent_by_name
-from typing import Dict, List, Any, Optional
+from workflow_dag import DEFAULT_MAX_WORKERS, DagStep, run_dag
+from result_cache import ResultCache, create_result_cache, workflow_cache_key
+from tracing import (
+    TRACE_FORMATS, CrewCallbackRecorder, Span, Trace, export_traces, record_crew_usage, summarize_traces,
+)
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import json
+import queue
+import sys
 import logging
+import threading
 from datetime import datetime
+import argparse
 import os
 
 # Configure logging
@@ -284,35 +295,151 @@ def create_qa_testing_task(agent, workflow_components: List[str]) -> Task:
 # CREW WORKFLOWS
 # =============================================================================
 
+DEFAULT_BATCH_CONCURRENCY = 4
+# Most recent workflow traces kept for analysis and export
+DEFAULT_MAX_TRACES = 100
+
+# Steps of the festival planning workflow and the steps whose output they
+# need. The environment, mix, marketplace and gamification steps depend only
+# on the archetype, so all five steps run concurrently and planning takes as
+# long as the slowest step.
+FESTIVAL_PLAN_DEPENDENCIES: Dict[str, List[str]] = {
+    "festival_discovery": [],
+    "3d_environment": [],
+    "dj_mixing": [],
+    "marketplace": [],
+    "gamification": [],
+}
+
 class EDMShuffleCrew:
     """
     Main orchestration class for EDM Shuffle CrewAI workflows.
     """
     
-    def __init__(self):
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 result_cache: Optional[ResultCache] = None,
+                 trace_path: Optional[str] = None, trace_format: Optional[str] = None):
+        """
+        Args:
+            max_workers: Maximum number of workflow tasks run concurrently
+            result_cache: Cache for completed workflow results; defaults to
+                the backend named by CREW_RESULT_CACHE ("memory",
+                "sqlite:<path>", "dir:<path>" or "off")
+            trace_path: File the workflow traces are exported to after every
+                run; defaults to CREW_TRACE_FILE (unset disables export)
+            trace_format: "chrome" or "otlp"; defaults to CREW_TRACE_FORMAT or "chrome"
+        """
         self.agents = get_all_agents()
+        # Idle agent sets for batch runs: CrewAI kickoffs mutate the agents
+        # they are given, so concurrent plans must not share agents. Sets are
+        # built on demand (tools come from the shared tool registry) and
+        # reused, so a batch builds at most `concurrency` of them.
+        self._agent_pool: "queue.SimpleQueue[Dict[str, Any]]" = queue.SimpleQueue()
         self.workflow_results = {}
+        self.max_workers = max_workers
+        self.result_cache = result_cache or create_result_cache(os.getenv("CREW_RESULT_CACHE", "memory"))
+        self.traces = deque(maxlen=DEFAULT_MAX_TRACES)
+        self.trace_path = trace_path or os.getenv("CREW_TRACE_FILE")
+        self.trace_format = trace_format or os.getenv("CREW_TRACE_FORMAT", "chrome")
+        self._traces_lock = threading.Lock()
+    
+    def _finish_trace(self, trace: Trace) -> None:
+        """Keep a finished workflow trace and export all kept traces if configured."""
+        with self._traces_lock:
+            self.traces.append(trace)
+            if not self.trace_path:
+                return
+            try:
+                export_traces(list(self.traces), self.trace_path, self.trace_format)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Could not export workflow traces to {self.trace_path}: {e}")
+    
+    def _cached_or_run(self, cache_key: str, run: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached workflow result for cache_key, or run the workflow.
+        
+        Concurrent calls with the same key (e.g. batch users sharing an
+        archetype) wait for the first run instead of repeating it. Only fully
+        completed results are cached. Results are normalized to JSON data
+        (crew outputs become strings) whether they were run or cached, so
+        both have the same shape. Cache hits are marked with cache_hit, get
+        a fresh timestamp with the original one in cached_at, and report the
+        producing run's trace as cached_trace_id instead of trace.
+        """
+        def run_normalized() -> Dict[str, Any]:
+            return json.loads(json.dumps(run(), default=str))
         
-    def plan_virtual_festival_experience(self, user_preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+        if self.result_cache is None:
+            return run_normalized()
+        result, hit = self.result_cache.get_or_compute(
+            cache_key, run_normalized, cacheable=lambda result: result.get("status") == "completed"
+        )
+        if hit:
+            logger.info("⚡ Returning cached workflow result")
+            result["cache_hit"] = True
+            result["cached_at"] = result.get("timestamp")
+            result["timestamp"] = datetime.now().isoformat()
+            # The trace belongs to the run that produced the cached result
+            trace = result.pop("trace", None)
+            if trace:
+                result["cached_trace_id"] = trace.get("trace_id")
+        return result
+    
+    def _task_step(self, name: str, task: Task, depends_on: List[str],
+                   parent_span: Span) -> DagStep:
+        """
+        Wrap a task as a DAG step that runs it in its own single-agent crew.
+        
+        Outputs of the step's dependencies are appended to the task
+        description so the agent sees them as context, as it would in a
+        sequential crew. The step runs inside a task span under parent_span,
+        with agent steps and tool calls recorded beneath it.
+        """
+        def run(inputs: Dict[str, Any]) -> Any:
+            if inputs:
+                context = "\n\n".join(f"{dep}:\n{output}" for dep, output in inputs.items())
+                task.description = f"{task.description}\n\nCONTEXT FROM EARLIER STEPS:\n{context}"
+            agent_role = getattr(task.agent, "role", None)
+            with parent_span.trace.span(name, "task", parent=parent_span, agent=agent_role) as span:
+                recorder = CrewCallbackRecorder(span)
+                step_crew = Crew(
+                    agents=[task.agent],
+                    tasks=[task],
+                    process=Process.sequential,
+                    verbose=True,
+                    memory=True,  # Enable agent memory, as the sequential crew did
+                    **recorder.crew_kwargs(tasks=False)
+                )
+                with recorder.active():
+                    output = step_crew.kickoff()
+                record_crew_usage(span, step_crew, output)
+                return output
+        
+        return DagStep(name=name, run=run, depends_on=depends_on)
+        
+    def plan_virtual_festival_experience(self, user_preferences: Dict[str, Any] = None,
+                                         agents: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Complete workflow for planning a virtual festival experience.
         
-        This orchestrates multiple agents in sequence:
-        1. Festival Scouter discovers events
-        2. Virtual Festival Architect creates 3D environment
-        3. Beat Mixer generates appropriate music
-        4. Fashion Futurist curates marketplace items
-        5. Engagement Alchemist adds gamification
-        6. Data Oracle analyzes performance
-        7. Quality Guardian validates everything
+        All agents run concurrently on the worker pool (see
+        FESTIVAL_PLAN_DEPENDENCIES):
+        - Festival Scouter discovers events
+        - Virtual Festival Architect creates 3D environment
+        - Beat Mixer generates appropriate music
+        - Fashion Futurist curates marketplace items
+        - Engagement Alchemist adds gamification
         
         Args:
             user_preferences: User preferences for personalization
+            agents: Agent set to run on (defaults to this crew's agents); plans
+                running at the same time need separate sets
             
         Returns:
             Complete festival experience package
         """
         logger.info("🎪 Starting virtual festival experience planning workflow")
+        agents = agents or self.agents
         
         # Default preferences if none provided
         if not user_preferences:
@@ -323,58 +450,60 @@ class EDMShuffleCrew:
                 "budget": "moderate"
             }
         
+        archetype = user_preferences.get("archetype", "cyber_punk")
+        
         # Create tasks for each agent
-        tasks = [
-            create_festival_discovery_task(
-                self.agents["festival_scouter"], 
+        tasks = {
+            "festival_discovery": create_festival_discovery_task(
+                agents["festival_scouter"],
                 user_preferences
             ),
-            create_3d_environment_task(
-                self.agents["virtual_festival_architect"],
-                user_preferences.get("archetype", "cyber_punk")
+            "3d_environment": create_3d_environment_task(
+                agents["virtual_festival_architect"],
+                archetype
             ),
-            create_dj_mix_generation_task(
-                self.agents["beat_mixer"],
-                user_preferences.get("archetype", "cyber_punk")
+            "dj_mixing": create_dj_mix_generation_task(
+                agents["beat_mixer"],
+                archetype
             ),
-            create_marketplace_curation_task(
-                self.agents["fashion_futurist"],
-                user_preferences.get("archetype", "cyber_punk")
+            "marketplace": create_marketplace_curation_task(
+                agents["fashion_futurist"],
+                archetype
             ),
-            create_gamification_task(
-                self.agents["engagement_alchemist"],
-                {"name": "Virtual EDM Festival", "theme": user_preferences.get("archetype", "cyber_punk")}
+            "gamification": create_gamification_task(
+                agents["engagement_alchemist"],
+                {"name": "Virtual EDM Festival", "theme": archetype}
             )
-        ]
+        }
         
-        # Create and execute crew
-        crew = Crew(
-            agents=list(self.agents.values())[:5],  # First 5 agents for main workflow
-            tasks=tasks,
-            process=Process.sequential,
-            verbose=True,
-            memory=True,  # Enable memory sharing between agents
-            # TODO: Add error handling and retry logic
-            # TODO: Add parallel processing where appropriate
+        # Users whose preferences render to the same tasks share one plan
+        cache_key = workflow_cache_key("festival_planning", tasks.values())
+        planning_result = self._cached_or_run(
+            cache_key, lambda: self._run_festival_plan(tasks, archetype, user_preferences)
         )
+        if planning_result.get("cache_hit"):
+            planning_result["user_preferences"] = user_preferences
         
+        # Store results for analysis (batch runs keep the latest plan)
+        if planning_result["status"] != "failed":
+            self.workflow_results["festival_planning"] = planning_result
+        return planning_result
+    
+    def _run_festival_plan(self, tasks: Dict[str, Task], archetype: str,
+                           user_preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the festival planning tasks as a DAG and build the result."""
+        trace = Trace("festival_planning")
         try:
             # Execute the workflow
-            logger.info("Executing festival planning crew workflow...")
-            result = crew.kickoff()
-            
-            # Store results for analysis
-            self.workflow_results["festival_planning"] = {
-                "timestamp": datetime.now().isoformat(),
-                "user_preferences": user_preferences,
-                "result": result,
-                "status": "completed"
-            }
-            
-            logger.info("✅ Virtual festival experience planning completed")
-            return self.workflow_results["festival_planning"]
-            
+            logger.info("Executing festival planning workflow DAG...")
+            with trace.span("festival_planning", "workflow", archetype=archetype) as workflow_span:
+                steps = [
+                    self._task_step(name, task, FESTIVAL_PLAN_DEPENDENCIES[name], workflow_span)
+                    for name, task in tasks.items()
+                ]
+                dag_result = run_dag(steps, max_workers=self.max_workers)
         except Exception as e:
+            self._finish_trace(trace)
             logger.error(f"❌ Festival planning workflow failed: {str(e)}")
             return {
                 "status": "failed",
@@ -382,6 +511,93 @@ class EDMShuffleCrew:
                 "timestamp": datetime.now().isoformat(),
                 "note": "Workflow execution failed - check agent configurations and tool availability"
             }
+        
+        self._finish_trace(trace)
+        planning_trace = {"trace_id": trace.trace_id, "duration_sec": round(trace.root.duration, 3)}
+        
+        if not dag_result.results:
+            logger.error(f"❌ Festival planning workflow failed: {dag_result.errors}")
+            return {
+                "status": "failed",
+                "error": json.dumps(dag_result.errors),
+                "timestamp": datetime.now().isoformat(),
+                "note": "Workflow execution failed - check agent configurations and tool availability"
+            }
+        
+        planning_result = {
+            "timestamp": datetime.now().isoformat(),
+            "user_preferences": user_preferences,
+            "result": dag_result.results,
+            "status": "completed" if dag_result.ok else "partial",
+            "trace": planning_trace,
+        }
+        if not dag_result.ok:
+            planning_result["errors"] = dag_result.errors
+            planning_result["skipped"] = dag_result.skipped
+        
+        logger.info("✅ Virtual festival experience planning completed")
+        return planning_result
+    
+    def _plan_with_pooled_agents(self, user_preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Plan on an agent set from the pool, building a new set if none is idle."""
+        try:
+            agents = self._agent_pool.get_nowait()
+        except queue.Empty:
+            agents = get_all_agents()
+        try:
+            return self.plan_virtual_festival_experience(user_preferences, agents=agents)
+        finally:
+            self._agent_pool.put(agents)
+    
+    def plan_festivals_batch(self, preference_records: Iterable[Dict[str, Any]],
+                             concurrency: int = DEFAULT_BATCH_CONCURRENCY) -> Iterator[Dict[str, Any]]:
+        """
+        Plan festival experiences for many users over this shared crew.
+        
+        Records are read lazily and at most `concurrency` plans run at once,
+        so arbitrarily long inputs (e.g. a JSONL stream on stdin) are handled
+        in bounded memory. Each running plan has its own agent set from the
+        agent pool; tool instances are shared. Results are yielded in
+        completion order.
+        
+        Args:
+            preference_records: Iterable of user preference dictionaries
+            concurrency: Maximum number of users planned concurrently
+            
+        Yields:
+            Result dictionaries with user_id plus the festival workflow result
+            
+        Raises:
+            ValueError: If concurrency is less than 1
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, not {concurrency}")
+        records = iter(preference_records)
+        running = {}
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                for record in records:
+                    future = executor.submit(self._plan_with_pooled_agents, record)
+                    running[future] = record
+                    if len(running) >= concurrency:
+                        break
+                
+                if not running:
+                    break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {
+                            "status": "failed",
+                            "error": str(e),
+                            "timestamp": datetime.now().isoformat()
+                        }
+                    yield {"user_id": record.get("user_id"), **result}
     
     def analyze_workflow_performance(self) -> Dict[str, Any]:
         """
@@ -392,15 +608,25 @@ class EDMShuffleCrew:
         """
         logger.info("📊 Starting workflow performance analysis")
         
-        if not self.workflow_results:
+        if not self.workflow_results and not self.traces:
             return {
                 "status": "no_data",
                 "message": "No workflow results available for analysis",
                 "timestamp": datetime.now().isoformat()
             }
         
-        # Create analytics and QA tasks
-        workflow_data = list(self.workflow_results.keys())
+        with self._traces_lock:
+            trace_summary = summarize_traces(list(self.traces))
+        
+        # Create analytics and QA tasks; measured agent and tool timings are
+        # passed to the Data Oracle as data sources
+        workflow_data = list(self.workflow_results.keys()) + [
+            f"{group[:-1]} timing: {row['name']} ran {row['count']}x, "
+            f"total {row['total_sec']:.1f}s, mean {row['mean_sec']:.1f}s, "
+            f"{row['tool_calls']} tool calls, {row['total_tokens']} tokens"
+            for group in ("agents", "tools")
+            for row in trace_summary[group]
+        ]
         workflow_components = ["festival_discovery", "3d_environment", "dj_mixing", "marketplace", "gamification"]
         
         analytics_task = create_analytics_task(
@@ -429,6 +655,7 @@ class EDMShuffleCrew:
                 "timestamp": datetime.now().isoformat(),
                 "analysis": result,
                 "workflows_analyzed": len(self.workflow_results),
+                "trace_summary": trace_summary,
                 "status": "completed"
             }
             
@@ -440,6 +667,7 @@ class EDMShuffleCrew:
             return {
                 "status": "failed",
                 "error": str(e),
+                "trace_summary": trace_summary,
                 "timestamp": datetime.now().isoformat()
             }
     
@@ -468,29 +696,47 @@ class EDMShuffleCrew:
             theme
         )
         
-        # Create crew for parallel execution
-        dj_crew = Crew(
-            agents=[self.agents["beat_mixer"], self.agents["virtual_festival_architect"]],
-            tasks=[dj_task, visual_task],
-            process=Process.hierarchical,  # Allow for parallel processing
-            verbose=True
+        cache_key = workflow_cache_key("dj_set", [dj_task, visual_task])
+        dj_set_result = self._cached_or_run(
+            cache_key, lambda: self._run_dj_set(dj_task, visual_task, genre, theme)
         )
-        
+        if dj_set_result.get("cache_hit"):
+            dj_set_result["genre"] = genre
+        return dj_set_result
+    
+    def _run_dj_set(self, dj_task: Task, visual_task: Task, genre: str, theme: str) -> Dict[str, Any]:
+        """Run the DJ set and visuals crew and build the result."""
+        trace = Trace("dj_set")
         try:
-            result = dj_crew.kickoff()
+            with trace.span("dj_set", "workflow", genre=genre, theme=theme) as workflow_span:
+                recorder = CrewCallbackRecorder(workflow_span)
+                # Create crew for parallel execution
+                dj_crew = Crew(
+                    agents=[self.agents["beat_mixer"], self.agents["virtual_festival_architect"]],
+                    tasks=[dj_task, visual_task],
+                    process=Process.hierarchical,  # Allow for parallel processing
+                    verbose=True,
+                    **recorder.crew_kwargs()
+                )
+                with recorder.active():
+                    result = dj_crew.kickoff()
+                record_crew_usage(workflow_span, dj_crew, result)
+            self._finish_trace(trace)
             
             dj_set_result = {
                 "timestamp": datetime.now().isoformat(),
                 "genre": genre,
                 "theme": theme,
                 "result": result,
-                "status": "completed"
+                "status": "completed",
+                "trace": {"trace_id": trace.trace_id, "duration_sec": round(trace.root.duration, 3)}
             }
             
             logger.info("✅ DJ set with visuals generation completed")
             return dj_set_result
             
         except Exception as e:
+            self._finish_trace(trace)
             logger.error(f"❌ DJ set generation failed: {str(e)}")
             return {
                 "status": "failed",
@@ -502,6 +748,62 @@ class EDMShuffleCrew:
 # CLI INTERFACE
 # =============================================================================
 
+def read_preference_records(stream, default_archetype: str = "cyber_punk") -> Iterator[Dict[str, Any]]:
+    """
+    Read user preference records from a JSONL stream, skipping blank and invalid lines.
+    
+    Args:
+        stream: Text stream with one JSON object per line
+        default_archetype: Archetype used for records that do not set one
+        
+    Yields:
+        User preference dictionaries
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            logger.warning(f"⚠️ Skipping invalid preference record on line {line_number}: {e}")
+            continue
+        if not isinstance(record, dict):
+            logger.warning(f"⚠️ Skipping non-object preference record on line {line_number}")
+            continue
+        record.setdefault("archetype", default_archetype)
+        yield record
+
+def run_batch(crew_orchestrator: "EDMShuffleCrew", input_path: str, output_path: Optional[str],
+              archetype: str, concurrency: int) -> None:
+    """
+    Run the festival workflow for every record in a JSONL file (or stdin with "-"),
+    writing one JSON result line per user as each finishes.
+    """
+    source = sys.stdin if input_path == "-" else open(input_path, "r")
+    sink = open(output_path, "w") if output_path else sys.stdout
+    completed = 0
+    try:
+        records = read_preference_records(source, archetype)
+        for result in crew_orchestrator.plan_festivals_batch(records, concurrency):
+            sink.write(json.dumps(result, default=str) + "\n")
+            sink.flush()
+            completed += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    
+    logger.info(f"✅ Batch festival planning completed for {completed} users")
+
+def positive_int(value: str) -> int:
+    """argparse type for options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
 def main():
     """
     Command-line interface for running CrewAI workflows.
@@ -509,19 +811,31 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="EDM Shuffle CrewAI Orchestration")
-    parser.add_argument("workflow", choices=["festival", "dj_set", "analysis"], 
-                       help="Workflow to execute")
+    parser.add_argument("workflow", choices=["festival", "dj_set", "analysis", "batch"], 
+                       help="Workflow to execute (batch runs 'festival' for many users)")
     parser.add_argument("--user-id", type=str, help="User ID for personalization")
     parser.add_argument("--archetype", type=str, default="cyber_punk", 
                        help="User archetype for preferences")
     parser.add_argument("--genre", type=str, default="house", 
                        help="Music genre preference")
     parser.add_argument("--output", type=str, help="Output file for results")
+    parser.add_argument("--input", type=str, default="-",
+                       help="Batch only: JSONL file of user preference records ('-' for stdin)")
+    parser.add_argument("--concurrency", type=positive_int, default=DEFAULT_BATCH_CONCURRENCY,
+                       help="Batch only: maximum number of users planned concurrently")
+    parser.add_argument("--trace-output", type=str,
+                       help="Export per-task/agent/tool timing traces to this file")
+    parser.add_argument("--trace-format", choices=TRACE_FORMATS, default="chrome",
+                       help="Trace file format: Chrome trace-event JSON or OTLP/JSON")
     
     args = parser.parse_args()
     
     # Initialize crew
-    crew_orchestrator = EDMShuffleCrew()
+    crew_orchestrator = EDMShuffleCrew(trace_path=args.trace_output, trace_format=args.trace_format)
+    
+    if args.workflow == "batch":
+        run_batch(crew_orchestrator, args.input, args.output, args.archetype, args.concurrency)
+        return
     
     # Execute requested workflow
     if args.workflow == "festival":
@@ -0,0 +1,574 @@
+"""
+EDM Shuffle Offline DSP Engine
+
+Server-side rendering of the Web Audio effect chains used by the DJ station,
+so preview clips of user mixes can be pre-rendered without a browser:
+- gain (GainNode)
+- biquad filters (BiquadFilterNode, coefficients per the Web Audio spec,
+  including the EQ bands and DJ filter knob from src/config/audio.ts)
+- feedback delay (the DelayNode echo loop in useRealAudioEngine.ts)
+- convolution reverb (ConvolverNode with normalization, dry/wet mix as in
+  FLX10DeckPro.tsx)
+
+Audio is processed in fixed-size blocks held in preallocated buffers. Each
+effect transforms a whole block with array operations (lfilter for biquads,
+ring-buffer slices for the delay, partitioned FFT convolution for the
+reverb), so there are no per-sample Python loops and memory stays constant
+regardless of clip length.
+
+Effects are given as names ("reverb") or dicts ({"type": "delay", "time": 0.25}).
+
+Usage:
+    python dsp_engine.py input.wav preview.wav --effects '["eq", {"type": "reverb", "mix": 0.3}]' --start 30 --duration 15
+    python dsp_engine.py --jobs previews.json --workers 8
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import argparse
+import json
+import logging
+import math
+import os
+
+import numpy as np
+from scipy.signal import lfilter
+
+from audio_io import AudioDecodeError, load_audio, write_wav
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Frames per processing block (a multiple of the Web Audio render quantum)
+DEFAULT_BLOCK_SIZE = 1024
+RENDER_QUANTUM = 128
+DEFAULT_SAMPLE_RATE = 44100
+OUTPUT_CHANNELS = 2
+# Delay and reverb tails are rendered until they fall below this level
+TAIL_THRESHOLD = 1e-3
+MAX_TAIL_SEC = 10.0
+
+# Mirrors src/config/audio.ts
+EQ_CONFIG = {
+    "low": {"type": "lowshelf", "frequency": 250.0, "gain_range_db": 12.0},
+    "mid": {"type": "peaking", "frequency": 1000.0, "q": 1.0, "gain_range_db": 12.0},
+    "high": {"type": "highshelf", "frequency": 4000.0, "gain_range_db": 12.0},
+}
+
+# Settings used when an effect is requested by name only
+EFFECT_DEFAULTS = {
+    "gain": {"gain": 1.0},
+    "filter": {"filter_type": "lowpass", "frequency": 350.0, "q": 1.0, "gain": 0.0},
+    "eq": {"low": 0.0, "mid": 0.0, "high": 0.0},
+    # Echo loop from useRealAudioEngine.ts: 300 ms, feedback gain 0.4
+    "delay": {"time": 0.3, "feedback": 0.4, "wet": 0.5, "dry": 1.0},
+    # Generated 2 s impulse from FLX10DeckPro.tsx
+    "reverb": {"mix": 0.3, "seconds": 2.0, "decay": 2.0, "impulse": None, "normalize": True, "seed": 0},
+}
+
+# Web Audio node names reported for each effect type
+WEB_AUDIO_NODES = {
+    "gain": ["GainNode"],
+    "filter": ["BiquadFilterNode"],
+    "eq": ["BiquadFilterNode", "BiquadFilterNode", "BiquadFilterNode"],
+    "delay": ["DelayNode", "GainNode", "GainNode"],
+    "reverb": ["ConvolverNode", "GainNode", "GainNode"],
+}
+
+FILTER_TYPES = ("lowpass", "highpass", "bandpass", "lowshelf", "highshelf", "peaking", "notch", "allpass")
+
+# =============================================================================
+# PARAMETER MAPPING
+# =============================================================================
+
+def map_highpass_frequency(value: float) -> float:
+    """DJ filter knob in [-100, 100] to a high-pass cutoff (mapHighpassFrequency)."""
+    clamped = max(-100.0, min(100.0, value))
+    if clamped <= 0:
+        return 1000.0
+    return 20.0 + (clamped / 100.0) * 10000.0
+
+def map_lowpass_frequency(value: float) -> float:
+    """DJ filter knob in [-100, 100] to a low-pass cutoff (mapLowpassFrequency)."""
+    clamped = max(-100.0, min(100.0, value))
+    if clamped >= 0:
+        return 1000.0
+    return 20000.0 + (clamped / 100.0) * 19000.0
+
+def biquad_coefficients(filter_type: str, frequency: float, sample_rate: int,
+                        q: float = 1.0, gain_db: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalized (b, a) coefficients of a BiquadFilterNode.
+
+    Follows the Web Audio spec formulas: lowpass/highpass take Q in dB,
+    shelves use a fixed slope of 1, and the frequency is clamped to Nyquist.
+
+    Args:
+        filter_type: One of FILTER_TYPES
+        frequency: Frequency in Hz
+        sample_rate: Sample rate in Hz
+        q: Q factor
+        gain_db: Gain for shelf and peaking filters
+
+    Returns:
+        (b, a) arrays of length 3 with a[0] == 1
+    """
+    if filter_type not in FILTER_TYPES:
+        raise ValueError(f"Unknown filter type {filter_type!r}; expected one of {FILTER_TYPES}")
+    nyquist = sample_rate / 2.0
+    frequency = min(max(frequency, 0.0), nyquist)
+    w0 = 2.0 * math.pi * frequency / sample_rate
+    cos_w0, sin_w0 = math.cos(w0), math.sin(w0)
+    a_gain = 10.0 ** (gain_db / 40.0)
+    alpha_q = sin_w0 / (2.0 * q) if q > 0 else float("inf")
+    alpha_q_db = sin_w0 / (2.0 * 10.0 ** (q / 20.0))
+    alpha_s = sin_w0 / 2.0 * math.sqrt(2.0)
+    sqrt_a = math.sqrt(a_gain)
+
+    if filter_type == "lowpass":
+        b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        a = [1 + alpha_q_db, -2 * cos_w0, 1 - alpha_q_db]
+    elif filter_type == "highpass":
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        a = [1 + alpha_q_db, -2 * cos_w0, 1 - alpha_q_db]
+    elif filter_type == "bandpass":
+        b = [alpha_q, 0.0, -alpha_q]
+        a = [1 + alpha_q, -2 * cos_w0, 1 - alpha_q]
+    elif filter_type == "notch":
+        b = [1.0, -2 * cos_w0, 1.0]
+        a = [1 + alpha_q, -2 * cos_w0, 1 - alpha_q]
+    elif filter_type == "allpass":
+        b = [1 - alpha_q, -2 * cos_w0, 1 + alpha_q]
+        a = [1 + alpha_q, -2 * cos_w0, 1 - alpha_q]
+    elif filter_type == "peaking":
+        b = [1 + alpha_q * a_gain, -2 * cos_w0, 1 - alpha_q * a_gain]
+        a = [1 + alpha_q / a_gain, -2 * cos_w0, 1 - alpha_q / a_gain]
+    elif filter_type == "lowshelf":
+        b = [a_gain * ((a_gain + 1) - (a_gain - 1) * cos_w0 + 2 * alpha_s * sqrt_a),
+             2 * a_gain * ((a_gain - 1) - (a_gain + 1) * cos_w0),
+             a_gain * ((a_gain + 1) - (a_gain - 1) * cos_w0 - 2 * alpha_s * sqrt_a)]
+        a = [(a_gain + 1) + (a_gain - 1) * cos_w0 + 2 * alpha_s * sqrt_a,
+             -2 * ((a_gain - 1) + (a_gain + 1) * cos_w0),
+             (a_gain + 1) + (a_gain - 1) * cos_w0 - 2 * alpha_s * sqrt_a]
+    else:  # highshelf
+        b = [a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 + 2 * alpha_s * sqrt_a),
+             -2 * a_gain * ((a_gain - 1) + (a_gain + 1) * cos_w0),
+             a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 - 2 * alpha_s * sqrt_a)]
+        a = [(a_gain + 1) - (a_gain - 1) * cos_w0 + 2 * alpha_s * sqrt_a,
+             2 * ((a_gain - 1) - (a_gain + 1) * cos_w0),
+             (a_gain + 1) - (a_gain - 1) * cos_w0 - 2 * alpha_s * sqrt_a]
+
+    b_arr, a_arr = np.array(b, dtype=np.float64), np.array(a, dtype=np.float64)
+    return b_arr / a_arr[0], a_arr / a_arr[0]
+
+def generated_impulse(sample_rate: int, seconds: float = 2.0, decay: float = 2.0,
+                      channels: int = 2, seed: Optional[int] = 0) -> np.ndarray:
+    """
+    Noise impulse response with a polynomial decay, as generated in FLX10DeckPro.tsx.
+
+    Returns:
+        Array of shape (frames, channels)
+    """
+    length = max(1, int(sample_rate * seconds))
+    rng = np.random.default_rng(seed)
+    envelope = (1.0 - np.arange(length) / length) ** decay
+    return (rng.uniform(-1.0, 1.0, size=(length, channels)) * envelope[:, None]).astype(np.float32)
+
+def convolver_normalization(impulse: np.ndarray, sample_rate: int) -> float:
+    """
+    Scale a ConvolverNode applies to its buffer when normalize is true.
+
+    Matches the browser's equal-power normalization with its -58 dB gain
+    calibration referenced to 44.1 kHz.
+    """
+    power = math.sqrt(float(np.sum(np.square(impulse, dtype=np.float64))) / impulse.size)
+    scale = 1.0 / max(power, 0.000125)
+    scale *= 10.0 ** (-58.0 * 0.05)
+    scale *= 44100.0 / sample_rate
+    if impulse.shape[1] == 4:
+        scale *= 0.5
+    return scale
+
+# =============================================================================
+# BLOCK PROCESSORS
+# =============================================================================
+
+class GainProcessor:
+    """GainNode: constant linear gain."""
+
+    def __init__(self, gain: float):
+        self.gain = float(gain)
+        self.tail_frames = 0
+
+    def process(self, block: np.ndarray) -> None:
+        block *= self.gain
+
+class BiquadProcessor:
+    """One or more BiquadFilterNodes in series, with filter state carried across blocks."""
+
+    def __init__(self, coefficients: Sequence[Tuple[np.ndarray, np.ndarray]], channels: int):
+        self.coefficients = list(coefficients)
+        self.state = [np.zeros((2, channels)) for _ in self.coefficients]
+        self.tail_frames = 0
+
+    def process(self, block: np.ndarray) -> None:
+        for index, (b, a) in enumerate(self.coefficients):
+            filtered, self.state[index] = lfilter(b, a, block, axis=0, zi=self.state[index])
+            block[...] = filtered
+
+class DelayProcessor:
+    """
+    Feedback echo as wired in the browser:
+
+        input -> DelayNode -> wet GainNode -> feedback GainNode -> DelayNode
+        output = dry * input + wet * delayed
+
+    The delay line is a ring buffer of the signal entering the DelayNode.
+    Blocks are processed in chunks no longer than the delay, so every sample
+    read from the line was written by an earlier chunk.
+    """
+
+    def __init__(self, time_sec: float, feedback: float, wet: float, dry: float,
+                 sample_rate: int, channels: int):
+        # A DelayNode inside a cycle is clamped to at least one render quantum
+        self.delay_frames = max(RENDER_QUANTUM, int(round(time_sec * sample_rate)))
+        self.feedback = float(feedback)
+        self.wet = float(wet)
+        self.dry = float(dry)
+        self.line = np.zeros((self.delay_frames, channels), dtype=np.float32)
+        self.position = 0
+        # Each pass around the loop scales the echo by feedback * wet
+        loop_gain = abs(self.feedback * self.wet)
+        if loop_gain >= 1:
+            self.tail_frames = int(MAX_TAIL_SEC * sample_rate)
+        else:
+            repeats = 1 if loop_gain == 0 else math.ceil(math.log(TAIL_THRESHOLD) / math.log(loop_gain))
+            self.tail_frames = self.delay_frames * repeats
+
+    def process(self, block: np.ndarray) -> None:
+        start = 0
+        while start < len(block):
+            # Stop at the delay length and at the ring buffer's end, so both are plain slices
+            length = min(len(block) - start, self.delay_frames - self.position)
+            chunk = block[start:start + length]
+            line = self.line[self.position:self.position + length]
+            delayed = line * self.wet
+            line[...] = chunk + delayed * self.feedback
+            chunk *= self.dry
+            chunk += delayed
+            self.position = (self.position + length) % self.delay_frames
+            start += length
+
+class ConvolverProcessor:
+    """
+    ConvolverNode with dry/wet gains, as uniformly partitioned overlap-save.
+
+    The impulse response is split into block-sized partitions whose spectra
+    are computed once. Each block's spectrum goes into a frequency-domain
+    delay line, and the output is the sum of delayed spectra times partition
+    spectra: one FFT, one multiply-accumulate and one inverse FFT per block,
+    with no latency beyond the block itself.
+    """
+
+    def __init__(self, impulse: np.ndarray, mix: float, block_size: int, channels: int,
+                 sample_rate: int, normalize: bool = True):
+        if impulse.ndim == 1:
+            impulse = impulse[:, None]
+        if normalize:
+            impulse = impulse * convolver_normalization(impulse, sample_rate)
+        if impulse.shape[1] != channels:
+            # Mono responses are shared by every channel; extra channels are dropped
+            impulse = np.repeat(impulse[:, :1], channels, axis=1) if impulse.shape[1] == 1 else impulse[:, :channels]
+        self.block_size = block_size
+        self.dry = 1.0 - mix
+        self.wet = mix
+        partitions = max(1, math.ceil(len(impulse) / block_size))
+        padded = np.zeros((partitions * block_size, channels), dtype=np.float64)
+        padded[:len(impulse)] = impulse
+        segments = padded.reshape(partitions, block_size, channels)
+        self.spectra = np.fft.rfft(segments, n=2 * block_size, axis=1)
+        self.history = np.zeros_like(self.spectra)
+        self.window = np.zeros((2 * block_size, channels), dtype=np.float64)
+        self.newest = 0
+        self.order = np.arange(partitions)
+        self.tail_frames = len(impulse)
+
+    def process(self, block: np.ndarray) -> None:
+        size = self.block_size
+        partitions = len(self.spectra)
+        self.window[:size] = self.window[size:]
+        self.window[size:] = block
+        self.newest = (self.newest + 1) % partitions
+        self.history[self.newest] = np.fft.rfft(self.window, axis=0)
+        # history[newest - k] pairs with partition k
+        delayed = self.history[(self.newest - self.order) % partitions]
+        spectrum = np.einsum("kfc,kfc->fc", delayed, self.spectra)
+        wet = np.fft.irfft(spectrum, n=2 * size, axis=0)[size:]
+        block *= self.dry
+        block += (wet * self.wet).astype(block.dtype)
+
+# =============================================================================
+# EFFECT CHAINS
+# =============================================================================
+
+EffectSpec = Union[str, Dict[str, Any]]
+
+def normalize_effects(effects: Optional[Iterable[EffectSpec]]) -> List[Dict[str, Any]]:
+    """
+    Effect names or partial dicts to full parameter dicts.
+
+    Raises:
+        ValueError: For unknown effect types or parameters
+    """
+    normalized = []
+    for effect in effects or []:
+        spec = {"type": effect} if isinstance(effect, str) else dict(effect)
+        effect_type = spec.pop("type", None)
+        if effect_type not in EFFECT_DEFAULTS:
+            raise ValueError(f"Unknown effect {effect_type!r}; expected one of {sorted(EFFECT_DEFAULTS)}")
+        params = dict(EFFECT_DEFAULTS[effect_type])
+        # The DJ filter knob ("value" in [-100, 100]) picks the type and cutoff like setFilter()
+        if effect_type == "filter" and "value" in spec:
+            value = float(spec.pop("value"))
+            if value > 0:
+                params.update(filter_type="highpass", frequency=map_highpass_frequency(value))
+            elif value < 0:
+                params.update(filter_type="lowpass", frequency=map_lowpass_frequency(value))
+            else:
+                params.update(filter_type="allpass", frequency=1000.0)
+        unknown = set(spec) - set(params)
+        if unknown:
+            raise ValueError(f"Unknown parameter(s) {sorted(unknown)} for effect {effect_type!r}")
+        params.update(spec)
+        normalized.append({"type": effect_type, **params})
+    return normalized
+
+def web_audio_nodes(effects: Optional[Iterable[EffectSpec]]) -> List[str]:
+    """Browser node graph equivalent to an effect chain, source to destination."""
+    nodes = ["AudioBufferSourceNode"]
+    for effect in normalize_effects(effects):
+        nodes.extend(WEB_AUDIO_NODES[effect["type"]])
+    return nodes + ["AudioDestinationNode"]
+
+def _build_processor(effect: Dict[str, Any], sample_rate: int, channels: int, block_size: int):
+    effect_type = effect["type"]
+    if effect_type == "gain":
+        return GainProcessor(effect["gain"])
+    if effect_type == "filter":
+        coefficients = biquad_coefficients(effect["filter_type"], effect["frequency"], sample_rate,
+                                           effect["q"], effect["gain"])
+        return BiquadProcessor([coefficients], channels)
+    if effect_type == "eq":
+        bands = []
+        for band, config in EQ_CONFIG.items():
+            gain = max(-config["gain_range_db"], min(config["gain_range_db"], float(effect[band])))
+            bands.append(biquad_coefficients(config["type"], config["frequency"], sample_rate,
+                                             config.get("q", 1.0), gain))
+        return BiquadProcessor(bands, channels)
+    if effect_type == "delay":
+        return DelayProcessor(effect["time"], effect["feedback"], effect["wet"], effect["dry"],
+                              sample_rate, channels)
+    if effect["impulse"]:
+        impulse, _ = load_audio(effect["impulse"], sample_rate=sample_rate)
+    else:
+        impulse = generated_impulse(sample_rate, effect["seconds"], effect["decay"], seed=effect["seed"])
+    return ConvolverProcessor(impulse, effect["mix"], block_size, channels, sample_rate, effect["normalize"])
+
+class EffectChain:
+    """
+    Serial chain of block processors sharing one preallocated block buffer.
+
+    Usage:
+        chain = EffectChain(["eq", {"type": "delay", "time": 0.25}], 44100)
+        rendered = chain.render(audio)
+    """
+
+    def __init__(self, effects: Optional[Iterable[EffectSpec]], sample_rate: int,
+                 channels: int = OUTPUT_CHANNELS, block_size: int = DEFAULT_BLOCK_SIZE):
+        self.effects = normalize_effects(effects)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.processors = [_build_processor(effect, sample_rate, channels, block_size) for effect in self.effects]
+        self.block = np.zeros((block_size, channels), dtype=np.float32)
+
+    @property
+    def tail_frames(self) -> int:
+        tail = sum(processor.tail_frames for processor in self.processors)
+        return min(tail, int(MAX_TAIL_SEC * self.sample_rate))
+
+    def render(self, audio: np.ndarray, include_tail: bool = True) -> np.ndarray:
+        """
+        Render audio through the chain.
+
+        Args:
+            audio: Input of shape (frames,) or (frames, channels); mono input
+                is duplicated across the chain's channels
+            include_tail: Append the delay/reverb tail after the input ends
+
+        Returns:
+            float32 array of shape (frames [+ tail], channels)
+        """
+        if audio.ndim == 1:
+            audio = audio[:, None]
+        if audio.shape[1] != self.channels:
+            audio = np.repeat(audio[:, :1], self.channels, axis=1) if audio.shape[1] == 1 else audio[:, :self.channels]
+        total = len(audio) + (self.tail_frames if include_tail else 0)
+        output = np.empty((total, self.channels), dtype=np.float32)
+        block = self.block
+        for start in range(0, total, self.block_size):
+            available = max(0, min(self.block_size, len(audio) - start))
+            block[:available] = audio[start:start + available]
+            block[available:] = 0.0
+            for processor in self.processors:
+                processor.process(block)
+            end = min(start + self.block_size, total)
+            output[start:end] = block[:end - start]
+        return output
+
+    def stream(self, chunks: Iterable[np.ndarray], include_tail: bool = True) -> Iterator[np.ndarray]:
+        """
+        Process a stream of chunks of any size, for input too long to hold in memory.
+
+        Chunks must already have the chain's channel count. The yielded
+        arrays are views of the chain's block buffer and are only valid until
+        the next item is requested; copy them to keep them.
+
+        Args:
+            chunks: Input chunks of shape (frames, channels)
+            include_tail: Continue with the delay/reverb tail after the input ends
+
+        Yields:
+            Processed blocks of block_size frames (the last one may be shorter)
+        """
+        block = self.block
+        filled = 0
+        for chunk in chunks:
+            offset = 0
+            while offset < len(chunk):
+                taken = min(self.block_size - filled, len(chunk) - offset)
+                block[filled:filled + taken] = chunk[offset:offset + taken]
+                filled += taken
+                offset += taken
+                if filled == self.block_size:
+                    for processor in self.processors:
+                        processor.process(block)
+                    yield block
+                    filled = 0
+        remaining = filled + (self.tail_frames if include_tail else 0)
+        while remaining > 0:
+            block[filled:] = 0.0
+            for processor in self.processors:
+                processor.process(block)
+            yield block[:min(remaining, self.block_size)]
+            remaining -= self.block_size
+            filled = 0
+
+# =============================================================================
+# RENDERING
+# =============================================================================
+
+def render_file(input_path: str, output_path: str, effects: Optional[Iterable[EffectSpec]],
+                start_sec: float = 0.0, duration_sec: Optional[float] = None,
+                sample_rate: int = DEFAULT_SAMPLE_RATE, include_tail: bool = True,
+                block_size: int = DEFAULT_BLOCK_SIZE) -> Dict[str, Any]:
+    """
+    Render a clip of an audio file through an effect chain to a 16-bit WAV.
+
+    Args:
+        input_path: Source audio
+        output_path: WAV file to write
+        effects: Effect chain
+        start_sec: Clip start within the source
+        duration_sec: Clip length (None renders to the end)
+        sample_rate: Output sample rate
+        include_tail: Keep the delay/reverb tail after the clip
+        block_size: Frames per processing block
+
+    Returns:
+        Render summary (frames, duration, peak level)
+    """
+    chain = EffectChain(effects, sample_rate, block_size=block_size)
+    audio, _ = load_audio(input_path, sample_rate=sample_rate)
+    first = int(start_sec * sample_rate)
+    last = len(audio) if duration_sec is None else min(len(audio), first + int(duration_sec * sample_rate))
+    rendered = chain.render(audio[first:last], include_tail=include_tail)
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    write_wav(output_path, rendered, sample_rate)
+    peak = float(np.max(np.abs(rendered))) if len(rendered) else 0.0
+    return {
+        "input_file": input_path,
+        "output_file": output_path,
+        "effects": chain.effects,
+        "sample_rate": sample_rate,
+        "channels": chain.channels,
+        "frames": len(rendered),
+        "duration_sec": round(len(rendered) / sample_rate, 3),
+        "peak_dbfs": round(20 * math.log10(peak), 2) if peak > 0 else None,
+        "clipped": peak > 1.0,
+    }
+
+def _render_task(job: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[str]]:
+    """Worker entry point: never raises, so one bad job does not stop the pool."""
+    try:
+        return job, render_file(job["input"], job["output"], job.get("effects"), job.get("start", 0.0),
+                                job.get("duration"), job.get("sample_rate", DEFAULT_SAMPLE_RATE),
+                                job.get("tail", True)), None
+    except (AudioDecodeError, OSError, ValueError, KeyError) as e:
+        return job, None, str(e)
+
+def render_previews(jobs: Iterable[Dict[str, Any]], workers: Optional[int] = None) -> Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Render many preview clips across processes.
+
+    Args:
+        jobs: Dicts with input, output and optional effects, start, duration,
+            sample_rate and tail keys
+        workers: Worker processes (defaults to the CPU count)
+
+    Yields:
+        (job, summary, error) in input order
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        for job in jobs:
+            yield _render_task(job)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        yield from executor.map(_render_task, jobs, chunksize=4)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render Web Audio effect chains offline")
+    parser.add_argument("input", nargs="?", help="Source audio file")
+    parser.add_argument("output", nargs="?", help="Output WAV file")
+    parser.add_argument("--effects", default="[]", help="JSON list of effect names or dicts")
+    parser.add_argument("--start", type=float, default=0.0, help="Clip start in seconds")
+    parser.add_argument("--duration", type=float, help="Clip length in seconds")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE, help="Output sample rate")
+    parser.add_argument("--no-tail", action="store_true", help="Cut the delay/reverb tail at the clip end")
+    parser.add_argument("--jobs", help="JSON file with a list of render jobs (batch mode)")
+    parser.add_argument("--workers", type=int, help="Worker processes for batch mode (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.jobs:
+        with open(args.jobs, "r", encoding="utf-8") as f:
+            jobs = json.load(f)
+        failed = 0
+        for job, summary, error in render_previews(jobs, args.workers):
+            if error:
+                failed += 1
+                logger.warning(f"⚠️ Could not render {job.get('output')}: {error}")
+        logger.info(f"✅ Rendered {len(jobs) - failed} of {len(jobs)} preview(s)")
+        return
+    if not args.input or not args.output:
+        parser.error("input and output are required unless --jobs is given")
+    summary = render_file(args.input, args.output, json.loads(args.effects), args.start, args.duration,
+                          args.sample_rate, not args.no_tail)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+EDM Shuffle Festival Deduplication Index
+
+Merges the same festival reported by several scraped sources into one
+canonical record. Each incoming record is:
+
+1. Normalized - accents, punctuation, years and filler words ("festival",
+   "presents", ...) are stripped from the name.
+2. Blocked - only canonical festivals whose start date falls within
+   date_window_days and whose geohash cell is the same or adjacent are
+   considered as candidates. Records without a start date are compared
+   with dateless festivals whose names start the same way.
+3. Fuzzy matched - candidates are compared by normalized-name similarity.
+4. Merged - a match folds the record into the existing canonical festival,
+   otherwise a new canonical ID is created.
+
+The index lives in SQLite with the block key indexed, so each nightly run only
+looks up the handful of candidates in its blocks instead of comparing all
+pairs, and records seen on earlier runs map straight to their canonical ID.
+"""
+
+from datetime import date
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(".cache", "festival_dedupe.sqlite3")
+DEFAULT_NAME_THRESHOLD = 0.85
+DEFAULT_DATE_WINDOW_DAYS = 3
+DEFAULT_GEOHASH_PRECISION = 4  # ~39km x 20km cells
+SUBSET_SIMILARITY = 0.9
+# A name contained in another only scores SUBSET_SIMILARITY when the shared
+# part is distinctive: two or more words, or one word at least this long
+SUBSET_MIN_WORD_LENGTH = 5
+# Records without a start date are blocked by the first characters of their name
+NAME_BLOCK_CHARS = 4
+
+FILLER_WORDS = {
+    "the", "festival", "fest", "music", "presents", "edition", "official",
+    "weekend", "and", "of", "edm", "tickets",
+}
+
+# =============================================================================
+# NORMALIZATION AND BLOCKING
+# =============================================================================
+
+def normalize_name(name: Optional[str]) -> str:
+    """
+    Normalize a festival name for comparison.
+
+    "Ultra Music Festival 2025" and "ULTRA Miami - Festival" normalize to
+    "ultra" and "ultra miami".
+    """
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace("&", " and ")
+    text = re.sub(r"\b(19|20)\d{2}\b", " ", text)
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(word for word in text.split() if word not in FILLER_WORDS)
+
+def name_similarity(a: str, b: str) -> float:
+    """Similarity of two normalized names in [0, 1]."""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    a_words, b_words = set(a.split()), set(b.split())
+    # One source often adds the city or edition: "ultra" vs "ultra miami";
+    # a short single word ("day" in "day dead") is too generic to count
+    shared = a_words & b_words
+    if (a_words <= b_words or b_words <= a_words) and (
+            len(shared) >= 2 or len(next(iter(shared))) >= SUBSET_MIN_WORD_LENGTH):
+        return SUBSET_SIMILARITY
+    # Word-order insensitive so "miami ultra" matches "ultra miami"
+    a_sorted = " ".join(sorted(a.split()))
+    b_sorted = " ".join(sorted(b.split()))
+    return max(SequenceMatcher(None, a, b).ratio(),
+               SequenceMatcher(None, a_sorted, b_sorted).ratio())
+
+def name_block(norm_name: str) -> str:
+    """Blocking key for records without a start date: the start of the first word."""
+    words = norm_name.split()
+    return words[0][:NAME_BLOCK_CHARS] if words else ""
+
+def parse_date(value: Any) -> Optional[date]:
+    """Parse the date part of an ISO date/datetime string."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(latitude: float, longitude: float, precision: int) -> str:
+    """Encode a coordinate as a geohash string."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+def geohash_neighborhood(latitude: float, longitude: float, precision: int) -> List[str]:
+    """The geohash cell containing a coordinate plus its eight neighbours."""
+    lon_bits = (precision * 5 + 1) // 2
+    lat_bits = precision * 5 // 2
+    lat_step = 180.0 / (1 << lat_bits)
+    lon_step = 360.0 / (1 << lon_bits)
+    cells = set()
+    for dlat in (-lat_step, 0.0, lat_step):
+        for dlon in (-lon_step, 0.0, lon_step):
+            lat = max(-90.0, min(90.0, latitude + dlat))
+            lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(lat, lon, precision))
+    return sorted(cells)
+
+def _coordinates(record: Dict[str, Any]):
+    try:
+        return float(record["latitude"]), float(record["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS festivals (
+    canonical_id TEXT PRIMARY KEY,
+    norm_name TEXT NOT NULL,
+    start_ordinal INTEGER,
+    date_block INTEGER,
+    geohash TEXT,
+    record TEXT NOT NULL,
+    name_block TEXT
+);
+CREATE INDEX IF NOT EXISTS festivals_block ON festivals (date_block, geohash);
+CREATE TABLE IF NOT EXISTS aliases (
+    source_key TEXT PRIMARY KEY,
+    canonical_id TEXT NOT NULL
+);
+"""
+
+def _source_key(record: Dict[str, Any]) -> str:
+    key = "|".join(str(record.get(field) or "") for field in ("source_url", "url", "name", "start_date"))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def _merge(canonical: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold a source record into a canonical festival record."""
+    merged = dict(canonical)
+    for field, value in record.items():
+        if field in ("lineup", "sources", "canonical_id"):
+            continue
+        if merged.get(field) in (None, "", []) and value not in (None, "", []):
+            merged[field] = value
+
+    lineup = list(merged.get("lineup") or [])
+    for artist in record.get("lineup") or []:
+        if artist not in lineup:
+            lineup.append(artist)
+    merged["lineup"] = lineup
+
+    sources = list(merged.get("sources") or [])
+    source = record.get("source_url") or record.get("url")
+    if source and source not in sources:
+        sources.append(source)
+    merged["sources"] = sources
+    return merged
+
+class FestivalDedupeIndex:
+    """
+    Persistent blocking + fuzzy-match index mapping festival records to canonical IDs.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH,
+                 name_threshold: float = DEFAULT_NAME_THRESHOLD,
+                 date_window_days: int = DEFAULT_DATE_WINDOW_DAYS,
+                 geohash_precision: int = DEFAULT_GEOHASH_PRECISION):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway index)
+            name_threshold: Minimum normalized-name similarity for a match
+            date_window_days: Maximum start date difference for a match
+            geohash_precision: Geohash length used for location blocking
+        """
+        self.name_threshold = name_threshold
+        self.date_window_days = date_window_days
+        self.geohash_precision = geohash_precision
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """Add and backfill name_block for indexes created before it existed."""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(festivals)")}
+        with self.conn:
+            if "name_block" not in columns:
+                self.conn.execute("ALTER TABLE festivals ADD COLUMN name_block TEXT")
+            rows = self.conn.execute("SELECT canonical_id, norm_name FROM festivals WHERE name_block IS NULL").fetchall()
+            self.conn.executemany("UPDATE festivals SET name_block = ? WHERE canonical_id = ?",
+                                  [(name_block(norm_name), canonical_id) for canonical_id, norm_name in rows])
+            self.conn.execute("CREATE INDEX IF NOT EXISTS festivals_name_block ON festivals (date_block, name_block)")
+
+    def _block_of(self, record: Dict[str, Any]):
+        start = parse_date(record.get("start_date"))
+        ordinal = start.toordinal() if start else None
+        date_block = ordinal // self.date_window_days if ordinal is not None else None
+        coords = _coordinates(record)
+        geohash = geohash_encode(*coords, self.geohash_precision) if coords else None
+        return ordinal, date_block, geohash
+
+    def _candidates(self, record: Dict[str, Any]) -> List[tuple]:
+        ordinal, date_block, _ = self._block_of(record)
+        coords = _coordinates(record)
+
+        if date_block is None:
+            # Without a date the block would be every dateless record ever
+            # stored, so narrow it to names starting the same way
+            date_clause = "date_block IS NULL AND name_block = ?"
+            date_params = [name_block(normalize_name(record.get("name")))]
+        else:
+            date_clause = "date_block BETWEEN ? AND ?"
+            date_params = [date_block - 1, date_block + 1]
+
+        # Records without coordinates can match any location in the date
+        # block; records with coordinates also match festivals whose
+        # location is unknown
+        if coords:
+            cells = geohash_neighborhood(*coords, self.geohash_precision)
+            geo_clause = f"(geohash IS NULL OR geohash IN ({','.join('?' * len(cells))}))"
+            geo_params = cells
+        else:
+            geo_clause, geo_params = "1", []
+
+        rows = self.conn.execute(
+            f"SELECT canonical_id, norm_name, start_ordinal, record FROM festivals "
+            f"WHERE {date_clause} AND {geo_clause}",
+            date_params + geo_params,
+        ).fetchall()
+
+        if ordinal is None:
+            return rows
+        return [row for row in rows if row[2] is not None and abs(row[2] - ordinal) <= self.date_window_days]
+
+    def _match(self, record: Dict[str, Any], norm_name: str) -> Optional[tuple]:
+        best, best_score = None, self.name_threshold
+        for row in self._candidates(record):
+            score = name_similarity(norm_name, row[1])
+            if score >= best_score:
+                best, best_score = row, score
+        return best
+
+    def add(self, record: Dict[str, Any]) -> str:
+        """
+        Add a scraped record, merging it into its canonical festival.
+
+        Args:
+            record: Festival record from the scraper
+
+        Returns:
+            Canonical ID the record was assigned to
+        """
+        source_key = _source_key(record)
+        norm_name = normalize_name(record.get("name"))
+
+        row = self.conn.execute(
+            "SELECT canonical_id FROM aliases WHERE source_key = ?", (source_key,)
+        ).fetchone()
+        if row:
+            canonical_id = row[0]
+            existing = self.get(canonical_id)
+        else:
+            match = self._match(record, norm_name)
+            if match:
+                canonical_id, existing = match[0], json.loads(match[3])
+            else:
+                seed = f"{norm_name}|{record.get('start_date') or ''}|{source_key}"
+                canonical_id = hashlib.sha1(seed.encode("utf-8")).hexdigest()[:16]
+                existing = None
+
+        merged = _merge(existing or {"canonical_id": canonical_id}, record)
+        merged["canonical_id"] = canonical_id
+        ordinal, date_block, geohash = self._block_of(merged)
+
+        with self.conn:
+            merged_name = normalize_name(merged.get("name"))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO festivals "
+                "(canonical_id, norm_name, start_ordinal, date_block, geohash, record, name_block) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (canonical_id, merged_name, ordinal, date_block, geohash, json.dumps(merged),
+                 name_block(merged_name)),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO aliases VALUES (?, ?)", (source_key, canonical_id)
+            )
+        return canonical_id
+
+    def get(self, canonical_id: str) -> Optional[Dict[str, Any]]:
+        """Return the canonical festival record for an ID."""
+        row = self.conn.execute(
+            "SELECT record FROM festivals WHERE canonical_id = ?", (canonical_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def dedupe(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Add every record, then yield each canonical festival touched by this batch once.
+
+        Args:
+            records: Iterable of scraped festival records
+
+        Yields:
+            Merged canonical festival records (with canonical_id and sources)
+        """
+        touched: Dict[str, None] = {}
+        count = 0
+        for record in records:
+            touched[self.add(record)] = None
+            count += 1
+        logger.info(f"Deduplicated {count} records into {len(touched)} festivals")
+        for canonical_id in touched:
+            yield self.get(canonical_id)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,394 @@
+"""
+EDM Shuffle Festival Scraping Engine
+
+Concurrent scraper behind WebScrapeFestivalTool. Listing pages are fetched on a
+bounded thread pool with one keep-alive session per host, and parsed festival
+records are yielded as soon as each page finishes rather than after the whole
+run. Pages are queued per host and only handed to a worker once their host's
+rate-limit slot is due, so a long run of pages for one site never ties up the
+pool while other sites wait.
+
+When a ScrapeCache is supplied, pages are revalidated with conditional GETs
+and a 304 Not Modified reuses the records parsed on the previous run.
+
+Page parsing is driven by a pluggable parser table keyed by host. Every host
+currently falls back to the schema.org JSON-LD event parser; register
+site-specific parsers with register_parser() as they are written.
+
+IMPORTANT: This follows CLAUDE_INTEGRITY_RULES.md - no fabricated capabilities.
+Records only contain what the parser actually found on the page.
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scrape_cache import ScrapeCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "EDMShuffleFestivalScout/1.0 (+https://edmshuffle.com)"
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_HOST_INTERVAL = 1.0  # seconds between requests to the same host
+DEFAULT_TIMEOUT = 15
+
+Parser = Callable[[str, str], Iterable[Dict[str, Any]]]
+
+# =============================================================================
+# PARSERS
+# =============================================================================
+
+class _JsonLdExtractor(HTMLParser):
+    """Collects the bodies of <script type="application/ld+json"> blocks."""
+
+    def __init__(self):
+        super().__init__()
+        self.blocks: List[str] = []
+        self._in_json_ld = False
+        self._buffer: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script" and dict(attrs).get("type", "").lower() == "application/ld+json":
+            self._in_json_ld = True
+            self._buffer = []
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._in_json_ld:
+            self.blocks.append("".join(self._buffer))
+            self._in_json_ld = False
+
+    def handle_data(self, data):
+        if self._in_json_ld:
+            self._buffer.append(data)
+
+EVENT_TYPES = {"Event", "MusicEvent", "Festival"}
+
+def _iter_json_ld_nodes(node: Any) -> Iterator[Dict[str, Any]]:
+    """Walk a JSON-LD document, yielding every object (including @graph members)."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _iter_json_ld_nodes(item)
+    elif isinstance(node, dict):
+        yield node
+        for key in ("@graph", "itemListElement", "item", "subEvent"):
+            if key in node:
+                yield from _iter_json_ld_nodes(node[key])
+
+def _is_event(node: Dict[str, Any]) -> bool:
+    node_type = node.get("@type")
+    types = node_type if isinstance(node_type, list) else [node_type]
+    return any(t in EVENT_TYPES for t in types)
+
+def _event_to_record(node: Dict[str, Any], page_url: str) -> Dict[str, Any]:
+    location = node.get("location") or {}
+    if isinstance(location, list):
+        location = location[0] if location else {}
+    if isinstance(location, str):
+        location = {"name": location}
+
+    address = location.get("address") or {}
+    if isinstance(address, dict):
+        address = ", ".join(
+            str(address[key])
+            for key in ("addressLocality", "addressRegion", "addressCountry")
+            if address.get(key)
+        )
+
+    geo = location.get("geo") or {}
+    performers = node.get("performer") or []
+    if isinstance(performers, dict):
+        performers = [performers]
+
+    return {
+        "name": node.get("name"),
+        "start_date": node.get("startDate"),
+        "end_date": node.get("endDate"),
+        "venue": location.get("name"),
+        "location": address or location.get("name"),
+        "latitude": geo.get("latitude"),
+        "longitude": geo.get("longitude"),
+        "lineup": [p.get("name") if isinstance(p, dict) else str(p) for p in performers],
+        "url": node.get("url") or page_url,
+        "source_url": page_url,
+    }
+
+def parse_json_ld_events(html: str, page_url: str) -> List[Dict[str, Any]]:
+    """
+    Extract festival records from schema.org Event/MusicEvent JSON-LD markup.
+
+    Args:
+        html: Page body
+        page_url: URL the page was fetched from
+
+    Returns:
+        List of festival records (empty if the page has no event markup)
+    """
+    extractor = _JsonLdExtractor()
+    extractor.feed(html)
+
+    records = []
+    for block in extractor.blocks:
+        try:
+            document = json.loads(block)
+        except ValueError:
+            logger.debug(f"Skipping malformed JSON-LD block on {page_url}")
+            continue
+        for node in _iter_json_ld_nodes(document):
+            if _is_event(node) and node.get("name"):
+                records.append(_event_to_record(node, page_url))
+    return records
+
+# Parser table keyed by host (without "www."). Hosts that are not listed use
+# DEFAULT_PARSER.
+PARSERS: Dict[str, Parser] = {
+    "edmidentity.com": parse_json_ld_events,
+    "festivalwizard.com": parse_json_ld_events,
+    "edm.com": parse_json_ld_events,
+}
+DEFAULT_PARSER: Parser = parse_json_ld_events
+
+def _host_of(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def register_parser(host: str, parser: Parser) -> None:
+    """
+    Register a page parser for a host.
+
+    Args:
+        host: Host name, with or without a leading "www."
+        parser: Callable taking (html, page_url) and returning festival records
+    """
+    PARSERS[_host_of(f"//{host}")] = parser
+
+def get_parser(url: str) -> Parser:
+    """Return the parser registered for a URL's host, or DEFAULT_PARSER."""
+    return PARSERS.get(_host_of(url), DEFAULT_PARSER)
+
+# =============================================================================
+# SCRAPER
+# =============================================================================
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host by a minimum interval.
+
+    The scheduler in FestivalScraper.scrape() polls try_acquire() and only
+    dispatches pages whose host is due; wait() is for single fetches outside
+    a scrape run and sleeps until the host's next free slot.
+    """
+
+    def __init__(self, default_interval: float = DEFAULT_HOST_INTERVAL,
+                 host_intervals: Optional[Dict[str, float]] = None):
+        self.default_interval = default_interval
+        self.host_intervals = dict(host_intervals or {})
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, host: str) -> float:
+        """
+        Take the host's slot if it is due.
+
+        Returns:
+            0.0 if the slot was taken, otherwise the seconds until it is due
+            (nothing is reserved)
+        """
+        interval = self.host_intervals.get(host, self.default_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = self._next_slot.get(host, now)
+            if slot > now:
+                return slot - now
+            self._next_slot[host] = now + interval
+            return 0.0
+
+    def wait(self, host: str) -> None:
+        interval = self.host_intervals.get(host, self.default_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class FestivalScraper:
+    """
+    Fetches festival listing pages concurrently and streams parsed records.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 host_interval: float = DEFAULT_HOST_INTERVAL,
+                 host_intervals: Optional[Dict[str, float]] = None,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 user_agent: str = DEFAULT_USER_AGENT,
+                 cache: Optional[ScrapeCache] = None):
+        """
+        Args:
+            max_workers: Maximum number of pages fetched at once
+            host_interval: Default minimum seconds between requests to one host
+            host_intervals: Per-host overrides for host_interval
+            timeout: Request timeout in seconds
+            user_agent: User-Agent header sent with every request
+            cache: Optional response cache used for conditional GETs
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.cache = cache
+        self.rate_limiter = HostRateLimiter(host_interval, host_intervals)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+
+    def _session_for(self, host: str) -> requests.Session:
+        """Return the keep-alive session for a host, creating it on first use."""
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers["User-Agent"] = self.user_agent
+                # One pool per host, sized so every worker can hold a connection
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+              rate_limited: bool = True) -> requests.Response:
+        """
+        Fetch a page, honouring the per-host rate limit.
+
+        Args:
+            url: Page URL
+            headers: Extra request headers
+            rate_limited: Wait for the host's slot first (False when the
+                caller has already acquired it)
+
+        Raises:
+            requests.RequestException: On network errors or non-2xx responses
+        """
+        host = _host_of(url)
+        if rate_limited:
+            self.rate_limiter.wait(host)
+        response = self._session_for(host).get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def scrape_page(self, url: str, rate_limited: bool = True) -> List[Dict[str, Any]]:
+        """
+        Fetch and parse a single listing page.
+
+        With a cache configured, the request carries the stored validators and
+        a 304 response returns the cached records without re-parsing.
+
+        Args:
+            url: Listing page URL
+            rate_limited: Wait for the host's slot before the first request
+        """
+        headers = self.cache.conditional_headers(url) if self.cache else None
+        response = self.fetch(url, headers=headers, rate_limited=rate_limited)
+
+        if response.status_code == 304 and self.cache:
+            entry = self.cache.get(url)
+            if entry is not None:
+                self.cache.touch(url)
+                logger.debug(f"Not modified: {url}")
+                return entry["records"]
+            # Entry expired between the request and now; fetch unconditionally
+            response = self.fetch(url)
+
+        records = list(get_parser(url)(response.text, url))
+        for record in records:
+            record.setdefault("source", _host_of(url))
+
+        if self.cache:
+            self.cache.store(
+                url,
+                response.text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                records=records,
+            )
+        return records
+
+    def scrape(self, urls: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Scrape pages concurrently, yielding records as each page completes.
+
+        URLs are queued per host. The calling thread hands a page to the pool
+        only when a worker is free and the page's host slot is due, rotating
+        through hosts, so workers never sleep on a rate limit.
+
+        Pages that fail to fetch or parse are logged and skipped so one bad
+        source does not abort the run. The cache, if any, is pruned once the
+        run finishes.
+
+        Args:
+            urls: Listing page URLs
+
+        Yields:
+            Festival record dictionaries
+        """
+        queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        for url in urls:
+            queues.setdefault(_host_of(url), deque()).append(url)
+
+        in_flight: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while queues or in_flight:
+                next_due: Optional[float] = None
+                for host in list(queues):
+                    if len(in_flight) >= self.max_workers:
+                        break
+                    delay = self.rate_limiter.try_acquire(host)
+                    if delay > 0:
+                        next_due = delay if next_due is None else min(next_due, delay)
+                        continue
+                    url = queues[host].popleft()
+                    in_flight[executor.submit(self.scrape_page, url, False)] = url
+                    if queues[host]:
+                        queues.move_to_end(host)
+                    else:
+                        del queues[host]
+
+                if not in_flight:
+                    time.sleep(next_due or 0)
+                    continue
+                # Wake on the next completion, or when a waiting host becomes due
+                timeout = next_due if len(in_flight) < self.max_workers else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = in_flight.pop(future)
+                    try:
+                        records = future.result()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Failed to scrape {url}: {e}")
+                        continue
+                    logger.info(f"Scraped {len(records)} festivals from {url}")
+                    yield from records
+
+        if self.cache:
+            self.cache.prune()
+
+    def close(self) -> None:
+        """Close all pooled sessions."""
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,521 @@
+"""
+EDM Shuffle Audio Fingerprint Index
+
+Flags duplicate and near-duplicate uploads to the tracks and
+festival_submissions tables, so the same audio re-uploaded under a new name
+is neither stored nor analyzed twice:
+- byte-identical files are caught by their content hash without decoding
+- everything else is fingerprinted: spectral peaks are picked from a
+  log-magnitude spectrogram, each peak is paired with the next few peaks
+  ahead of it, and every pair (anchor bin, target bin, time delta) is packed
+  into one integer hash stamped with the anchor's frame offset
+- hashes go into an inverted index in SQLite (hash -> item and offset),
+  clustered on the hash so a lookup is one index range scan per query hash
+- a query counts, per catalog item, the matching hashes that agree on the
+  same time offset; re-encodes, gain changes and trimmed edits keep a large
+  share of aligned matches, unrelated audio keeps almost none
+
+Removed items are tombstoned and their postings purged by compact().
+
+Usage:
+    python fingerprint_index.py add track 5c3e... uploads/song.mp3
+    python fingerprint_index.py check uploads/new_song.wav
+    python fingerprint_index.py submit submission 9a1f... uploads/entry.wav
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+from scipy.ndimage import maximum_filter
+
+from analysis_cache import hash_file
+from audio_analysis import stft_magnitude
+from audio_io import AudioDecodeError, load_audio, resample
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump whenever hashes change; an index built by another version must be rebuilt
+FINGERPRINT_VERSION = "1"
+DEFAULT_INDEX_PATH = os.path.join(".cache", "audio_fingerprints.sqlite3")
+KINDS = ("track", "submission")  # tracks and festival_submissions rows
+
+FINGERPRINT_SAMPLE_RATE = 11025
+N_FFT = 2048
+HOP_LENGTH = 256
+FRAMES_PER_SECOND = FINGERPRINT_SAMPLE_RATE / HOP_LENGTH
+
+# Peaks: local maxima within the neighbourhood, within DYNAMIC_RANGE_DB of the
+# loudest bin, and at most PEAKS_PER_SECOND of the strongest per second
+PEAK_TIME_RADIUS = 10
+PEAK_FREQ_RADIUS = 10
+DYNAMIC_RANGE_DB = 60.0
+PEAKS_PER_SECOND = 10
+
+# Pairs: each anchor with the next FAN_OUT peaks at least MIN_DT frames later
+FAN_OUT = 3
+MIN_DT = 1
+FREQ_BITS = 10
+DT_BITS = 6
+MAX_DT = (1 << DT_BITS) - 1
+
+# Postings pack item id and anchor frame into one integer
+OFFSET_BITS = 22
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+
+# Verdicts: enough aligned matches make an item a (partial) match, since
+# unrelated audio aligns almost none; coverage of both files then decides
+# whether it is a duplicate
+MIN_ALIGNED_MATCHES = 20
+DUPLICATE_COVERAGE = 0.2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    ref_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    duration REAL NOT NULL,
+    hash_count INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS items_ref_idx ON items(kind, ref_id) WHERE deleted = 0;
+CREATE INDEX IF NOT EXISTS items_content_hash_idx ON items(content_hash);
+CREATE TABLE IF NOT EXISTS postings (
+    hash INTEGER NOT NULL,
+    entry INTEGER NOT NULL,
+    PRIMARY KEY (hash, entry)
+) WITHOUT ROWID;
+"""
+
+# =============================================================================
+# FINGERPRINTS
+# =============================================================================
+
+def spectral_peaks(audio: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Constellation of spectrogram peaks.
+
+    Args:
+        audio: Mono samples at FINGERPRINT_SAMPLE_RATE
+
+    Returns:
+        (frames, bins) of the peaks sorted by frame then bin; bins start at
+        0 for the first bin above DC
+    """
+    magnitude = stft_magnitude(audio, N_FFT, HOP_LENGTH)[:, 1:1 + (1 << FREQ_BITS)]
+    if not magnitude.size:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    level = 20.0 * np.log10(magnitude + 1e-10)
+    neighbourhood = maximum_filter(level, size=(2 * PEAK_TIME_RADIUS + 1, 2 * PEAK_FREQ_RADIUS + 1),
+                                   mode="constant", cval=-np.inf)
+    frames, bins = np.nonzero((level == neighbourhood) & (level > level.max() - DYNAMIC_RANGE_DB))
+    if not len(frames):
+        return frames, bins
+
+    # Keep the strongest peaks of each second
+    strength = level[frames, bins]
+    second = (frames / FRAMES_PER_SECOND).astype(np.int64)
+    order = np.lexsort((-strength, second))
+    second_sorted = second[order]
+    starts = np.searchsorted(second_sorted, second_sorted, side="left")
+    keep = order[np.arange(len(order)) - starts < PEAKS_PER_SECOND]
+    keep.sort()  # np.nonzero order is (frame, bin) order
+    return frames[keep].astype(np.int64), bins[keep].astype(np.int64)
+
+def peak_pair_hashes(frames: np.ndarray, bins: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash each anchor peak with the next FAN_OUT peaks of its target zone.
+
+    Returns:
+        (hashes, offsets): (anchor bin, target bin, frame delta) packed into
+        FREQ_BITS * 2 + DT_BITS bits, and the anchor frame of each hash
+    """
+    count = len(frames)
+    first_target = np.searchsorted(frames, frames + MIN_DT, side="left")
+    hashes, offsets = [], []
+    for step in range(FAN_OUT):
+        target = first_target + step
+        valid = target < count
+        anchors = np.flatnonzero(valid)
+        target = target[valid]
+        delta = frames[target] - frames[anchors]
+        close = delta <= MAX_DT
+        anchors, target, delta = anchors[close], target[close], delta[close]
+        hashes.append((bins[anchors] << (FREQ_BITS + DT_BITS)) | (bins[target] << DT_BITS) | delta)
+        offsets.append(frames[anchors])
+    if not hashes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    hashes, offsets = np.concatenate(hashes), np.concatenate(offsets)
+    within = offsets <= OFFSET_MASK  # anything past ~27 hours is not indexed
+    return hashes[within], offsets[within]
+
+def fingerprint_audio(audio: np.ndarray, sample_rate: int) -> Dict[str, Any]:
+    """Fingerprint decoded audio of shape (frames,) or (frames, channels)."""
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+    audio = resample(audio.astype(np.float32), sample_rate, FINGERPRINT_SAMPLE_RATE)
+    hashes, offsets = peak_pair_hashes(*spectral_peaks(audio))
+    return {
+        "duration": round(len(audio) / FINGERPRINT_SAMPLE_RATE, 3),
+        "hashes": hashes,
+        "offsets": offsets,
+    }
+
+def fingerprint_file(path: str) -> Dict[str, Any]:
+    """
+    Decode and fingerprint an audio file.
+
+    Returns:
+        Dict with duration (seconds), hashes and offsets (int64 arrays)
+
+    Raises:
+        AudioDecodeError: If the file cannot be decoded
+    """
+    audio, sample_rate = load_audio(path, FINGERPRINT_SAMPLE_RATE, mono=True)
+    return fingerprint_audio(audio, sample_rate)
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+class FingerprintIndex:
+    """
+    Inverted index of peak-pair hashes for tracks and festival submissions.
+
+    Usage:
+        with FingerprintIndex() as index:
+            verdict = index.submit("uploads/entry.wav", "submission", submission_id)
+            if verdict["status"] != "unique":
+                reject(verdict["matches"])
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway index)
+
+        Raises:
+            ValueError: If the index was built by another FINGERPRINT_VERSION
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER NOT NULL, offset INTEGER NOT NULL)")
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', ?)", (FINGERPRINT_VERSION,))
+        version = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        if version != FINGERPRINT_VERSION:
+            self._conn.close()
+            raise ValueError(f"{path} holds version {version} fingerprints, expected {FINGERPRINT_VERSION}; rebuild it")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "FingerprintIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # =========================================================================
+    # ITEMS
+    # =========================================================================
+
+    def add(self, path: str, kind: str, ref_id: str, fingerprint: Optional[Dict[str, Any]] = None,
+            content_hash: Optional[str] = None) -> int:
+        """
+        Index an audio file, replacing any earlier file for the same row.
+
+        Args:
+            path: Audio file
+            kind: "track" or "submission"
+            ref_id: ID of the tracks or festival_submissions row
+            fingerprint: Result of fingerprint_file, if already computed
+            content_hash: Content hash of the file, if already computed
+
+        Returns:
+            Internal item ID
+        """
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}, not {kind!r}")
+        content_hash = content_hash or hash_file(path)
+        fingerprint = fingerprint or fingerprint_file(path)
+        hashes, offsets = fingerprint["hashes"], fingerprint["offsets"]
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE items SET deleted = 1 WHERE kind = ? AND ref_id = ? AND deleted = 0",
+                               (kind, ref_id))
+            item_id = self._conn.execute(
+                "INSERT INTO items (kind, ref_id, content_hash, duration, hash_count, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, ref_id, content_hash, fingerprint["duration"], len(hashes), time.time()),
+            ).lastrowid
+            entries = (item_id << OFFSET_BITS) | offsets
+            order = np.lexsort((entries, hashes))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO postings (hash, entry) VALUES (?, ?)",
+                zip(hashes[order].tolist(), entries[order].tolist()),
+            )
+        return item_id
+
+    def remove(self, kind: str, ref_id: str) -> bool:
+        """Tombstone a row's item; its postings are ignored until compact() deletes them."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE items SET deleted = 1 WHERE kind = ? AND ref_id = ? AND deleted = 0", (kind, ref_id)
+            ).rowcount > 0
+
+    def _items(self, item_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        found: Dict[int, Dict[str, Any]] = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(item_ids), 500):
+            batch = item_ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT id, kind, ref_id, content_hash, duration, hash_count FROM items "
+                f"WHERE deleted = 0 AND id IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for item_id, kind, ref_id, content_hash, duration, hash_count in rows:
+                found[item_id] = {"kind": kind, "ref_id": ref_id, "content_hash": content_hash,
+                                  "duration": duration, "hash_count": hash_count}
+        return found
+
+    # =========================================================================
+    # MATCHING
+    # =========================================================================
+
+    def exact_matches(self, content_hash: str) -> List[Dict[str, Any]]:
+        """Live items with byte-identical content."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, ref_id, duration FROM items WHERE content_hash = ? AND deleted = 0", (content_hash,)
+            ).fetchall()
+        return [{"kind": kind, "ref_id": ref_id, "match": "exact", "duration": duration,
+                 "aligned_matches": None, "query_coverage": 1.0, "item_coverage": 1.0, "offset_sec": 0.0}
+                for kind, ref_id, duration in rows]
+
+    def match(self, fingerprint: Dict[str, Any], limit: int = 5,
+              min_aligned: int = MIN_ALIGNED_MATCHES) -> List[Dict[str, Any]]:
+        """
+        Catalog items sharing time-aligned hashes with a fingerprint, best first.
+
+        Matches are counted per (item, offset difference); the best
+        difference and its two neighbours (a frame of jitter from trimming)
+        make up the aligned match count.
+
+        Args:
+            fingerprint: Result of fingerprint_file
+            limit: Maximum matches returned
+            min_aligned: Fewest aligned matches that count as a match at all
+
+        Returns:
+            Dicts with kind, ref_id, match ("duplicate" when both files are
+            mostly covered by the other, otherwise "partial", e.g. an excerpt
+            or edit), aligned_matches, query_coverage, item_coverage and
+            offset_sec (where the query starts within the item)
+        """
+        hashes, offsets = fingerprint["hashes"], fingerprint["offsets"]
+        if not len(hashes):
+            return []
+        with self._lock:
+            self._conn.execute("DELETE FROM query")
+            self._conn.executemany("INSERT INTO query (hash, offset) VALUES (?, ?)",
+                                   zip(hashes.tolist(), offsets.tolist()))
+            rows = self._conn.execute(
+                "SELECT q.offset, p.entry FROM query q JOIN postings p ON p.hash = q.hash"
+            ).fetchall()
+            self._conn.execute("DELETE FROM query")
+        if not rows:
+            return []
+
+        pairs = np.array(rows, dtype=np.int64)
+        items = pairs[:, 1] >> OFFSET_BITS
+        shift = (pairs[:, 1] & OFFSET_MASK) - pairs[:, 0] + OFFSET_MASK + 1  # non-negative offset difference
+        keys, counts = np.unique((items << (OFFSET_BITS + 1)) | shift, return_counts=True)
+        # Fold in the neighbouring offset differences of the same item
+        aligned = counts.copy()
+        for neighbour in (keys - 1, keys + 1):
+            position = np.minimum(np.searchsorted(keys, neighbour), len(keys) - 1)
+            aligned += np.where(keys[position] == neighbour, counts[position], 0)
+        key_items = keys >> (OFFSET_BITS + 1)
+
+        # Best offset difference per item
+        order = np.lexsort((-aligned, key_items))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = key_items[order][1:] != key_items[order][:-1]
+        best = order[first]
+        best = best[aligned[best] >= min_aligned]
+        best = best[np.argsort(-aligned[best], kind="stable")]
+        if not len(best):
+            return []
+
+        with self._lock:
+            live = self._items([int(item) for item in key_items[best]])
+        matches = []
+        for position in best:
+            item = live.get(int(key_items[position]))
+            if item is None:
+                continue
+            count = int(aligned[position])
+            query_coverage = min(1.0, count / len(hashes))
+            item_coverage = min(1.0, count / max(1, item["hash_count"]))
+            # Short or degraded excerpts have low coverage but are still
+            # matches: coverage only separates duplicates from partials
+            match_kind = "duplicate" if min(query_coverage, item_coverage) >= DUPLICATE_COVERAGE else "partial"
+            difference = int(keys[position] & ((1 << (OFFSET_BITS + 1)) - 1)) - OFFSET_MASK - 1
+            matches.append({
+                "kind": item["kind"],
+                "ref_id": item["ref_id"],
+                "match": match_kind,
+                "duration": item["duration"],
+                "aligned_matches": count,
+                "query_coverage": round(query_coverage, 3),
+                "item_coverage": round(item_coverage, 3),
+                "offset_sec": round(difference / FRAMES_PER_SECOND, 2),
+            })
+            if len(matches) == limit:
+                break
+        return matches
+
+    def check(self, path: str, limit: int = 5) -> Tuple[Dict[str, Any], Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Duplicate verdict for a file without indexing it.
+
+        Returns:
+            (verdict, content hash, fingerprint); the fingerprint is None
+            when an exact match made decoding unnecessary
+        """
+        content_hash = hash_file(path)
+        exact = self.exact_matches(content_hash)
+        if exact:
+            return {"status": "duplicate", "matches": exact[:limit]}, content_hash, None
+        fingerprint = fingerprint_file(path)
+        matches = self.match(fingerprint, limit)
+        if any(match["match"] == "duplicate" for match in matches):
+            status = "duplicate"
+        elif matches:
+            status = "partial"
+        else:
+            status = "unique"
+        return {"status": status, "matches": matches}, content_hash, fingerprint
+
+    def submit(self, path: str, kind: str, ref_id: str, limit: int = 5) -> Dict[str, Any]:
+        """
+        Submission-time check: flag duplicates and index the file unless it is one.
+
+        Partial matches (edits containing or contained in catalog audio) are
+        flagged but still indexed.
+
+        Returns:
+            Verdict with status ("unique", "partial" or "duplicate"), matches
+            and whether the file was registered
+        """
+        verdict, content_hash, fingerprint = self.check(path, limit)
+        verdict["registered"] = verdict["status"] != "duplicate"
+        if verdict["registered"]:
+            self.add(path, kind, ref_id, fingerprint, content_hash)
+        level = logging.WARNING if verdict["status"] == "duplicate" else logging.INFO
+        logger.log(level, f"🔎 {kind} {ref_id}: {verdict['status']} ({len(verdict['matches'])} match(es))")
+        return verdict
+
+    # =========================================================================
+    # MAINTENANCE
+    # =========================================================================
+
+    def compact(self) -> int:
+        """
+        Delete the postings and rows of removed items.
+
+        Returns:
+            Items purged
+        """
+        with self._lock, self._conn:
+            deleted = [row[0] for row in self._conn.execute("SELECT id FROM items WHERE deleted = 1")]
+            if not deleted:
+                return 0
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS purge (id INTEGER PRIMARY KEY)")
+            self._conn.execute("DELETE FROM purge")
+            self._conn.executemany("INSERT INTO purge VALUES (?)", ((item_id,) for item_id in deleted))
+            self._conn.execute(f"DELETE FROM postings WHERE (entry >> {OFFSET_BITS}) IN (SELECT id FROM purge)")
+            self._conn.execute("DELETE FROM items WHERE deleted = 1")
+        logger.info(f"🧹 Purged {len(deleted)} removed item(s)")
+        return len(deleted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Live item counts per kind, posting count and the on-disk size."""
+        with self._lock:
+            kinds = self._conn.execute(
+                "SELECT kind, COUNT(*), SUM(duration) FROM items WHERE deleted = 0 GROUP BY kind"
+            ).fetchall()
+            removed = self._conn.execute("SELECT COUNT(*) FROM items WHERE deleted = 1").fetchone()[0]
+            postings = self._conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+        return {
+            "version": FINGERPRINT_VERSION,
+            "items": {kind: {"count": count, "hours": round((seconds or 0) / 3600, 2)} for kind, count, seconds in kinds},
+            "removed_items": removed,
+            "postings": postings,
+            "db_bytes": os.path.getsize(self.path) if self.path != ":memory:" and os.path.exists(self.path) else 0,
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint tracks and submissions to catch duplicate uploads")
+    parser.add_argument("--index", default=os.getenv("AUDIO_FINGERPRINT_INDEX", DEFAULT_INDEX_PATH),
+                        help="Fingerprint database (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("add", "Index a file"), ("submit", "Check a file and index it unless it is a duplicate")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("kind", choices=KINDS)
+        command.add_argument("ref_id", help="ID of the tracks or festival_submissions row")
+        command.add_argument("file")
+    check = commands.add_parser("check", help="Report duplicates of a file without indexing it")
+    check.add_argument("file")
+    remove = commands.add_parser("remove", help="Drop a row's file from the index")
+    remove.add_argument("kind", choices=KINDS)
+    remove.add_argument("ref_id")
+    commands.add_parser("compact", help="Purge postings of removed items")
+    commands.add_parser("stats", help="Show index size")
+    args = parser.parse_args()
+
+    with FingerprintIndex(args.index) as index:
+        try:
+            if args.command == "add":
+                result = {"item_id": index.add(args.file, args.kind, args.ref_id)}
+            elif args.command == "submit":
+                result = index.submit(args.file, args.kind, args.ref_id)
+            elif args.command == "check":
+                result = index.check(args.file)[0]
+            elif args.command == "remove":
+                result = {"removed": index.remove(args.kind, args.ref_id)}
+            elif args.command == "compact":
+                result = {"purged": index.compact()}
+            else:
+                result = index.stats()
+        except (AudioDecodeError, OSError) as e:
+            logger.error(f"❌ {e}")
+            sys.exit(2)
+    print(json.dumps(result, indent=2))
+    # Scripts gating uploads can rely on the exit status
+    if args.command in ("check", "submit") and result["status"] == "duplicate":
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
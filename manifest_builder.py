@@ -0,0 +1,466 @@
+"""
+EDM Shuffle Soundpack Manifest Builder
+
+Rebuilds public/soundpacks/manifest.json from the pack directories and
+writes a lookup index next to it, so stem queries no longer scan the whole
+manifest:
+- scans each pack directory for audio files; metadata comes from the pack's
+  pack.json (optional), then the existing manifest entry, then measured
+  values from manifest.analysis.json (audio_analysis.py), then defaults
+- validates packs and stems against the schema SoundPackLoader.tsx expects;
+  invalid stems are reported and left out
+- manifest.index.json lists the stems (sorted by BPM) and, per field, the
+  offset and length of each term's posting list in manifest.index.bin
+- manifest.index.bin holds the posting lists: sorted little-endian uint32
+  stem positions, readable in the browser with new Uint32Array(buffer, offset * 4, length)
+
+Indexed fields: bpm (BPM_BUCKET_SIZE buckets), camelot (Camelot wheel code),
+tag, type and pack. StemIndex answers tempo- and harmonic-compatible queries
+by unioning and intersecting posting lists.
+
+pack.json example:
+    {"id": "house-vibes", "name": "House Vibes", "genre": "House",
+     "stems": {"house-piano.mp3": {"type": "keys", "tags": ["piano", "chords"]}}}
+
+Usage:
+    python manifest_builder.py public/soundpacks
+    python manifest_builder.py public/soundpacks --check --strict
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import sys
+
+import numpy as np
+
+from audio_analysis import MANIFEST_NAME, SIDECAR_NAME, find_audio_files, load_manifest, write_json_atomic
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+INDEX_NAME = "manifest.index.json"
+POSTINGS_NAME = "manifest.index.bin"
+PACK_META_NAME = "pack.json"
+BPM_BUCKET_SIZE = 2
+MIN_BPM = 40
+MAX_BPM = 250
+DEFAULT_BPM_TOLERANCE = 0.03
+NO_KEY = "N/A"
+INDEXED_FIELDS = ("bpm", "camelot", "tag", "type", "pack")
+
+PACK_FIELDS = {"id": str, "name": str, "description": str, "genre": str}
+STEM_FIELDS = {"id": str, "name": str, "file": str, "bpm": (int, float), "key": str,
+               "duration": (int, float), "type": str, "tags": list}
+ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]*$")
+
+# Camelot wheel numbers for each tonic, by mode
+CAMELOT_MAJOR = {"B": 1, "F#": 2, "C#": 3, "G#": 4, "D#": 5, "A#": 6,
+                 "F": 7, "C": 8, "G": 9, "D": 10, "A": 11, "E": 12}
+CAMELOT_MINOR = {"G#": 1, "D#": 2, "A#": 3, "F": 4, "C": 5, "G": 6,
+                 "D": 7, "A": 8, "E": 9, "B": 10, "F#": 11, "C#": 12}
+ENHARMONICS = {"DB": "C#", "EB": "D#", "GB": "F#", "AB": "G#", "BB": "A#", "E#": "F", "B#": "C", "CB": "B", "FB": "E"}
+KEY_PATTERN = re.compile(r"^\s*([A-Ga-g])([#b♯♭]?)\s*(m|min|minor|maj|major)?\s*$")
+CAMELOT_PATTERN = re.compile(r"^\s*(1[0-2]|[1-9])([ABab])\s*$")
+
+# =============================================================================
+# KEYS
+# =============================================================================
+
+def parse_key(key: Optional[str]) -> Optional[Tuple[str, bool]]:
+    """
+    'Am', 'Bb', 'F# minor' or a Camelot code such as '8A' -> (tonic with
+    sharps, is_minor); None for N/A or unparseable keys.
+    """
+    if not key or key == NO_KEY:
+        return None
+    camelot = CAMELOT_PATTERN.match(key)
+    if camelot:
+        number, minor = int(camelot.group(1)), camelot.group(2).upper() == "A"
+        wheel = CAMELOT_MINOR if minor else CAMELOT_MAJOR
+        return next(tonic for tonic, code in wheel.items() if code == number), minor
+    match = KEY_PATTERN.match(key)
+    if not match:
+        return None
+    letter, accidental, mode = match.groups()
+    accidental = {"♯": "#", "♭": "b"}.get(accidental, accidental)
+    tonic = letter.upper() + accidental
+    tonic = ENHARMONICS.get(tonic.upper(), tonic)
+    return tonic, mode in ("m", "min", "minor")
+
+def camelot_code(key: Optional[str]) -> Optional[str]:
+    """Camelot wheel code of a key ('Am' -> '8A', 'C' -> '8B'), or None."""
+    parsed = parse_key(key)
+    if parsed is None:
+        return None
+    tonic, minor = parsed
+    return f"{(CAMELOT_MINOR if minor else CAMELOT_MAJOR)[tonic]}{'A' if minor else 'B'}"
+
+def compatible_camelot(code: str) -> List[str]:
+    """Codes that mix harmonically with code: itself, one step either way and the relative key."""
+    number, letter = int(code[:-1]), code[-1]
+    other = "B" if letter == "A" else "A"
+    return [code, f"{(number % 12) + 1}{letter}", f"{((number - 2) % 12) + 1}{letter}", f"{number}{other}"]
+
+def bpm_bucket(bpm: float) -> int:
+    return int(bpm // BPM_BUCKET_SIZE) * BPM_BUCKET_SIZE
+
+# =============================================================================
+# VALIDATION
+# =============================================================================
+
+def validate_pack(pack: Dict[str, Any]) -> List[str]:
+    problems = []
+    for field, expected in PACK_FIELDS.items():
+        if not isinstance(pack.get(field), expected):
+            problems.append(f"pack field '{field}' must be a {expected.__name__}")
+    if isinstance(pack.get("id"), str) and not ID_PATTERN.match(pack["id"]):
+        problems.append(f"pack id '{pack['id']}' must be lowercase letters, digits and dashes")
+    return problems
+
+def validate_stem(stem: Dict[str, Any]) -> List[str]:
+    """Schema problems of one stem entry (empty when valid)."""
+    problems = []
+    for field, expected in STEM_FIELDS.items():
+        if field not in stem or stem[field] is None:
+            problems.append(f"missing '{field}'")
+        elif not isinstance(stem[field], expected) or isinstance(stem[field], bool):
+            problems.append(f"'{field}' has type {type(stem[field]).__name__}")
+    if problems:
+        return problems
+    if not ID_PATTERN.match(stem["id"]):
+        problems.append(f"id '{stem['id']}' must be lowercase letters, digits and dashes")
+    if not MIN_BPM <= stem["bpm"] <= MAX_BPM:
+        problems.append(f"bpm {stem['bpm']} outside {MIN_BPM}-{MAX_BPM}")
+    if stem["key"] != NO_KEY and parse_key(stem["key"]) is None:
+        problems.append(f"unrecognized key '{stem['key']}' (use e.g. 'C', 'F#m' or '{NO_KEY}')")
+    if not (stem["duration"] > 0 and math.isfinite(stem["duration"])):
+        problems.append(f"duration {stem['duration']} must be positive")
+    if not all(isinstance(tag, str) and tag for tag in stem["tags"]):
+        problems.append("tags must be non-empty strings")
+    return problems
+
+# =============================================================================
+# BUILDING
+# =============================================================================
+
+def _title(name: str) -> str:
+    return re.sub(r"[-_]+", " ", name).strip().title()
+
+def _load_json(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _measured_bpm(value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return None
+    return int(round(value)) if abs(value - round(value)) < 0.05 else round(value, 2)
+
+def build_manifest(root: str, use_analysis: bool = True) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+    """
+    Assemble the manifest from pack directories and existing metadata.
+
+    Stems listed in the current manifest whose audio file is missing are
+    kept (with a warning), so placeholder packs survive a rebuild.
+
+    Args:
+        root: Soundpack directory
+        use_analysis: Fill missing bpm, key and duration from manifest.analysis.json
+
+    Returns:
+        (manifest, problems) where each problem has level (error/warning),
+        location and message; stems with errors are not in the manifest
+    """
+    existing = load_manifest(root)
+    analysis = _load_json(os.path.join(root, SIDECAR_NAME)).get("stems", {}) if use_analysis else {}
+    problems: List[Dict[str, str]] = []
+
+    def report(level: str, location: str, message: str) -> None:
+        problems.append({"level": level, "location": location, "message": message})
+
+    # Audio files grouped by pack directory
+    on_disk: Dict[str, List[str]] = {}
+    for relative in find_audio_files(root):
+        parts = relative.split("/")
+        if len(parts) < 2:
+            continue
+        on_disk.setdefault(parts[0], []).append(relative)
+
+    existing_packs = {pack.get("id"): pack for pack in existing.get("soundPacks", [])}
+    existing_stems = {stem["file"]: stem for pack in existing.get("soundPacks", [])
+                      for stem in pack.get("stems", []) if stem.get("file")}
+    pack_dirs = {stem_file.split("/")[0] for stem_file in existing_stems} | set(on_disk)
+    # Keep the hand-maintained pack order, then add new directories alphabetically
+    ordered = []
+    for pack in existing.get("soundPacks", []):
+        for stem in pack.get("stems", []):
+            directory = stem.get("file", "").split("/")[0]
+            if directory and directory not in ordered:
+                ordered.append(directory)
+    ordered += sorted(pack_dirs - set(ordered))
+
+    packs = []
+    seen_pack_ids, seen_stem_ids = set(), set()
+    for directory in ordered:
+        meta = _load_json(os.path.join(root, directory, PACK_META_NAME))
+        previous = existing_packs.get(meta.get("id", directory)) or next(
+            (pack for pack in existing.get("soundPacks", [])
+             if any(stem.get("file", "").startswith(directory + "/") for stem in pack.get("stems", []))), {})
+        pack = {key: value for key, value in previous.items() if key != "stems"}
+        pack.update({key: value for key, value in meta.items() if key != "stems"})
+        pack.setdefault("id", directory)
+        pack.setdefault("name", _title(directory))
+        pack.setdefault("description", "")
+        pack.setdefault("genre", "")
+        pack_problems = validate_pack(pack)
+        if pack["id"] in seen_pack_ids:
+            pack_problems.append(f"duplicate pack id '{pack['id']}'")
+        if pack_problems:
+            for message in pack_problems:
+                report("error", directory, message)
+            continue
+        seen_pack_ids.add(pack["id"])
+
+        stem_overrides = meta.get("stems", {})
+        files = list(on_disk.get(directory, []))
+        files += [stem_file for stem_file in existing_stems
+                  if stem_file.split("/")[0] == directory and stem_file not in files]
+        ordered_files = [stem.get("file") for stem in previous.get("stems", []) if stem.get("file") in files]
+        ordered_files += sorted(set(files) - set(ordered_files))
+
+        stems = []
+        for stem_file in ordered_files:
+            name = os.path.splitext(stem_file.split("/")[-1])[0]
+            stem = dict(existing_stems.get(stem_file, {}))
+            stem.update(stem_overrides.get(stem_file.split("/", 1)[1], {}))
+            measured = analysis.get(stem_file, {})
+            if stem.get("bpm") is None and _measured_bpm(measured.get("bpm")) is not None:
+                stem["bpm"] = _measured_bpm(measured["bpm"])
+            if stem.get("key") is None and measured.get("key"):
+                stem["key"] = measured["key"]
+            if stem.get("duration") is None and measured.get("duration_sec"):
+                stem["duration"] = round(measured["duration_sec"], 2)
+            stem["file"] = stem_file
+            stem.setdefault("id", re.sub(r"[^a-z0-9-]+", "-", name.lower()).strip("-"))
+            stem.setdefault("name", _title(name))
+            stem.setdefault("key", NO_KEY)
+            stem.setdefault("type", "other")
+            stem.setdefault("tags", [])
+
+            location = stem_file
+            stem_problems = validate_stem(stem)
+            if stem.get("id") in seen_stem_ids:
+                stem_problems.append(f"duplicate stem id '{stem['id']}'")
+            if stem_problems:
+                for message in stem_problems:
+                    report("error", location, message)
+                continue
+            if stem_file not in on_disk.get(directory, []):
+                report("warning", location, "audio file not found")
+            seen_stem_ids.add(stem["id"])
+            stems.append(stem)
+        pack["stems"] = stems
+        packs.append(pack)
+
+    manifest = {key: value for key, value in existing.items() if key != "soundPacks"}
+    manifest["soundPacks"] = packs
+    return manifest, problems
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+def build_index(manifest: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Inverted lists over the manifest's stems.
+
+    Returns:
+        (index JSON, postings bytes); index["terms"][field][term] is
+        [offset, length] in uint32 units into the postings
+    """
+    rows = [
+        (stem, pack["id"])
+        for pack in manifest.get("soundPacks", [])
+        for stem in pack.get("stems", [])
+    ]
+    # Sorting by tempo keeps every BPM bucket a contiguous range of positions
+    rows.sort(key=lambda row: (row[0]["bpm"], row[0]["id"]))
+
+    lists: Dict[str, Dict[str, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+    stems = []
+    for position, (stem, pack_id) in enumerate(rows):
+        code = camelot_code(stem["key"])
+        stems.append([stem["id"], pack_id, stem["bpm"], code])
+        terms = {
+            "bpm": [str(bpm_bucket(stem["bpm"]))],
+            "camelot": [code] if code else [],
+            "tag": sorted({tag.lower() for tag in stem["tags"]}),
+            "type": [stem["type"].lower()],
+            "pack": [pack_id],
+        }
+        for field, values in terms.items():
+            for value in values:
+                lists[field].setdefault(value, []).append(position)
+
+    chunks, offsets, offset = [], {}, 0
+    for field in INDEXED_FIELDS:
+        offsets[field] = {}
+        for term in sorted(lists[field]):
+            positions = lists[field][term]
+            chunks.append(np.asarray(positions, dtype="<u4"))
+            offsets[field][term] = [offset, len(positions)]
+            offset += len(positions)
+    postings = np.concatenate(chunks).tobytes() if chunks else b""
+    index = {
+        "version": INDEX_VERSION,
+        "bpm_bucket_size": BPM_BUCKET_SIZE,
+        "postings_file": POSTINGS_NAME,
+        "stem_columns": ["id", "pack", "bpm", "camelot"],
+        "stems": stems,
+        "terms": offsets,
+    }
+    return index, postings
+
+def write_index(root: str, index: Dict[str, Any], postings: bytes) -> None:
+    # Postings first: an index is only ever published alongside its postings
+    tmp_path = os.path.join(root, POSTINGS_NAME + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(postings)
+    os.replace(tmp_path, os.path.join(root, POSTINGS_NAME))
+    write_json_atomic(os.path.join(root, INDEX_NAME), index)
+
+class StemIndex:
+    """
+    Query interface over manifest.index.json and manifest.index.bin.
+
+    Usage:
+        index = StemIndex.load("public/soundpacks")
+        index.compatible(bpm=128, key="Am", tags=["bass"])
+    """
+
+    def __init__(self, index: Dict[str, Any], postings: np.ndarray):
+        self.index = index
+        self.terms = index["terms"]
+        self.postings = postings
+        self.stems = index["stems"]
+        self.bpms = np.array([row[2] for row in self.stems], dtype=np.float64)
+        self.bucket_size = index.get("bpm_bucket_size", BPM_BUCKET_SIZE)
+        self.keyless = np.array([position for position, row in enumerate(self.stems) if row[3] is None], dtype=np.uint32)
+
+    @classmethod
+    def load(cls, root: str) -> "StemIndex":
+        with open(os.path.join(root, INDEX_NAME), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        postings = np.fromfile(os.path.join(root, index.get("postings_file", POSTINGS_NAME)), dtype="<u4")
+        return cls(index, postings)
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict[str, Any]) -> "StemIndex":
+        index, postings = build_index(manifest)
+        return cls(index, np.frombuffer(postings, dtype="<u4"))
+
+    def lookup(self, field: str, term: str) -> np.ndarray:
+        """Sorted stem positions for one term (empty if absent)."""
+        entry = self.terms.get(field, {}).get(term)
+        if entry is None:
+            return np.zeros(0, dtype=np.uint32)
+        offset, length = entry
+        return self.postings[offset:offset + length]
+
+    def lookup_any(self, field: str, terms: Iterable[str]) -> np.ndarray:
+        lists = [self.lookup(field, term) for term in terms]
+        return np.unique(np.concatenate(lists)) if lists else np.zeros(0, dtype=np.uint32)
+
+    def tempo_matches(self, bpm: float, tolerance: float = DEFAULT_BPM_TOLERANCE,
+                      half_double: bool = False) -> np.ndarray:
+        """Positions within tolerance (relative) of bpm, optionally also of half and double time."""
+        targets = [bpm, bpm / 2, bpm * 2] if half_double else [bpm]
+        matches = []
+        for target in targets:
+            low, high = target * (1 - tolerance), target * (1 + tolerance)
+            buckets = range(bpm_bucket(low), bpm_bucket(high) + 1, self.bucket_size)
+            candidates = self.lookup_any("bpm", (str(bucket) for bucket in buckets))
+            tempos = self.bpms[candidates]
+            matches.append(candidates[(tempos >= low) & (tempos <= high)])
+        return np.unique(np.concatenate(matches))
+
+    def compatible(self, bpm: Optional[float] = None, key: Optional[str] = None,
+                   tags: Optional[Iterable[str]] = None, types: Optional[Iterable[str]] = None,
+                   pack: Optional[str] = None, tolerance: float = DEFAULT_BPM_TOLERANCE,
+                   harmonic: bool = True, half_double: bool = False) -> List[str]:
+        """
+        Stem ids matching every given constraint, in tempo order.
+
+        Args:
+            bpm: Tempo to match within tolerance
+            key: Key to mix with; harmonic widens it to Camelot neighbours,
+                otherwise only the same key matches. Keyless stems (N/A, e.g.
+                drums) always match.
+            tags: Tags that must all be present
+            types: Stem types of which one must match
+            pack: Pack id
+            tolerance: Relative BPM tolerance
+            harmonic: Use Camelot-compatible keys rather than the exact key
+            half_double: Also accept half and double tempo
+        """
+        selected: Optional[np.ndarray] = None
+
+        def narrow(positions: np.ndarray) -> None:
+            nonlocal selected
+            selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+
+        if bpm is not None:
+            narrow(self.tempo_matches(bpm, tolerance, half_double))
+        if key is not None:
+            code = camelot_code(key)
+            if code is not None:
+                codes = compatible_camelot(code) if harmonic else [code]
+                narrow(np.union1d(self.lookup_any("camelot", codes), self.keyless))
+        for tag in tags or []:
+            narrow(self.lookup("tag", tag.lower()))
+        if types:
+            narrow(self.lookup_any("type", (stem_type.lower() for stem_type in types)))
+        if pack is not None:
+            narrow(self.lookup("pack", pack))
+        if selected is None:
+            selected = np.arange(len(self.stems))
+        return [self.stems[position][0] for position in selected]
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the soundpack manifest and its lookup index")
+    parser.add_argument("root", nargs="?", default=os.path.join("public", "soundpacks"),
+                        help="Soundpack directory containing the pack directories")
+    parser.add_argument("--check", action="store_true", help="Validate only; write nothing")
+    parser.add_argument("--strict", action="store_true", help="Treat warnings (e.g. missing audio) as errors")
+    parser.add_argument("--no-analysis", action="store_true",
+                        help=f"Do not fill missing values from {SIDECAR_NAME}")
+    args = parser.parse_args()
+
+    manifest, problems = build_manifest(args.root, not args.no_analysis)
+    for problem in problems:
+        icon = "❌" if problem["level"] == "error" else "⚠️"
+        logger.warning(f"{icon} {problem['location']}: {problem['message']}")
+    failed = any(problem["level"] == "error" or args.strict for problem in problems)
+    stem_count = sum(len(pack["stems"]) for pack in manifest["soundPacks"])
+
+    if not args.check and not (args.strict and failed):
+        write_json_atomic(os.path.join(args.root, MANIFEST_NAME), manifest)
+        write_index(args.root, *build_index(manifest))
+        logger.info(f"✅ Wrote {MANIFEST_NAME} and {INDEX_NAME} ({len(manifest['soundPacks'])} pack(s), {stem_count} stem(s))")
+    else:
+        logger.info(f"🔍 Validated {len(manifest['soundPacks'])} pack(s), {stem_count} stem(s)")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+EDM Shuffle Streaming Mix Renderer
+
+Renders long DJ sets from soundpack stems without holding the mix in memory.
+The set is a generator pipeline over fixed-size chunks:
+- arrangement: stems chosen for the genre are tempo-matched to the set BPM
+  and laid out as layers that enter and leave on 16-bar section boundaries
+- mixing: each chunk sums the active layers (looped with index arithmetic,
+  faded with vectorized envelopes)
+- master chain: optional dsp_engine effects, streamed block by block
+- output: AudioStreamWriter appends each chunk to a WAV/FLAC file or a pipe
+
+Only the short stem loops and one chunk of audio are resident, so memory use
+does not grow with set length and several hour-long sets can render in
+parallel.
+
+Usage:
+    python mix_renderer.py --genre house --bpm 128 --duration 1800 --output sets/house.wav
+    python mix_renderer.py --duration 3600 --output - | ffmpeg -i - set.mp3
+"""
+
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from audio_io import AudioDecodeError, AudioStreamWriter, load_audio, resample
+from dsp_engine import DEFAULT_SAMPLE_RATE, OUTPUT_CHANNELS, EffectChain
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOUNDPACK_ROOT = os.path.join("public", "soundpacks")
+DEFAULT_CHUNK_FRAMES = 65536
+# Offline there is no latency budget, and larger blocks make the partitioned reverb cheaper
+MASTER_BLOCK_SIZE = 8192
+BEATS_PER_BAR = 4
+SECTION_BARS = 16
+FADE_BARS = 1
+OUTRO_FADE_BARS = 4
+MAX_DURATION_SEC = 3600
+
+# Stem "type" values from manifest.json mapped to arrangement roles
+STEM_ROLES = {"kick": "kick", "percussion": "percussion", "bass": "bass", "lead": "lead"}
+DEFAULT_ROLE = "texture"
+
+# Roles playing in each section; the set opens with the intro, cycles through
+# the body sections and closes with the outro
+INTRO = ("intro", {"kick", "percussion"})
+BODY_SECTIONS = [
+    ("build", {"kick", "percussion", "bass"}),
+    ("main", {"kick", "percussion", "bass", "lead", "texture"}),
+    ("breakdown", {"percussion", "lead", "texture"}),
+    ("drop", {"kick", "percussion", "bass", "lead", "texture"}),
+]
+OUTRO = ("outro", {"kick", "percussion"})
+
+@dataclass
+class Layer:
+    """One stem playing over a frame range of the set."""
+    stem_id: str
+    start: int
+    end: int
+    fade_in: int
+    fade_out: int
+    gain: float
+
+# =============================================================================
+# STEMS
+# =============================================================================
+
+def select_stems(manifest: Dict[str, Any], genre: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Manifest stems from packs matching the genre (all packs when none match)."""
+    packs = manifest.get("soundPacks", [])
+    if genre:
+        matching = [pack for pack in packs if str(pack.get("genre", "")).lower() == genre.lower()]
+        packs = matching or packs
+    return [stem for pack in packs for stem in pack.get("stems", []) if stem.get("file")]
+
+def prepare_loop(audio: np.ndarray, sample_rate: int, stem_bpm: Optional[float], bpm: float) -> np.ndarray:
+    """
+    Tempo-match a stem to the set BPM and trim or pad it to whole beats.
+
+    Tempo is matched by resampling (varispeed), which also shifts pitch; stems
+    are assumed to be loops starting on a beat.
+    """
+    if stem_bpm and abs(stem_bpm - bpm) > 1e-6:
+        ratio = Fraction(stem_bpm / bpm).limit_denominator(1000)
+        audio = resample(audio, ratio.denominator, ratio.numerator)
+    beat_frames = sample_rate * 60.0 / bpm
+    beats = max(1, round(len(audio) / beat_frames))
+    length = int(round(beats * beat_frames))
+    loop = np.zeros((length, audio.shape[1]), dtype=np.float32)
+    loop[:min(length, len(audio))] = audio[:length]
+    return loop
+
+def load_loops(stems: Iterable[Dict[str, Any]], root: str, bpm: float, sample_rate: int,
+               channels: int = OUTPUT_CHANNELS) -> Dict[str, Dict[str, Any]]:
+    """Decode and tempo-match stems, skipping any that cannot be read."""
+    loops = {}
+    for stem in stems:
+        path = os.path.join(root, stem["file"])
+        try:
+            audio, _ = load_audio(path, sample_rate=sample_rate)
+        except (AudioDecodeError, OSError, ValueError) as e:
+            logger.warning(f"⚠️ Skipping stem {stem.get('id')} ({path}): {e}")
+            continue
+        if audio.shape[1] != channels:
+            audio = np.repeat(audio[:, :1], channels, axis=1) if audio.shape[1] == 1 else audio[:, :channels]
+        loops[stem.get("id") or stem["file"]] = {
+            "role": STEM_ROLES.get(stem.get("type"), DEFAULT_ROLE),
+            "audio": prepare_loop(audio, sample_rate, stem.get("bpm"), bpm),
+        }
+    return loops
+
+# =============================================================================
+# ARRANGEMENT
+# =============================================================================
+
+def plan_arrangement(loops: Dict[str, Dict[str, Any]], bpm: float, total_frames: int,
+                     sample_rate: int) -> List[Layer]:
+    """
+    Lay stems out over the set in SECTION_BARS sections.
+
+    A stem plays through consecutive sections whose roles include it; each
+    run becomes one Layer with a bar-long fade at either end (except at the
+    very start of the set). Roles with no stems are skipped.
+    """
+    bar_frames = sample_rate * 60.0 / bpm * BEATS_PER_BAR
+    section_frames = bar_frames * SECTION_BARS
+    section_count = max(1, math.ceil(total_frames / section_frames))
+    roles_present = {loop["role"] for loop in loops.values()}
+    sections = [INTRO] + [BODY_SECTIONS[i % len(BODY_SECTIONS)] for i in range(max(0, section_count - 2))]
+    if section_count > 1:
+        sections.append(OUTRO)
+
+    fade = int(bar_frames * FADE_BARS)
+    gain = 1.0 / math.sqrt(max(1, len(loops)))
+    layers = []
+    for stem_id, loop in loops.items():
+        run_start = None
+        for index, (_, roles) in enumerate(sections + [("end", set())]):
+            # Keep everything playing through sections where its role has no stem at all
+            active = index < len(sections) and (loop["role"] in roles or not roles & roles_present)
+            if active and run_start is None:
+                run_start = index
+            elif not active and run_start is not None:
+                start = int(round(run_start * section_frames))
+                end = min(total_frames, int(round(index * section_frames)))
+                layers.append(Layer(stem_id, start, end, fade if start > 0 else 0,
+                                    fade if end < total_frames else 0, gain))
+                run_start = None
+    return layers
+
+# =============================================================================
+# STREAMING PIPELINE
+# =============================================================================
+
+def mix_chunks(layers: List[Layer], loops: Dict[str, Dict[str, Any]], total_frames: int,
+               sample_rate: int, bpm: float, chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+               channels: int = OUTPUT_CHANNELS) -> Iterator[np.ndarray]:
+    """
+    Yield the mix in chunks of chunk_frames (the last may be shorter).
+
+    The yielded array is reused between iterations; copy it to keep it.
+    """
+    buffer = np.zeros((chunk_frames, channels), dtype=np.float32)
+    offsets = np.arange(chunk_frames)
+    outro_fade = int(sample_rate * 60.0 / bpm * BEATS_PER_BAR * OUTRO_FADE_BARS)
+    for chunk_start in range(0, total_frames, chunk_frames):
+        chunk_end = min(chunk_start + chunk_frames, total_frames)
+        size = chunk_end - chunk_start
+        out = buffer[:size]
+        out[...] = 0.0
+        frames = chunk_start + offsets[:size]
+        for layer in layers:
+            if layer.end <= chunk_start or layer.start >= chunk_end:
+                continue
+            first = max(layer.start, chunk_start) - chunk_start
+            last = min(layer.end, chunk_end) - chunk_start
+            span = frames[first:last]
+            audio = loops[layer.stem_id]["audio"]
+            # Loops stay on the set's beat grid: position is relative to the set start
+            samples = np.take(audio, span % len(audio), axis=0)
+            envelope = np.full(len(span), layer.gain, dtype=np.float32)
+            if layer.fade_in:
+                envelope *= np.clip((span - layer.start) / layer.fade_in, 0.0, 1.0)
+            if layer.fade_out:
+                envelope *= np.clip((layer.end - span) / layer.fade_out, 0.0, 1.0)
+            out[first:last] += samples * envelope[:, None]
+        if outro_fade and chunk_end > total_frames - outro_fade:
+            out *= np.clip((total_frames - frames) / outro_fade, 0.0, 1.0)[:, None].astype(np.float32)
+        yield out
+
+def render_set(output, genre: str = "house", bpm: float = 128, duration_sec: float = 300,
+               soundpack_root: str = DEFAULT_SOUNDPACK_ROOT, effects: Optional[List[Any]] = None,
+               format: str = "wav", sample_rate: int = DEFAULT_SAMPLE_RATE,
+               chunk_frames: int = DEFAULT_CHUNK_FRAMES) -> Dict[str, Any]:
+    """
+    Render a DJ set to disk or a pipe, chunk by chunk.
+
+    Args:
+        output: Output path or writable binary file object (e.g. sys.stdout.buffer)
+        genre: Preferred soundpack genre
+        bpm: Set tempo
+        duration_sec: Set length in seconds (up to MAX_DURATION_SEC)
+        soundpack_root: Directory containing manifest.json and the stems
+        effects: Master effect chain for dsp_engine (the tail is cut at the set end)
+        format: wav or flac
+        sample_rate: Output sample rate
+        chunk_frames: Frames per chunk
+
+    Returns:
+        Render summary (stems used, arrangement, frames, peak level, timing)
+
+    Raises:
+        ValueError: If the duration is out of range or no stem could be loaded
+    """
+    if not 0 < duration_sec <= MAX_DURATION_SEC:
+        raise ValueError(f"duration must be between 0 and {MAX_DURATION_SEC} seconds")
+    with open(os.path.join(soundpack_root, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    loops = load_loops(select_stems(manifest, genre), soundpack_root, bpm, sample_rate)
+    if not loops:
+        raise ValueError(f"No playable stems for genre {genre!r} under {soundpack_root}")
+
+    total_frames = int(duration_sec * sample_rate)
+    layers = plan_arrangement(loops, bpm, total_frames, sample_rate)
+    chunks = mix_chunks(layers, loops, total_frames, sample_rate, bpm, chunk_frames)
+    if effects:
+        chunks = EffectChain(effects, sample_rate, block_size=MASTER_BLOCK_SIZE).stream(chunks, include_tail=False)
+
+    if isinstance(output, str) and os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    started = time.time()
+    logger.info(f"🎛️ Rendering {duration_sec}s {genre} set at {bpm} BPM from {len(loops)} stem(s)")
+    with AudioStreamWriter(output, sample_rate, OUTPUT_CHANNELS, format, total_frames) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    elapsed = time.time() - started
+    logger.info(f"✅ Rendered {writer.frames_written / sample_rate:.1f}s of audio in {elapsed:.1f}s")
+    return {
+        "output_file": output if isinstance(output, str) else None,
+        "format": format,
+        "genre": genre,
+        "bpm": bpm,
+        "duration": duration_sec,
+        "sample_rate": sample_rate,
+        "channels": OUTPUT_CHANNELS,
+        "frames": writer.frames_written,
+        "stems": sorted(loops),
+        "layers": len(layers),
+        "peak_dbfs": round(20 * math.log10(writer.peak), 2) if writer.peak > 0 else None,
+        "clipped_samples": writer.clipped_samples,
+        "render_sec": round(elapsed, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a DJ set from soundpack stems, streaming to disk")
+    parser.add_argument("--genre", default="house", help="Preferred soundpack genre")
+    parser.add_argument("--bpm", type=float, default=128, help="Set tempo")
+    parser.add_argument("--duration", type=float, default=300, help="Set length in seconds")
+    parser.add_argument("--root", default=DEFAULT_SOUNDPACK_ROOT, help="Soundpack directory")
+    parser.add_argument("--effects", default="[]", help="JSON master effect chain (see dsp_engine)")
+    parser.add_argument("--format", choices=["wav", "flac"], default="wav", help="Output format")
+    parser.add_argument("--output", required=True, help="Output file, or - for stdout")
+    args = parser.parse_args()
+    output = sys.stdout.buffer if args.output == "-" else args.output
+    summary = render_set(output, args.genre, args.bpm, args.duration, args.root,
+                         json.loads(args.effects), args.format)
+    if args.output != "-":
+        print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
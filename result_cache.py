@@ -0,0 +1,347 @@
+"""
+EDM Shuffle Crew Result Cache
+
+Content-addressed cache for crew workflow results. The key is a canonical hash
+of the task descriptions and expected outputs produced by the create_*_task
+factories plus the configuration of the agents running them, so users whose
+preferences render to identical tasks (same archetype, genres, ...) share one
+cached plan regardless of user ID.
+
+Entries expire after ttl_sec and each backend keeps at most max_entries,
+evicting the least recently used first. Concurrent misses on the same key are
+single-flight: get_or_compute runs one computation and the other callers wait
+for its result. Backends:
+- MemoryBackend: per-process dictionary
+- SQLiteBackend: single SQLite file shared between processes
+- DirectoryBackend: one JSON file per entry
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SEC = 24 * 3600
+DEFAULT_MAX_ENTRIES = 1024
+
+# =============================================================================
+# CACHE KEYS
+# =============================================================================
+
+def _agent_fingerprint(agent: Any) -> Dict[str, Any]:
+    llm = getattr(agent, "llm", None)
+    return {
+        "role": getattr(agent, "role", None),
+        "goal": getattr(agent, "goal", None),
+        "backstory": getattr(agent, "backstory", None),
+        "tools": sorted(getattr(tool, "name", type(tool).__name__) for tool in getattr(agent, "tools", None) or []),
+        "llm": getattr(llm, "model", None) or getattr(llm, "model_name", None),
+    }
+
+def workflow_cache_key(workflow: str, tasks: Iterable[Any]) -> str:
+    """
+    Canonical hash of a workflow's tasks and the agents assigned to them.
+
+    Args:
+        workflow: Workflow name, so different workflows never share entries
+        tasks: CrewAI tasks as returned by the create_*_task factories
+
+    Returns:
+        Hex digest identifying the workflow inputs
+    """
+    payload = {
+        "workflow": workflow,
+        "tasks": [
+            {
+                "description": " ".join(str(task.description).split()),
+                "expected_output": " ".join(str(task.expected_output).split()),
+                "agent": _agent_fingerprint(task.agent),
+            }
+            for task in tasks
+        ],
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class MemoryBackend:
+    """In-process LRU dictionary."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, stored_at: float, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteBackend:
+    """SQLite table with last-access tracking for LRU eviction."""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT stored_at, value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+            return row
+
+    def set(self, key: str, stored_at: float, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, stored_at, time.time(), value),
+            )
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results")
+
+class DirectoryBackend:
+    """
+    One JSON file per entry; file mtime records last access.
+
+    The directory is listed once on start-up; after that the entry order is
+    tracked in memory so a set() does not rescan the directory.
+    """
+
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._entries: "OrderedDict[str, None]" = OrderedDict(
+            (key, None) for _, key in sorted(self._scan())
+        )
+        with self._lock:
+            self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _scan(self) -> Iterable[Tuple[float, str]]:
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    yield os.path.getmtime(os.path.join(self.directory, name)), name[:-len(".json")]
+                except OSError:
+                    continue
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            now = time.time()
+            os.utime(path, (now, now))
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return entry["stored_at"], entry["value"]
+
+    def set(self, key: str, stored_at: float, value: str) -> None:
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": stored_at, "value": value}, f)
+            os.replace(tmp_path, self._path(key))
+            # Explicit times: some filesystems only update mtime per clock tick
+            now = time.time()
+            os.utime(self._path(key), (now, now))
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, key in list(self._scan()):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries.clear()
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class ResultCache:
+    """
+    TTL-bounded workflow result cache over a pluggable backend.
+
+    Values are stored as JSON (non-serializable objects such as crew outputs
+    are converted with str()), so every backend returns plain data.
+    """
+
+    def __init__(self, backend: Any = None, ttl_sec: float = DEFAULT_TTL_SEC):
+        """
+        Args:
+            backend: MemoryBackend, SQLiteBackend or DirectoryBackend
+                (defaults to a MemoryBackend)
+            ttl_sec: Seconds an entry stays valid after being stored
+        """
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl_sec = ttl_sec
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._in_flight_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl_sec:
+            self.backend.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value (other objects are stored via str())."""
+        self.backend.set(key, time.time(), json.dumps(value, default=str))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       cacheable: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Only one caller computes a given key at a time; concurrent callers
+        wait for it and then read its result from the cache. If that result
+        was not cacheable, the next waiter computes in turn.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            cacheable: Predicate deciding whether a computed value is stored
+                (defaults to storing every value)
+
+        Returns:
+            Tuple of (value, cache_hit)
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value, True
+            with self._in_flight_lock:
+                done = self._in_flight.get(key)
+                leader = done is None
+                if leader:
+                    done = self._in_flight[key] = threading.Event()
+            if not leader:
+                done.wait()
+                continue
+            try:
+                value = compute()
+                if cacheable is None or cacheable(value):
+                    self.set(key, value)
+                return value, False
+            finally:
+                with self._in_flight_lock:
+                    del self._in_flight[key]
+                done.set()
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+def create_result_cache(spec: str = "memory", ttl_sec: float = DEFAULT_TTL_SEC,
+                        max_entries: int = DEFAULT_MAX_ENTRIES) -> Optional[ResultCache]:
+    """
+    Build a result cache from a spec string.
+
+    Args:
+        spec: "memory", "sqlite:<path>", "dir:<path>" or "off"
+        ttl_sec: Entry time-to-live in seconds
+        max_entries: Maximum number of entries kept by the backend
+
+    Returns:
+        ResultCache, or None when spec is "off"
+
+    Raises:
+        ValueError: If the spec is not recognised
+    """
+    kind, _, location = spec.partition(":")
+    if kind == "off":
+        return None
+    if kind == "memory":
+        backend = MemoryBackend(max_entries)
+    elif kind == "sqlite" and location:
+        backend = SQLiteBackend(location, max_entries)
+    elif kind == "dir" and location:
+        backend = DirectoryBackend(location, max_entries)
+    else:
+        raise ValueError(f"Unknown result cache spec '{spec}'. Use memory, sqlite:<path>, dir:<path> or off")
+    return ResultCache(backend, ttl_sec)
@@ -0,0 +1,293 @@
+"""
+EDM Shuffle Festival Feed Writer
+
+Streams festival records into RSS 2.0 or Atom XML. Records are consumed from
+any iterable (including generators such as FestivalScraper.scrape) and each
+item is escaped and written to the output stream as soon as it is read, so the
+feed is never assembled as one in-memory string.
+
+A FeedItemIndex persisted between runs maps each item's guid to a hash of its
+content and keeps a window of the most recently published items. Each run
+emits the new or changed festivals first, stamped with the run time, then
+fills the feed up to max_items from the window with their original
+publication times, so a run without changes still publishes the full feed
+and subscribers only see genuinely new items as new.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+from xml.sax.saxutils import escape, quoteattr
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+FEED_TITLE = "EDM Shuffle Festival Updates"
+FEED_DESCRIPTION = "Latest EDM festival announcements and updates"
+FEED_LINK = "https://edmshuffle.com/festivals"
+DEFAULT_MAX_ITEMS = 500
+# Characters XML 1.0 does not allow at all, even escaped; scraped text can
+# contain them and a single one makes the whole feed unreadable
+INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+# =============================================================================
+# ITEM INDEX
+# =============================================================================
+
+def record_guid(record: Dict[str, Any]) -> str:
+    """Stable guid for a festival record: its canonical ID, own URL, or name + start date."""
+    if record.get("canonical_id"):
+        return f"urn:edmshuffle:festival:{record['canonical_id']}"
+    # Listing pages without per-event links report the page URL for every
+    # festival on it, which cannot identify a single item
+    if record.get("url") and record.get("url") != record.get("source_url"):
+        return record["url"]
+    key = f"{record.get('name', '')}|{record.get('start_date', '')}".lower()
+    return "urn:edmshuffle:festival:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Hash of a record's content, independent of key order."""
+    canonical = json.dumps(record, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class FeedItemIndex:
+    """
+    Persisted guid -> content hash index of items already published, plus the
+    window of most recently published items the feed is rebuilt from.
+    """
+
+    def __init__(self, path: Optional[str] = None, window_size: int = DEFAULT_MAX_ITEMS):
+        """
+        Args:
+            path: JSON file backing the index; the index is in-memory only if omitted
+            window_size: Most recently published items kept for re-emission
+        """
+        self.path = path
+        self.window_size = window_size
+        self.items: Dict[str, str] = {}
+        # Newest first: {"guid", "published" (ISO 8601), "record"}
+        self.window: List[Dict[str, Any]] = []
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if "items" in data and "window" in data:
+                self.items, self.window = data["items"], data["window"]
+            else:
+                # Indexes written before the window existed are a bare guid -> hash map
+                self.items = data
+
+    def is_current(self, guid: str, digest: str) -> bool:
+        """True if this exact content was already published under guid."""
+        return self.items.get(guid) == digest
+
+    def mark(self, guid: str, digest: str) -> None:
+        self.items[guid] = digest
+
+    def publish(self, published: List[Dict[str, Any]]) -> None:
+        """Put newly published window entries in front, replacing older entries for the same guids."""
+        guids = {entry["guid"] for entry in published}
+        kept = [entry for entry in self.window if entry["guid"] not in guids]
+        self.window = (published + kept)[:self.window_size]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"items": self.items, "window": self.window}, f, default=str)
+        os.replace(tmp_path, self.path)
+
+# =============================================================================
+# FEED WRITERS
+# =============================================================================
+
+def _item_summary(record: Dict[str, Any]) -> str:
+    parts = []
+    dates = " to ".join(d for d in (record.get("start_date"), record.get("end_date")) if d)
+    if dates:
+        parts.append(dates)
+    if record.get("location"):
+        parts.append(str(record["location"]))
+    if record.get("lineup"):
+        parts.append("Lineup: " + ", ".join(str(a) for a in record["lineup"] if a))
+    return " | ".join(parts)
+
+def _clean(value: Any) -> str:
+    return INVALID_XML_CHARS.sub("", "" if value is None else str(value))
+
+def _text(value: Any) -> str:
+    return escape(_clean(value))
+
+def _attr(value: Any) -> str:
+    return quoteattr(_clean(value))
+
+class _RssWriter:
+    def __init__(self, out: TextIO, now: datetime):
+        self.out = out
+        self.published = format_datetime(now)
+        self.now = now
+
+    def header(self) -> None:
+        self.out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.out.write('<rss version="2.0">\n  <channel>\n')
+        self.out.write(f"    <title>{_text(FEED_TITLE)}</title>\n")
+        self.out.write(f"    <description>{_text(FEED_DESCRIPTION)}</description>\n")
+        self.out.write(f"    <link>{_text(FEED_LINK)}</link>\n")
+        self.out.write(f"    <lastBuildDate>{self.published}</lastBuildDate>\n")
+
+    def item(self, record: Dict[str, Any], guid: str, published: Optional[datetime] = None) -> None:
+        permalink = "true" if guid == record.get("url") else "false"
+        self.out.write("    <item>\n")
+        self.out.write(f"      <title>{_text(record.get('name'))}</title>\n")
+        if record.get("url"):
+            self.out.write(f"      <link>{_text(record['url'])}</link>\n")
+        self.out.write(f"      <guid isPermaLink={_attr(permalink)}>{_text(guid)}</guid>\n")
+        self.out.write(f"      <description>{_text(_item_summary(record))}</description>\n")
+        self.out.write(f"      <pubDate>{format_datetime(published or self.now)}</pubDate>\n")
+        self.out.write("    </item>\n")
+
+    def footer(self) -> None:
+        self.out.write("  </channel>\n</rss>\n")
+
+class _AtomWriter:
+    def __init__(self, out: TextIO, now: datetime):
+        self.out = out
+        self.updated = now.isoformat()
+        self.now = now
+
+    def header(self) -> None:
+        self.out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.out.write('<feed xmlns="http://www.w3.org/2005/Atom">\n')
+        self.out.write(f"  <title>{_text(FEED_TITLE)}</title>\n")
+        self.out.write(f"  <subtitle>{_text(FEED_DESCRIPTION)}</subtitle>\n")
+        self.out.write(f"  <link href={_attr(FEED_LINK)}/>\n")
+        self.out.write(f"  <id>{_text(FEED_LINK)}</id>\n")
+        self.out.write(f"  <updated>{self.updated}</updated>\n")
+
+    def item(self, record: Dict[str, Any], guid: str, published: Optional[datetime] = None) -> None:
+        self.out.write("  <entry>\n")
+        self.out.write(f"    <title>{_text(record.get('name'))}</title>\n")
+        if record.get("url"):
+            self.out.write(f"    <link href={_attr(record['url'])}/>\n")
+        self.out.write(f"    <id>{_text(guid)}</id>\n")
+        self.out.write(f"    <updated>{(published or self.now).isoformat()}</updated>\n")
+        self.out.write(f"    <summary>{_text(_item_summary(record))}</summary>\n")
+        self.out.write("  </entry>\n")
+
+    def footer(self) -> None:
+        self.out.write("</feed>\n")
+
+FEED_WRITERS = {
+    "rss": _RssWriter,
+    "atom": _AtomWriter,
+}
+
+def write_feed(records: Iterable[Dict[str, Any]], out: TextIO, feed_format: str = "rss",
+               index: Optional[FeedItemIndex] = None,
+               max_items: int = DEFAULT_MAX_ITEMS) -> int:
+    """
+    Stream festival records into a feed.
+
+    Without an index every record is written. With an index, new or changed
+    records are written first (and marked published), then the feed is
+    filled up to max_items from the index's window of previously published
+    items, keeping their original publication times.
+
+    Args:
+        records: Iterable of festival record dictionaries
+        out: Text stream the XML is written to
+        feed_format: "rss" (RSS 2.0) or "atom"
+        index: Published-item index; updated in place (the caller saves it)
+        max_items: Maximum number of items in the feed
+
+    Returns:
+        Number of items written
+
+    Raises:
+        ValueError: If feed_format is not supported
+    """
+    if feed_format not in FEED_WRITERS:
+        raise ValueError(f"Unsupported feed format '{feed_format}'. Available: {list(FEED_WRITERS.keys())}")
+
+    now = datetime.now(timezone.utc)
+    writer = FEED_WRITERS[feed_format](out, now)
+    writer.header()
+
+    written = 0
+    skipped = 0
+    published: List[Dict[str, Any]] = []
+    for record in records:
+        if written >= max_items:
+            break
+        guid = record_guid(record)
+        if index is not None:
+            digest = content_hash(record)
+            if index.is_current(guid, digest):
+                skipped += 1
+                continue
+            index.mark(guid, digest)
+            published.append({"guid": guid, "published": now.isoformat(), "record": record})
+        writer.item(record, guid)
+        written += 1
+
+    retained = 0
+    if index is not None:
+        emitted = {entry["guid"] for entry in published}
+        for entry in index.window:
+            if written >= max_items:
+                break
+            if entry["guid"] in emitted:
+                continue
+            writer.item(entry["record"], entry["guid"], datetime.fromisoformat(entry["published"]))
+            written += 1
+            retained += 1
+        index.publish(published)
+
+    writer.footer()
+    logger.info(f"Wrote {written} feed items ({written - retained} new or changed, "
+                f"{retained} previously published, {skipped} unchanged skipped)")
+    return written
+
+def write_feed_file(records: Iterable[Dict[str, Any]], path: str, feed_format: str = "rss",
+                    index_path: Optional[str] = None,
+                    max_items: int = DEFAULT_MAX_ITEMS) -> int:
+    """
+    Stream festival records into a feed file, replacing it atomically.
+
+    The item index is only saved once the feed has been written completely,
+    so a failed run does not mark items as published.
+
+    Args:
+        records: Iterable of festival record dictionaries
+        path: Output feed file
+        feed_format: "rss" (RSS 2.0) or "atom"
+        index_path: JSON file for the published-item index (optional)
+        max_items: Maximum number of items in the feed
+
+    Returns:
+        Number of items written
+    """
+    index = FeedItemIndex(index_path, window_size=max_items) if index_path else None
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            written = write_feed(records, f, feed_format, index, max_items)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if index:
+        index.save()
+    return written
@@ -0,0 +1,203 @@
+"""
+EDM Shuffle Scrape Response Cache
+
+On-disk HTTP response cache used by FestivalScraper for conditional GETs.
+Each URL is stored as a body file plus a JSON metadata file holding its
+ETag / Last-Modified validators and the festival records parsed from the
+body, so a 304 Not Modified response can reuse the records without fetching
+or re-parsing the page.
+
+Entries are evicted when they have not been stored or revalidated within
+max_age_sec, or when the total cache size exceeds max_bytes (least recently
+used first). Pruning scans the whole directory, so it runs every
+prune_every stores and once at the end of each scrape run rather than per page.
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "festival_pages")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE_SEC = 30 * 24 * 3600
+DEFAULT_PRUNE_EVERY = 200
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ScrapeCache:
+    """
+    URL-keyed response cache storing bodies, validators and parsed records.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_sec: float = DEFAULT_MAX_AGE_SEC,
+                 prune_every: int = DEFAULT_PRUNE_EVERY):
+        """
+        Args:
+            directory: Cache directory (created if missing)
+            max_bytes: Maximum total size of cached bodies and metadata
+            max_age_sec: Entries not stored or revalidated within this are evicted
+            prune_every: Prune after this many stores (0 leaves pruning to the caller)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+        self.prune_every = prune_every
+        self._stores_since_prune = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return cached metadata for a URL, or None if missing or expired.
+
+        The returned dict contains url, etag, last_modified, stored_at and
+        records.
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            # mtime is refreshed by touch(), so a revalidated entry stays live
+            if time.time() - os.path.getmtime(meta_path) > self.max_age_sec:
+                self._remove(meta_path, body_path)
+                return None
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a cached URL."""
+        entry = self.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def get_body(self, url: str) -> Optional[str]:
+        """Return the cached body for a URL, or None if missing."""
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def touch(self, url: str) -> None:
+        """Mark a cached entry as recently used (e.g. after a 304)."""
+        meta_path, body_path = self._paths(url)
+        # Explicit times: some filesystems only update mtime per clock tick
+        now = time.time()
+        for path in (meta_path, body_path):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+
+    def store(self, url: str, body: str, etag: Optional[str],
+              last_modified: Optional[str], records: List[Dict[str, Any]]) -> None:
+        """
+        Store a response body, its validators and the records parsed from it.
+
+        Responses without an ETag or Last-Modified header are not cached,
+        since they can never be revalidated.
+        """
+        if not etag and not last_modified:
+            return
+
+        meta_path, body_path = self._paths(url)
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+            "records": records,
+        }
+        with self._lock:
+            _atomic_write(body_path, body.encode("utf-8"))
+            _atomic_write(meta_path, json.dumps(entry).encode("utf-8"))
+            self._stores_since_prune += 1
+            due = self.prune_every > 0 and self._stores_since_prune >= self.prune_every
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Evict expired entries, then least recently used entries until the
+        cache fits in max_bytes.
+
+        Returns:
+            Number of entries evicted
+        """
+        with self._lock:
+            self._stores_since_prune = 0
+            now = time.time()
+            entries = {}
+            for name in os.listdir(self.directory):
+                base, ext = os.path.splitext(name)
+                if ext not in (".json", ".body"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                size, last_used = entries.get(base, (0, 0.0))
+                entries[base] = (size + stat.st_size, max(last_used, stat.st_mtime))
+
+            evicted = 0
+            total = sum(size for size, _ in entries.values())
+            # Oldest first: expired entries go regardless, the rest only while
+            # the cache is over budget
+            for base, (size, last_used) in sorted(entries.items(), key=lambda item: item[1][1]):
+                if now - last_used <= self.max_age_sec and total <= self.max_bytes:
+                    break
+                base_path = os.path.join(self.directory, base)
+                self._remove(base_path + ".json", base_path + ".body")
+                total -= size
+                evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} cached festival pages")
+        return evicted
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith((".json", ".body", ".tmp")):
+                    self._remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove(*paths: str) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
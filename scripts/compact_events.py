@@ -0,0 +1,49 @@
+import argparse
+import json
+import os
+import sys
+
+# Add project root to path to allow imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.event_store import DEFAULT_EVENT_DB, LocalEventStore
+from utils.event_segments import (
+    COMPRESSION_GZIP, COMPRESSION_ZSTD, DEFAULT_ARCHIVE_DIR, EventSegmentLog, compact, zstandard,
+)
+
+def main():
+    """Moves old events into daily compressed segments and enforces retention."""
+    parser = argparse.ArgumentParser(description="Compact the local EDM Shuffle event store")
+    parser.add_argument("--db", default=os.getenv("EDM_EVENT_DB", DEFAULT_EVENT_DB),
+                        help="Local event store path")
+    parser.add_argument("--archive", default=os.getenv("EDM_EVENT_ARCHIVE", DEFAULT_ARCHIVE_DIR),
+                        help="Directory of daily segment files")
+    parser.add_argument("--namespace", default="edm_shuffle")
+    parser.add_argument("--compression", choices=[COMPRESSION_GZIP, COMPRESSION_ZSTD],
+                        default=COMPRESSION_ZSTD if zstandard else COMPRESSION_GZIP,
+                        help="Segment compression (zstd when zstandard is installed)")
+    parser.add_argument("--hot-days", type=int, default=7,
+                        help="Days of events kept in the indexed store")
+    parser.add_argument("--rollup-days", type=int, default=30,
+                        help="Segments older than this keep only per-function duration summaries")
+    parser.add_argument("--retention-days", type=int, default=180,
+                        help="Segments older than this are deleted")
+    args = parser.parse_args()
+
+    if not args.hot_days <= args.rollup_days <= args.retention_days:
+        parser.error("expected --hot-days <= --rollup-days <= --retention-days")
+    if not os.path.exists(args.db):
+        print(f"🔥 Event store not found: {args.db}", file=sys.stderr)
+        sys.exit(1)
+
+    store = LocalEventStore(args.db, namespace=args.namespace)
+    segments = EventSegmentLog(os.path.join(args.archive, args.namespace), compression=args.compression)
+    try:
+        stats = compact(store, segments, hot_days=args.hot_days,
+                        rollup_days=args.rollup_days, retention_days=args.retention_days)
+    finally:
+        store.close()
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
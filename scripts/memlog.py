@@ -1,6 +1,8 @@
 import sys
 import subprocess
 import os
+import time
+import uuid
 
 # Add the project root to the Python path to find the logger module
 # This assumes the script is in project_root/mystic_arcana/scripts/
@@ -19,15 +21,18 @@ def main():
 
     command = sys.argv[1:]
     command_str = " ".join(command)
+    # Shared by the run/success/error events so compaction can pair them
+    invocation_id = f"memlog_{uuid.uuid4().hex[:12]}"
     
     # Log the command before execution
     print(f" M_LOG -> {command_str}")
     log_event(
         user_id="dev_cli",
         event_type="command_run",
-        payload={"command": command_str}
+        payload={"command": command_str, "function": command[0], "invocation_id": invocation_id}
     )
     
+    start_time = time.time()
     try:
         # Execute the command and stream its output
         process = subprocess.run(command, check=True)
@@ -36,7 +41,13 @@ def main():
         log_event(
             user_id="dev_cli",
             event_type="command_success",
-            payload={"command": command_str, "exit_code": process.returncode}
+            payload={
+                "command": command_str,
+                "function": command[0],
+                "invocation_id": invocation_id,
+                "duration_sec": time.time() - start_time,
+                "exit_code": process.returncode
+            }
         )
     except subprocess.CalledProcessError as e:
         # Log failure
@@ -45,6 +56,9 @@ def main():
             event_type="command_error",
             payload={
                 "command": command_str,
+                "function": command[0],
+                "invocation_id": invocation_id,
+                "duration_sec": time.time() - start_time,
                 "exit_code": e.returncode,
                 "stderr": e.stderr if e.stderr else ""
             }
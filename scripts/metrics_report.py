@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add project root to path to allow imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.event_store import DEFAULT_EVENT_DB, LocalEventStore
+from utils.metrics import (
+    REPORT_QUANTILES, FunctionStats, load_snapshots, report_rows, serve_prometheus, to_prometheus,
+)
+from query_memory import parse_time
+
+def stats_from_events(args):
+    """
+    Builds histograms from *_success / *_error events in the local event store.
+
+    Events are sampled, but slow calls are always recorded, so percentiles
+    from events are biased upward whenever sampling was on; a warning gives
+    the number of such slow-only events. Snapshots are exact.
+    """
+    if not os.path.exists(args.db):
+        print(f"🔥 Event store not found: {args.db}", file=sys.stderr)
+        sys.exit(1)
+
+    since = parse_time(args.since or "1h")
+    until = parse_time(args.until) if args.until else time.time()
+    store = LocalEventStore(args.db, namespace=args.namespace)
+    stats = {}
+    slow_only = 0
+    try:
+        for event in store.iter_range(since=since, until=until):
+            event_type = event["event_type"]
+            payload = event["payload"]
+            if not event_type.endswith(("_success", "_error")) or "duration_sec" not in payload:
+                continue
+            # Unsampled calls carry their argument summary on the final event
+            if payload.get("slow") and "args" in payload:
+                slow_only += 1
+            key = (event_type.rsplit("_", 1)[0], payload.get("function"))
+            function_stats = stats.setdefault(key, FunctionStats())
+            function_stats.latency.record(float(payload["duration_sec"]))
+            if event_type.endswith("_error"):
+                function_stats.errors += 1
+    finally:
+        store.close()
+    if slow_only:
+        print(f"⚠️ {slow_only} events are slow calls recorded outside sampling; percentiles and rates "
+              f"from sampled events skew high. Use --snapshot for exact figures.", file=sys.stderr)
+    return stats, max(until - since, 1e-9)
+
+def format_seconds(value):
+    if value is None:
+        return "-"
+    return f"{value * 1000:.1f}ms" if value < 1 else f"{value:.2f}s"
+
+def print_table(rows):
+    percentile_columns = [f"p{round(q * 100)}_sec" for q in REPORT_QUANTILES]
+    header = ["function", "calls", "rate/s", "err%"] + [column[:-4] for column in percentile_columns] + ["max"]
+    lines = [header]
+    for row in rows:
+        lines.append(
+            [f"{row['event_type']}:{row['function']}", str(row["calls"]), f"{row['calls_per_sec']:.3f}",
+             f"{row['error_rate'] * 100:.1f}"]
+            + [format_seconds(row[column]) for column in percentile_columns]
+            + [format_seconds(row["max_sec"])]
+        )
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    for line in lines:
+        print("  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                        for i, (cell, width) in enumerate(zip(line, widths))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency percentiles per function from log_invocation data")
+    parser.add_argument("--snapshot", nargs="+",
+                        help="Snapshot files written via EDM_METRICS_FILE (merged); "
+                             "without this, histograms are built from the local event store")
+    parser.add_argument("--db", default=os.getenv("EDM_EVENT_DB", DEFAULT_EVENT_DB),
+                        help="Local event store path")
+    parser.add_argument("--namespace", default="edm_shuffle")
+    parser.add_argument("--since",
+                        help="Window start: ISO timestamp or age like 1h / 7d (default 1h for the event "
+                             "store; snapshots default to all-time totals and keep the last hour of windows)")
+    parser.add_argument("--until", help="Window end: ISO timestamp or age (default now)")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON lines")
+    parser.add_argument("--prometheus", help="Also write Prometheus text format to this file")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="Serve the report as Prometheus /metrics on this port until interrupted")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+        stats, covered = load_snapshots(args.snapshot, since=since, until=until)
+    else:
+        stats, covered = stats_from_events(args)
+
+    rows = report_rows(stats, covered)
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+    elif rows:
+        print_table(rows)
+    else:
+        print("No timed calls found.")
+
+    if args.prometheus:
+        with open(args.prometheus, "w", encoding="utf-8") as f:
+            f.write(to_prometheus(stats))
+
+    if args.serve:
+        text = to_prometheus(stats)
+        serve_prometheus(lambda: text, args.serve)
+        print(f"📈 Serving http://127.0.0.1:{args.serve}/metrics (Ctrl+C to stop)", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
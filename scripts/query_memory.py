@@ -1,14 +1,21 @@
+import argparse
+import json
 import sys
 import os
+from datetime import datetime, timedelta, timezone
 from pprint import pprint
 
 # Add project root to path to allow imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from a_mem.store import MemoryStore
+from utils.event_store import DEFAULT_EVENT_DB, DEFAULT_PAGE_SIZE, LocalEventStore
+from utils.event_segments import DEFAULT_ARCHIVE_DIR, EventSegmentLog
 
 def query_latest_events(namespace="edm_shuffle", limit=10):
     """Queries and prints the most recent events from the memory store."""
+    from a_mem.store import MemoryStore
+
     print(f"\n--- Querying latest {limit} events from '{namespace}' ---")
     try:
         store = MemoryStore(namespace=namespace)
@@ -20,9 +27,89 @@ def query_latest_events(namespace="edm_shuffle", limit=10):
         for event in events:
             pprint(event.to_dict())
             print("-" * 20)
-            
+
     except Exception as e:
         print(f"🔥 Error querying memory: {e}")
 
+def parse_time(value):
+    """Epoch seconds from an ISO timestamp or a relative age such as 30m, 24h or 7d."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].isdigit():
+        age = timedelta(seconds=int(value[:-1]) * units[value[-1]])
+        return (datetime.now(timezone.utc) - age).timestamp()
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def query_local_events(args):
+    """Prints one page of matching events from the local event store as JSON lines."""
+    if not os.path.exists(args.db):
+        print(f"🔥 Event store not found: {args.db}", file=sys.stderr)
+        sys.exit(1)
+
+    store = LocalEventStore(args.db, namespace=args.namespace)
+    events, next_cursor = store.query(
+        event_type=args.event_type,
+        user_id=args.user,
+        since=parse_time(args.since) if args.since else None,
+        until=parse_time(args.until) if args.until else None,
+        invocation_id=args.invocation_id,
+        limit=args.limit,
+        cursor=args.cursor,
+    )
+    store.close()
+
+    for event in events:
+        print(json.dumps(event, default=str))
+    if next_cursor:
+        # Keep stdout pure JSON lines; the cursor goes to stderr
+        print(f"next cursor: {next_cursor}", file=sys.stderr)
+
+def query_archived_events(args):
+    """Prints matching events from the daily segment archive as JSON lines."""
+    directory = os.path.join(args.archive, args.namespace)
+    if not os.path.isdir(directory):
+        print(f"🔥 Event archive not found: {directory}", file=sys.stderr)
+        sys.exit(1)
+
+    segments = EventSegmentLog(directory)
+    events = segments.iter_events(
+        since=parse_time(args.since) if args.since else None,
+        until=parse_time(args.until) if args.until else None,
+        event_type=args.event_type,
+        user_id=args.user,
+        invocation_id=args.invocation_id,
+    )
+    for count, event in enumerate(events):
+        if count >= args.limit:
+            break
+        print(json.dumps(event, default=str))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query EDM Shuffle memory events")
+    parser.add_argument("--source", choices=["local", "archive", "a-mem"], default="local",
+                        help="Indexed local event store (default), compacted daily segments, or the A-mem MemoryStore")
+    parser.add_argument("--db", default=os.getenv("EDM_EVENT_DB", DEFAULT_EVENT_DB),
+                        help="Local event store path")
+    parser.add_argument("--archive", default=os.getenv("EDM_EVENT_ARCHIVE", DEFAULT_ARCHIVE_DIR),
+                        help="Segment directory written by scripts/compact_events.py")
+    parser.add_argument("--namespace", default="edm_shuffle")
+    parser.add_argument("--event-type", help="Exact event type, e.g. function_call_error")
+    parser.add_argument("--user", help="User ID")
+    parser.add_argument("--since", help="Start time: ISO timestamp or age like 24h / 7d")
+    parser.add_argument("--until", help="End time: ISO timestamp or age like 1h")
+    parser.add_argument("--invocation-id", help="Events of a single invocation or workflow run")
+    parser.add_argument("--limit", type=int, default=DEFAULT_PAGE_SIZE, help="Page size")
+    parser.add_argument("--cursor", help="Cursor printed by the previous page (local source only)")
+    args = parser.parse_args()
+
+    if args.source == "a-mem":
+        query_latest_events(args.namespace, args.limit)
+    elif args.source == "archive":
+        query_archived_events(args)
+    else:
+        query_local_events(args)
+
 if __name__ == "__main__":
-    query_latest_events()
+    main()
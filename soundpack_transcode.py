@@ -0,0 +1,355 @@
+"""
+EDM Shuffle Soundpack Loudness Normalization and Transcoding
+
+Prepares soundpack stems for adaptive loading in the mix station:
+- measures integrated loudness (ITU-R BS.1770-4 / EBU R128: K-weighting,
+  400 ms blocks with 75% overlap, absolute and relative gating) and true
+  peak (4x oversampled)
+- computes the gain that brings each stem to TARGET_LUFS without pushing its
+  true peak above TRUE_PEAK_CEILING_DBTP
+- transcodes each stem with that gain applied to every variant in VARIANTS
+  (Opus and AAC at several bitrates) with ffmpeg
+- records loudness and per-variant files and sizes on the stems in
+  manifest.json, so the front end can pick the smallest variant it can play
+
+Measurements are cached by content hash (analysis_cache.py) and variants are
+only re-encoded when missing, older than their source or encoded with a
+different gain. Work is spread over a process pool: each stem's variant
+encodes are queued as soon as its measurement finishes, and idle workers
+take the next queued task, so one long stem does not hold up the rest.
+
+Usage:
+    python soundpack_transcode.py public/soundpacks --workers 8
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+
+import numpy as np
+from scipy.signal import lfilter, resample_poly
+
+from analysis_cache import DEFAULT_CACHE_PATH, AnalysisCache
+from audio_analysis import MANIFEST_NAME, VARIANTS_DIR, load_manifest, write_json_atomic
+from audio_io import AudioDecodeError, load_audio
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump whenever the loudness measurement changes so cached values are recomputed
+LOUDNESS_VERSION = "1"
+LOUDNESS_ANALYZER = "loudness"
+TARGET_LUFS = -14.0
+TRUE_PEAK_CEILING_DBTP = -1.0
+TRUE_PEAK_OVERSAMPLING = 4
+BLOCK_SEC = 0.4
+BLOCK_OVERLAP = 0.75
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+# Gains within this many dB of a variant's recorded gain do not trigger a re-encode
+GAIN_TOLERANCE_DB = 0.05
+
+VARIANTS = [
+    {"id": "opus-48", "format": "opus", "codec": "libopus", "bitrate_kbps": 48, "extension": "opus"},
+    {"id": "opus-96", "format": "opus", "codec": "libopus", "bitrate_kbps": 96, "extension": "opus"},
+    {"id": "aac-96", "format": "aac", "codec": "aac", "bitrate_kbps": 96, "extension": "m4a"},
+    {"id": "aac-160", "format": "aac", "codec": "aac", "bitrate_kbps": 160, "extension": "m4a"},
+]
+
+# =============================================================================
+# LOUDNESS
+# =============================================================================
+
+def k_weighting(sample_rate: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    BS.1770 K-weighting filter stages (high shelf, then high-pass) for any sample rate.
+
+    The analog prototypes are matched to the spec's 48 kHz coefficients and
+    re-discretized with the bilinear transform, as in libebur128.
+    """
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf_b = np.array([(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0])
+    shelf_a = np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0])
+
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1.0 + k / q + k * k
+    highpass_b = np.array([1.0, -2.0, 1.0])
+    highpass_a = np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0])
+    return [(shelf_b, shelf_a), (highpass_b, highpass_a)]
+
+def integrated_loudness(audio: np.ndarray, sample_rate: int) -> Optional[float]:
+    """
+    Gated integrated loudness in LUFS, or None for silence.
+
+    Channels are weighted 1.0 (mono and stereo). Block energies come from
+    100 ms segment sums, so the overlapping blocks cost one pass over the
+    signal. Audio shorter than one block is measured as a single block.
+    """
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    weighted = audio.astype(np.float64)
+    for b, a in k_weighting(sample_rate):
+        weighted = lfilter(b, a, weighted, axis=0)
+    squares = np.square(weighted)
+
+    hop = int(round(sample_rate * BLOCK_SEC * (1.0 - BLOCK_OVERLAP)))
+    segments_per_block = int(round(1.0 / (1.0 - BLOCK_OVERLAP)))
+    segment_count = len(squares) // hop
+    if segment_count < segments_per_block:
+        block_power = squares.mean(axis=0)[None, :]
+    else:
+        segments = squares[:segment_count * hop].reshape(segment_count, hop, -1).sum(axis=1)
+        cumulative = np.vstack([np.zeros((1, segments.shape[1])), np.cumsum(segments, axis=0)])
+        block_power = (cumulative[segments_per_block:] - cumulative[:-segments_per_block]) / (hop * segments_per_block)
+
+    energies = block_power.sum(axis=1)
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10.0 * np.log10(energies)
+    gated = energies[loudness > ABSOLUTE_GATE_LUFS]
+    if not len(gated):
+        return None
+    relative_gate = -0.691 + 10.0 * math.log10(gated.mean()) + RELATIVE_GATE_LU
+    gated = energies[(loudness > ABSOLUTE_GATE_LUFS) & (loudness > relative_gate)]
+    return -0.691 + 10.0 * math.log10(gated.mean())
+
+def true_peak_dbtp(audio: np.ndarray) -> Optional[float]:
+    """Peak of the 4x oversampled signal in dBTP, or None for silence."""
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    oversampled = resample_poly(audio.astype(np.float64), TRUE_PEAK_OVERSAMPLING, 1, axis=0)
+    peak = max(float(np.max(np.abs(oversampled))) if len(oversampled) else 0.0,
+               float(np.max(np.abs(audio))) if len(audio) else 0.0)
+    return 20.0 * math.log10(peak) if peak > 0 else None
+
+def normalization_gain(loudness: Optional[float], true_peak: Optional[float],
+                       target_lufs: float = TARGET_LUFS,
+                       ceiling_dbtp: float = TRUE_PEAK_CEILING_DBTP) -> float:
+    """Gain in dB towards the target loudness, limited by the true-peak ceiling."""
+    if loudness is None:
+        return 0.0
+    gain = target_lufs - loudness
+    if true_peak is not None:
+        gain = min(gain, ceiling_dbtp - true_peak)
+    return round(gain, 2)
+
+def measure_file(path: str) -> Dict[str, Any]:
+    """Integrated loudness and true peak of an audio file."""
+    audio, sample_rate = load_audio(path)
+    loudness = integrated_loudness(audio, sample_rate)
+    peak = true_peak_dbtp(audio)
+    return {
+        "integrated_lufs": round(loudness, 2) if loudness is not None else None,
+        "true_peak_dbtp": round(peak, 2) if peak is not None else None,
+    }
+
+# =============================================================================
+# TRANSCODING
+# =============================================================================
+
+def variant_path(stem_file: str, variant: Dict[str, Any]) -> str:
+    """Variant location relative to the soundpack root: <pack>/variants/<stem>.<id>.<ext>."""
+    directory, name = os.path.split(stem_file)
+    base = os.path.splitext(name)[0]
+    return "/".join(part for part in (directory, VARIANTS_DIR, f"{base}.{variant['id']}.{variant['extension']}") if part)
+
+def transcode(source: str, destination: str, variant: Dict[str, Any], gain_db: float) -> int:
+    """
+    Encode one variant with ffmpeg, applying the normalization gain.
+
+    Returns:
+        Size of the written file in bytes
+
+    Raises:
+        AudioDecodeError: If ffmpeg is missing or fails
+    """
+    if not shutil.which("ffmpeg"):
+        raise AudioDecodeError("ffmpeg is required for transcoding")
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    # Keep the extension last so ffmpeg still picks the container from it
+    root, extension = os.path.splitext(destination)
+    tmp_path = f"{root}.tmp{extension}"
+    command = [
+        "ffmpeg", "-v", "error", "-y", "-i", source, "-vn",
+        "-af", f"volume={gain_db}dB",
+        "-c:a", variant["codec"], "-b:a", f"{variant['bitrate_kbps']}k",
+    ]
+    if variant["codec"] == "libopus":
+        # Opus always decodes at 48 kHz
+        command += ["-ar", "48000"]
+    command.append(tmp_path)
+    completed = subprocess.run(command, capture_output=True, check=False)
+    if completed.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise AudioDecodeError(f"ffmpeg failed for {source} ({variant['id']}): "
+                               f"{completed.stderr.decode(errors='replace').strip()}")
+    os.replace(tmp_path, destination)
+    return os.path.getsize(destination)
+
+def _measure_task(path: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """Worker entry point: never raises, so one bad file does not stop the pool."""
+    try:
+        return path, measure_file(path), None
+    except (AudioDecodeError, OSError, ValueError) as e:
+        return path, None, str(e)
+
+def _transcode_task(source: str, destination: str, variant: Dict[str, Any],
+                    gain_db: float) -> Tuple[Optional[int], Optional[str]]:
+    try:
+        return transcode(source, destination, variant, gain_db), None
+    except (AudioDecodeError, OSError) as e:
+        return None, str(e)
+
+def _variant_is_current(entry: Optional[Dict[str, Any]], source: str, destination: str, gain_db: float) -> bool:
+    return (entry is not None and os.path.exists(destination)
+            and os.path.getmtime(destination) >= os.path.getmtime(source)
+            and abs(entry.get("gain_db", float("nan")) - gain_db) <= GAIN_TOLERANCE_DB)
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+def process_soundpacks(root: str, workers: Optional[int] = None, cache: Optional[AnalysisCache] = None,
+                       variants: Optional[List[Dict[str, Any]]] = None, force: bool = False,
+                       target_lufs: float = TARGET_LUFS) -> Dict[str, Any]:
+    """
+    Measure, normalize and transcode every stem in manifest.json, then update the manifest.
+
+    Each stem gets a "loudness" object (integrated_lufs, true_peak_dbtp,
+    gain_db, target_lufs) and a "variants" list (id, format, codec,
+    bitrate_kbps, file, size, gain_db); the original file's size is stored
+    as "size".
+
+    Args:
+        root: Soundpack directory containing manifest.json
+        workers: Worker processes (defaults to the CPU count)
+        cache: Analysis cache for loudness measurements
+        variants: Variant specs (defaults to VARIANTS)
+        force: Re-encode every variant
+        target_lufs: Integrated loudness target
+
+    Returns:
+        Summary with counts of measured, encoded, reused and failed items
+    """
+    variants = variants or VARIANTS
+    manifest = load_manifest(root)
+    stems = [stem for pack in manifest.get("soundPacks", []) for stem in pack.get("stems", []) if stem.get("file")]
+    summary = {"stems": len(stems), "measured": 0, "cached": 0, "encoded": 0, "reused": 0, "errors": {}}
+
+    measurements: Dict[str, Dict[str, Any]] = {}
+    hashes: Dict[str, str] = {}
+    to_measure: List[Dict[str, Any]] = []
+    for stem in stems:
+        path = os.path.join(root, stem["file"])
+        if not os.path.exists(path):
+            summary["errors"][stem["file"]] = "audio file missing"
+            continue
+        if cache is not None:
+            hashes[stem["file"]] = cache.content_hash(path)
+            cached = cache.get(hashes[stem["file"]], LOUDNESS_ANALYZER, LOUDNESS_VERSION)
+            if cached is not None:
+                measurements[stem["file"]] = cached
+                summary["cached"] += 1
+                continue
+        to_measure.append(stem)
+
+    by_file = {stem["file"]: stem for stem in stems}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def queue_variants(stem_file: str) -> None:
+            measurement = measurements[stem_file]
+            gain = normalization_gain(measurement["integrated_lufs"], measurement["true_peak_dbtp"], target_lufs)
+            stem = by_file[stem_file]
+            source = os.path.join(root, stem_file)
+            existing = {entry.get("id"): entry for entry in stem.get("variants", [])}
+            stem["size"] = os.path.getsize(source)
+            stem["loudness"] = {**measurement, "gain_db": gain, "target_lufs": target_lufs}
+            stem["variants"] = []
+            for variant in variants:
+                relative = variant_path(stem_file, variant)
+                destination = os.path.join(root, relative)
+                entry = {key: variant[key] for key in ("id", "format", "codec", "bitrate_kbps")}
+                entry.update(file=relative, gain_db=gain)
+                stem["variants"].append(entry)
+                if not force and _variant_is_current(existing.get(variant["id"]), source, destination, gain):
+                    entry["size"] = os.path.getsize(destination)
+                    summary["reused"] += 1
+                    continue
+                future = executor.submit(_transcode_task, source, destination, variant, gain)
+                pending[future] = ("transcode", stem_file, entry)
+
+        for stem_file in measurements:
+            queue_variants(stem_file)
+        for stem in to_measure:
+            pending[executor.submit(_measure_task, os.path.join(root, stem["file"]))] = ("measure", stem["file"], None)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, stem_file, entry = pending.pop(future)
+                if kind == "measure":
+                    _, measurement, error = future.result()
+                    if error:
+                        logger.warning(f"⚠️ Could not measure {stem_file}: {error}")
+                        summary["errors"][stem_file] = error
+                        continue
+                    measurements[stem_file] = measurement
+                    summary["measured"] += 1
+                    if cache is not None:
+                        cache.put(hashes[stem_file], LOUDNESS_ANALYZER, LOUDNESS_VERSION, measurement)
+                    queue_variants(stem_file)
+                else:
+                    size, error = future.result()
+                    if error:
+                        logger.warning(f"⚠️ Could not encode {entry['file']}: {error}")
+                        summary["errors"][entry["file"]] = error
+                        continue
+                    entry["size"] = size
+                    summary["encoded"] += 1
+
+    # Variants that failed to encode are not advertised
+    for stem in stems:
+        if "variants" in stem:
+            stem["variants"] = [entry for entry in stem["variants"] if "size" in entry]
+    write_json_atomic(os.path.join(root, MANIFEST_NAME), manifest)
+    logger.info(f"✅ {summary['measured']} measured ({summary['cached']} cached), {summary['encoded']} encoded "
+                f"({summary['reused']} reused), {len(summary['errors'])} error(s)")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize loudness and transcode soundpack stems")
+    parser.add_argument("root", nargs="?", default=os.path.join("public", "soundpacks"),
+                        help="Soundpack directory containing manifest.json")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--target-lufs", type=float, default=TARGET_LUFS, help="Integrated loudness target")
+    parser.add_argument("--variants", help="Comma-separated variant ids to produce (default: all)")
+    parser.add_argument("--cache", default=os.getenv("AUDIO_ANALYSIS_CACHE", DEFAULT_CACHE_PATH),
+                        help="Analysis cache database (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Re-encode every variant")
+    args = parser.parse_args()
+
+    variants = VARIANTS
+    if args.variants:
+        wanted = set(args.variants.split(","))
+        variants = [variant for variant in VARIANTS if variant["id"] in wanted]
+        if not variants:
+            parser.error(f"No known variants in {args.variants!r}; choose from {[v['id'] for v in VARIANTS]}")
+    with AnalysisCache(args.cache) as cache:
+        summary = process_soundpacks(args.root, args.workers, cache, variants, args.force, args.target_lufs)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
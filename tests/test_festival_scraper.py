@@ -0,0 +1,141 @@
+"""
+FestivalScraper against fixture pages served from a local HTTP server.
+
+Each server runs on its own 127.0.0.1 port, which the scraper treats as a
+separate host (hosts are keyed by host:port).
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from festival_scraper import FestivalScraper, HostRateLimiter
+from scrape_cache import ScrapeCache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "festival_pages")
+
+class FixtureServer:
+    """Serves FIXTURES/<name>.html for /<name>[/...] with ETag revalidation and a request log."""
+
+    def __init__(self, delay: float = 0.0):
+        self.requests = []  # (monotonic time, path, status)
+        self.delay = delay
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.delay)
+                name = self.path.strip("/").split("/")[0]
+                path = os.path.join(FIXTURES, name + ".html")
+                if not os.path.exists(path):
+                    server.requests.append((time.monotonic(), self.path, 404))
+                    self.send_error(404)
+                    return
+                with open(path, "rb") as f:
+                    body = f.read()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.requests.append((time.monotonic(), self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                server.requests.append((time.monotonic(), self.path, 200))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def servers():
+    started = [FixtureServer(), FixtureServer()]
+    yield started
+    for server in started:
+        server.close()
+
+def test_scrape_parses_json_ld_fixtures(servers):
+    site = servers[0]
+    urls = [site.url("/edc"), site.url("/listing"), site.url("/no_events")]
+    with FestivalScraper(max_workers=4, host_interval=0) as scraper:
+        records = list(scraper.scrape(urls))
+
+    by_name = {record["name"]: record for record in records}
+    assert sorted(by_name) == ["EDC Las Vegas", "Tomorrowland", "Ultra Music Festival"]
+    edc = by_name["EDC Las Vegas"]
+    assert edc["start_date"] == "2026-05-15"
+    assert edc["location"] == "Las Vegas, NV, US"
+    assert edc["lineup"] == ["Kaskade", "Subtronics"]
+    assert edc["latitude"] == 36.2719
+    assert edc["source"] == site.base_url[len("http://"):]
+    assert by_name["Tomorrowland"]["url"] == site.url("/listing")
+
+def test_failed_pages_are_skipped(servers):
+    site = servers[0]
+    with FestivalScraper(max_workers=2, host_interval=0) as scraper:
+        records = list(scraper.scrape([site.url("/missing"), site.url("/edc")]))
+    assert [record["name"] for record in records] == ["EDC Las Vegas"]
+
+def test_conditional_get_reuses_cached_records(servers, tmp_path):
+    site = servers[0]
+    cache = ScrapeCache(str(tmp_path / "pages"))
+    with FestivalScraper(host_interval=0, cache=cache) as scraper:
+        first = list(scraper.scrape([site.url("/listing")]))
+        second = list(scraper.scrape([site.url("/listing")]))
+
+    assert [status for _, _, status in site.requests] == [200, 304]
+    assert second == first
+
+def test_hosts_are_rate_limited_independently(servers):
+    busy, quiet = servers
+    interval = 0.3
+    urls = [busy.url(f"/edc/{page}") for page in range(4)] + [quiet.url("/edc")]
+    with FestivalScraper(max_workers=4, host_interval=interval) as scraper:
+        records = list(scraper.scrape(urls))
+
+    assert len(records) == 5
+    busy_times = [at for at, _, _ in busy.requests]
+    quiet_times = [at for at, _, _ in quiet.requests]
+    # Same host: spaced by the interval
+    gaps = [later - earlier for earlier, later in zip(busy_times, busy_times[1:])]
+    assert all(gap >= interval * 0.9 for gap in gaps), gaps
+    # The other host's page is not stuck behind the busy host's queue
+    assert quiet_times[0] < busy_times[1]
+
+def test_no_worker_sleeps_on_a_rate_limit(servers):
+    # One worker and a slow busy host: the quiet page must still be fetched
+    # in the busy host's gap rather than after all of its pages
+    busy, quiet = servers
+    urls = [busy.url(f"/edc/{page}") for page in range(3)] + [quiet.url("/edc")]
+    with FestivalScraper(max_workers=1, host_interval=0.5) as scraper:
+        list(scraper.scrape(urls))
+    assert quiet.requests[0][0] < busy.requests[1][0]
+
+def test_try_acquire_reports_delay_without_reserving():
+    limiter = HostRateLimiter(default_interval=10.0, host_intervals={"fast.example": 0.0})
+    assert limiter.try_acquire("slow.example") == 0.0
+    delay = limiter.try_acquire("slow.example")
+    assert 9.0 < delay <= 10.0
+    assert limiter.try_acquire("slow.example") <= delay
+    assert limiter.try_acquire("fast.example") == 0.0
+    assert limiter.try_acquire("fast.example") == 0.0
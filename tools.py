@@ -10,13 +10,30 @@ Tool configurations require proper API keys and external service setup.
 """
 
 from crewai_tools import BaseTool
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Type
+import io
 import os
 import json
+import threading
 import requests
 from dotenv import load_dotenv
+from datetime import datetime, timezone
 import logging
 
+from analysis_cache import DEFAULT_CACHE_PATH as DEFAULT_AUDIO_CACHE, AnalysisCache
+from analytics_engine import (
+    DEFAULT_DATA_DIR as DEFAULT_ANALYTICS_DATA_DIR, DEFAULT_DB_PATH as DEFAULT_ANALYTICS_DB, CUBE_CHARTS, AnalyticsEngine,
+)
+from festival_dedupe import DEFAULT_INDEX_PATH as DEFAULT_DEDUPE_INDEX, FestivalDedupeIndex
+from festival_scraper import FestivalScraper
+from scrape_cache import DEFAULT_CACHE_DIR, ScrapeCache
+from rss_feed import FeedItemIndex, write_feed, write_feed_file
+from tracing import trace_tool_run
+# The audio engines (audio_io, dsp_engine, mix_renderer, stem_recommender,
+# waveform_peaks) need numpy and scipy; they are imported by the tools that
+# use them, so importing this module and starting a crew stays light and a
+# missing audio dependency only disables the audio tools.
+
 # Load environment variables
 load_dotenv()
 
@@ -24,6 +41,9 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_FEED_INDEX = os.path.join(".cache", "festival_feed_index.json")
+DEFAULT_SOUNDPACK_ROOT = os.path.join("public", "soundpacks")  # as in mix_renderer
+
 # =============================================================================
 # FESTIVAL SCOUTING TOOLS
 # =============================================================================
@@ -45,36 +65,37 @@ class WebScrapeFestivalTool(BaseTool):
             # TODO: Add more festival listing sites
         ]
     
+    @trace_tool_run
     def _run(self, url: str = None) -> str:
         """
         Scrape festival data from target websites.
         
+        All target pages are fetched concurrently; see festival_scraper for
+        the per-host session pooling, rate limiting and parser table. Pages
+        are revalidated against the on-disk cache in FESTIVAL_CACHE_DIR, so
+        unchanged listings are not downloaded or parsed again. The same
+        festival reported by several sources is merged into one canonical
+        record by the persistent index at FESTIVAL_DEDUPE_INDEX.
+        
         Args:
             url: Optional specific URL to scrape
             
         Returns:
             JSON string with festival data
         """
-        # TODO: Implement actual web scraping logic
-        # REQUIRES: requests, beautifulsoup4, selenium for dynamic content
-        logger.info(f"Scraping festival data from: {url or 'default URLs'}")
-        
-        # PLACEHOLDER implementation - replace with actual scraping
-        placeholder_data = {
-            "festivals": [
-                {
-                    "name": "Ultra Music Festival 2025",
-                    "location": "Miami, FL",
-                    "dates": "2025-03-28 to 2025-03-30",
-                    "lineup": ["Calvin Harris", "Tiësto", "David Guetta"],
-                    "source_url": "https://ultramusicfestival.com"
-                }
-            ],
-            "scraped_at": "2025-01-26T00:00:00Z",
-            "source": "PLACEHOLDER - Not real data"
-        }
+        urls = [url] if url else self.target_urls
+        logger.info(f"Scraping festival data from {len(urls)} source(s)")
         
-        return json.dumps(placeholder_data, indent=2)
+        cache = ScrapeCache(os.getenv("FESTIVAL_CACHE_DIR", DEFAULT_CACHE_DIR))
+        dedupe_path = os.getenv("FESTIVAL_DEDUPE_INDEX", DEFAULT_DEDUPE_INDEX)
+        with FestivalScraper(cache=cache) as scraper, FestivalDedupeIndex(dedupe_path) as index:
+            festivals = list(index.dedupe(scraper.scrape(urls)))
+        
+        return json.dumps({
+            "festivals": festivals,
+            "scraped_at": datetime.now(timezone.utc).isoformat(),
+            "data_sources": urls
+        }, indent=2)
 
 class RSSFeedGeneratorTool(BaseTool):
     """
@@ -83,36 +104,43 @@ class RSSFeedGeneratorTool(BaseTool):
     name: str = "RSS Feed Generator Tool"
     description: str = "Converts festival data into RSS feed format for platform consumption"
     
-    def _run(self, festival_data: str) -> str:
+    @trace_tool_run
+    def _run(self, festival_data: str, feed_format: str = "rss", output_path: str = None) -> str:
         """
         Generate RSS feed XML from festival data.
         
+        Festivals that are new or changed since the last run come first, then
+        the most recently published items tracked in the index at
+        FESTIVAL_FEED_INDEX, so repeated runs always return a full feed.
+        
         Args:
-            festival_data: JSON string with festival information
+            festival_data: JSON string with festival information (a list of
+                festivals or an object with a "festivals" list)
+            feed_format: "rss" (RSS 2.0) or "atom"
+            output_path: Optional file to stream the feed into
             
         Returns:
-            RSS XML string
+            RSS XML string, or write status JSON when output_path is given
         """
-        # TODO: Implement RSS XML generation
         logger.info("Generating RSS feed from festival data")
         
-        # PLACEHOLDER implementation
-        rss_template = """<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0">
-  <channel>
-    <title>EDM Shuffle Festival Updates</title>
-    <description>Latest EDM festival announcements and updates</description>
-    <link>https://edmshuffle.com/festivals</link>
-    <!-- TODO: Insert actual festival items from data -->
-    <item>
-      <title>PLACEHOLDER Festival Item</title>
-      <description>This is placeholder content - implement actual RSS generation</description>
-      <pubDate>Sun, 26 Jan 2025 00:00:00 GMT</pubDate>
-    </item>
-  </channel>
-</rss>"""
-        
-        return rss_template
+        data = json.loads(festival_data)
+        festivals = data.get("festivals", []) if isinstance(data, dict) else data
+        index_path = os.getenv("FESTIVAL_FEED_INDEX", DEFAULT_FEED_INDEX)
+        
+        if output_path:
+            written = write_feed_file(festivals, output_path, feed_format, index_path=index_path)
+            return json.dumps({
+                "status": "written",
+                "output_path": output_path,
+                "items_written": written
+            })
+        
+        index = FeedItemIndex(index_path)
+        buffer = io.StringIO()
+        write_feed(festivals, buffer, feed_format, index=index)
+        index.save()
+        return buffer.getvalue()
 
 # =============================================================================
 # 3D ENVIRONMENT TOOLS
@@ -125,6 +153,7 @@ class ThreeDSceneGeneratorTool(BaseTool):
     name: str = "3D Scene Generator Tool"
     description: str = "Creates 3D festival environments with stages, lighting, and crowd areas"
     
+    @trace_tool_run
     def _run(self, theme: str = "main_stage", style: str = "neon") -> str:
         """
         Generate 3D scene configuration for virtual festival environment.
@@ -180,6 +209,7 @@ class UnityExportTool(BaseTool):
     name: str = "Unity Export Tool"
     description: str = "Exports 3D scene configurations to Unity WebGL builds"
     
+    @trace_tool_run
     def _run(self, scene_config: str) -> str:
         """
         Export scene configuration to Unity WebGL format.
@@ -213,14 +243,22 @@ class AudioSynthesisTool(BaseTool):
     name: str = "Audio Synthesis Tool"
     description: str = "Generates DJ mixes, stems, and transitions using AI audio synthesis"
     
-    def _run(self, genre: str = "house", bpm: int = 128, duration: int = 300) -> str:
+    @trace_tool_run
+    def _run(self, genre: str = "house", bpm: int = 128, duration: int = 300,
+             output_file: Optional[str] = None, effects: List[Any] = None) -> str:
         """
         Generate DJ mix or audio content.
         
+        Until a synthesis model is integrated, sets are arranged from the
+        soundpack stems and rendered by mix_renderer, which streams the mix
+        to disk in chunks so memory stays flat for hour-long sets.
+        
         Args:
             genre: Music genre (house, techno, trance, dubstep)
             bpm: Beats per minute
-            duration: Duration in seconds
+            duration: Duration in seconds (up to 3600)
+            output_file: WAV/FLAC path (defaults to generated/generated_<genre>_<bpm>bpm.wav)
+            effects: Master effect chain (see dsp_engine)
             
         Returns:
             Audio generation status and file info
@@ -228,15 +266,33 @@ class AudioSynthesisTool(BaseTool):
         # TODO: Implement audio synthesis engine
         # REQUIRES: AI audio models (Suno, AIVA, or similar), audio processing libraries
         logger.info(f"Generating {genre} track: {bpm} BPM, {duration}s")
+        try:
+            from audio_io import AudioDecodeError
+            from mix_renderer import render_set
+        except ImportError as e:
+            return json.dumps({"status": "error", "genre": genre, "bpm": bpm, "duration": duration,
+                               "error": f"Audio engine unavailable: {e}"})
+        
+        output_file = output_file or os.path.join("generated", f"generated_{genre}_{bpm}bpm.wav")
+        soundpack_root = os.getenv("SOUNDPACK_ROOT", DEFAULT_SOUNDPACK_ROOT)
+        output_format = "flac" if output_file.lower().endswith(".flac") else "wav"
+        try:
+            summary = render_set(output_file, genre, bpm, duration, soundpack_root, effects, output_format)
+        except (AudioDecodeError, OSError, ValueError) as e:
+            logger.warning(f"⚠️ Stem-based render unavailable: {e}")
+            return json.dumps({
+                "status": "error",
+                "genre": genre,
+                "bpm": bpm,
+                "duration": duration,
+                "error": str(e),
+                "note": "AI audio synthesis is not integrated; rendering needs decodable stems in the soundpack manifest"
+            })
         
         return json.dumps({
-            "status": "PLACEHOLDER - Audio synthesis not implemented",
-            "genre": genre,
-            "bpm": bpm,
-            "duration": duration,
-            "output_file": f"generated_{genre}_{bpm}bpm.mp3",
-            "stems": ["kick.wav", "bass.wav", "synth.wav", "fx.wav"],
-            "note": "Requires AI audio synthesis API integration"
+            "status": "rendered_from_stems",
+            **summary,
+            "note": "Arranged from soundpack stems; AI audio synthesis is not integrated"
         })
 
 class WebAudioProcessorTool(BaseTool):
@@ -246,30 +302,146 @@ class WebAudioProcessorTool(BaseTool):
     name: str = "Web Audio Processor Tool"
     description: str = "Processes audio for web-based DJ mixing and effects"
     
-    def _run(self, audio_file: str, effects: List[str] = None) -> str:
+    @trace_tool_run
+    def _run(self, audio_file: str, effects: List[Any] = None, output_file: Optional[str] = None,
+             start_sec: float = 0.0, duration_sec: Optional[float] = None) -> str:
         """
         Process audio file with Web Audio API effects.
         
+        The chain is rendered offline by dsp_engine with the same node
+        settings the browser uses, so previews can be produced server-side.
+        
         Args:
             audio_file: Path to audio file
-            effects: List of effects to apply (reverb, delay, filter)
+            effects: Effects to apply in order, as names (gain, filter, eq,
+                delay, reverb) or dicts with a "type" key and parameters
+            output_file: Render the processed clip to this WAV file; without
+                it only the resolved chain is returned
+            start_sec: Clip start within the audio file
+            duration_sec: Clip length (None renders to the end)
             
         Returns:
             Processed audio configuration
         """
-        # TODO: Implement Web Audio API wrapper
         logger.info(f"Processing audio: {audio_file} with effects: {effects}")
+        try:
+            from audio_io import AudioDecodeError
+            from dsp_engine import DEFAULT_SAMPLE_RATE, OUTPUT_CHANNELS, normalize_effects, render_file, web_audio_nodes
+        except ImportError as e:
+            return json.dumps({"status": "error", "input_file": audio_file, "error": f"Audio engine unavailable: {e}"})
         
-        return json.dumps({
-            "status": "PLACEHOLDER - Web Audio API integration needed",
+        try:
+            chain = normalize_effects(effects)
+        except ValueError as e:
+            return json.dumps({"status": "error", "input_file": audio_file, "error": str(e)})
+        
+        result = {
+            "status": "configured",
             "input_file": audio_file,
-            "effects_applied": effects or [],
+            "effects_applied": chain,
             "output_config": {
-                "sample_rate": 44100,
-                "channels": 2,
+                "sample_rate": DEFAULT_SAMPLE_RATE,
+                "channels": OUTPUT_CHANNELS,
                 "bit_depth": 16
             },
-            "web_audio_nodes": ["source", "gain", "filter", "reverb", "destination"]
+            "web_audio_nodes": web_audio_nodes(chain)
+        }
+        if output_file:
+            try:
+                result["render"] = render_file(audio_file, output_file, chain, start_sec, duration_sec)
+                result["status"] = "rendered"
+            except (AudioDecodeError, OSError, ValueError) as e:
+                logger.error(f"❌ Offline render failed for {audio_file}: {e}")
+                result.update(status="error", error=str(e))
+        return json.dumps(result)
+
+class WaveformPeaksTool(BaseTool):
+    """
+    Tool for precomputing waveform peaks so the mix station can draw stems without decoding them.
+    """
+    name: str = "Waveform Peaks Tool"
+    description: str = "Generates multi-resolution waveform peak files for soundpack stems and user tracks"
+    
+    @trace_tool_run
+    def _run(self, directory: str = None, bits: int = 8, force: bool = False) -> str:
+        """
+        Write peak pyramids for every audio file in a directory.
+        
+        Args:
+            directory: Directory of audio files (defaults to SOUNDPACK_ROOT)
+            bits: Peak sample width, 8 or 16
+            force: Regenerate peaks for unchanged files too
+            
+        Returns:
+            Peaks index summary
+        """
+        directory = directory or os.getenv("SOUNDPACK_ROOT", DEFAULT_SOUNDPACK_ROOT)
+        logger.info(f"Generating waveform peaks for {directory}")
+        try:
+            from waveform_peaks import INDEX_NAME as PEAKS_INDEX_NAME, build_peaks
+        except ImportError as e:
+            return json.dumps({"status": "error", "directory": directory, "error": f"Audio engine unavailable: {e}"})
+        
+        try:
+            with AnalysisCache(os.getenv("AUDIO_ANALYSIS_CACHE", DEFAULT_AUDIO_CACHE)) as cache:
+                index = build_peaks(directory, bits, cache=cache, force=force)
+        except (OSError, ValueError) as e:
+            return json.dumps({"status": "error", "directory": directory, "error": str(e)})
+        
+        return json.dumps({
+            "status": "success",
+            "directory": directory,
+            "index_file": os.path.join(directory, PEAKS_INDEX_NAME),
+            "files": len(index["files"]),
+            "levels": {relative: [level["samples_per_pixel"] for level in entry["levels"]]
+                       for relative, entry in index["files"].items()},
+            "errors": index["errors"]
+        })
+
+class StemRecommendationTool(BaseTool):
+    """
+    Tool for suggesting the stems that mix best into what is currently playing.
+    """
+    name: str = "Stem Recommendation Tool"
+    description: str = "Ranks soundpack stems by tempo, Camelot key, energy and tag compatibility with a deck"
+    
+    @trace_tool_run
+    def _run(self, bpm: float = None, key: str = None, energy: float = 0.5, energy_change: float = 0.0,
+             tags: List[str] = None, exclude: List[str] = None, types: List[str] = None, k: int = 10) -> str:
+        """
+        Recommend the next stems for a deck.
+        
+        Args:
+            bpm: Deck tempo (half and double time matches are allowed)
+            key: Deck key, e.g. "Am" or "8A"
+            energy: Deck energy from 0 to 1
+            energy_change: Energy change wanted next (positive builds, negative cools down)
+            tags: Tags of what is playing
+            exclude: Stem IDs already in the mix
+            types: Only suggest these stem types
+            k: Number of suggestions
+            
+        Returns:
+            Ranked stems with their component scores
+        """
+        manifest_path = os.path.join(os.getenv("SOUNDPACK_ROOT", DEFAULT_SOUNDPACK_ROOT), "manifest.json")
+        logger.info(f"Recommending stems for {bpm} BPM in {key}")
+        try:
+            from stem_recommender import DeckState, load_recommender
+        except ImportError as e:
+            return json.dumps({"status": "error", "manifest": manifest_path, "error": f"Recommender unavailable: {e}"})
+        
+        try:
+            recommender = load_recommender(manifest_path)
+        except (OSError, ValueError) as e:
+            return json.dumps({"status": "error", "manifest": manifest_path, "error": str(e)})
+        
+        deck = DeckState(bpm=bpm, key=key, energy=energy, energy_change=energy_change,
+                         tags=tags or [], exclude=exclude or [], types=types)
+        return json.dumps({
+            "status": "success",
+            "deck": {"bpm": bpm, "key": key, "energy": energy, "energy_change": energy_change},
+            "recommendations": recommender.recommend(deck, k)
         })
 
 # =============================================================================
@@ -289,6 +461,7 @@ class SupabaseMarketplaceTool(BaseTool):
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_key = os.getenv("SUPABASE_ANON_KEY")
     
+    @trace_tool_run
     def _run(self, operation: str, data: Dict[str, Any] = None) -> str:
         """
         Perform marketplace database operations.
@@ -331,6 +504,7 @@ class GameMechanicsTool(BaseTool):
     name: str = "Game Mechanics Tool"
     description: str = "Creates and manages gamification features like challenges and leaderboards"
     
+    @trace_tool_run
     def _run(self, game_type: str, config: Dict[str, Any] = None) -> str:
         """
         Generate game mechanics configuration.
@@ -373,33 +547,135 @@ class AnalyticsPipelineTool(BaseTool):
     name: str = "Analytics Pipeline Tool"
     description: str = "Builds analytics dashboards and processes user behavior data"
     
+    @trace_tool_run
     def _run(self, metric_type: str, time_range: str = "7d") -> str:
         """
         Generate analytics report.
         
+        New Parquet exports under ANALYTICS_DATA_DIR are folded into the
+        hourly/daily rollups and chart cubes in ANALYTICS_DB first; the
+        report is then computed from them (see analytics_engine).
+        
         Args:
             metric_type: Type of metrics (user_engagement, festival_votes, audio_plays)
-            time_range: Time range for analysis
+                or a chart (engagement_trend, user_retention, feature_usage)
+            time_range: Time range for analysis ("24h", "7d", "30d", ...)
             
         Returns:
             Analytics report
         """
-        # TODO: Implement analytics data processing
         logger.info(f"Generating analytics: {metric_type} for {time_range}")
         
-        return json.dumps({
-            "metric_type": metric_type,
-            "time_range": time_range,
-            "status": "PLACEHOLDER - Analytics pipeline not implemented",
-            "data_points": 0,
-            "charts": ["engagement_trend", "user_retention", "feature_usage"],
-            "note": "Requires analytics database and visualization setup"
-        })
+        data_dir = os.getenv("ANALYTICS_DATA_DIR", DEFAULT_ANALYTICS_DATA_DIR)
+        db_path = os.getenv("ANALYTICS_DB", DEFAULT_ANALYTICS_DB)
+        try:
+            with AnalyticsEngine(data_dir, db_path) as engine:
+                engine.refresh()
+                if metric_type in CUBE_CHARTS:
+                    report = engine.chart(metric_type, time_range)
+                else:
+                    report = engine.report(metric_type, time_range)
+        except (ImportError, ValueError) as e:
+            return json.dumps({
+                "metric_type": metric_type,
+                "time_range": time_range,
+                "status": "error",
+                "error": str(e)
+            })
+        
+        report["charts"] = list(CUBE_CHARTS)
+        report["status"] = "completed"
+        return json.dumps(report, default=str)
 
 # =============================================================================
 # TOOL REGISTRY
 # =============================================================================
 
+# Tool classes keyed by registry name. Instances are built lazily on first
+# use and shared process-wide, so agents that declare the same tool receive
+# the same instance instead of each paying for construction and env lookups.
+TOOL_CLASSES: Dict[str, Type[BaseTool]] = {
+    # Festival Tools
+    "web_scrape_festival": WebScrapeFestivalTool,
+    "rss_feed_generator": RSSFeedGeneratorTool,
+    
+    # 3D Environment Tools
+    "threejs_scene_generator": ThreeDSceneGeneratorTool,
+    "unity_export": UnityExportTool,
+    
+    # Audio Tools
+    "audio_synthesis": AudioSynthesisTool,
+    "web_audio_processor": WebAudioProcessorTool,
+    "waveform_peaks": WaveformPeaksTool,
+    "stem_recommendations": StemRecommendationTool,
+    
+    # Marketplace Tools
+    "supabase_marketplace": SupabaseMarketplaceTool,
+    
+    # Gamification Tools
+    "game_mechanics": GameMechanicsTool,
+    
+    # Analytics Tools
+    "analytics_pipeline": AnalyticsPipelineTool,
+}
+
+AGENT_TOOL_MAPPING: Dict[str, List[str]] = {
+    "Festival Scouter": ["web_scrape_festival", "rss_feed_generator"],
+    "Virtual Festival Architect": ["threejs_scene_generator", "unity_export"],
+    "Beat Mixer and Remix Creator": ["audio_synthesis", "web_audio_processor", "waveform_peaks",
+                                     "stem_recommendations"],
+    "EDM Fashion Designer and Marketplace Specialist": ["supabase_marketplace"],
+    "Community Engagement and Gamification Specialist": ["game_mechanics"],
+    "Analytics Architect": ["analytics_pipeline"],
+}
+
+_tool_instances: Dict[str, BaseTool] = {}
+_tool_instances_lock = threading.Lock()
+
+def get_tool(name: str) -> BaseTool:
+    """
+    Get the shared instance of a registered tool, building it on first use.
+    
+    Args:
+        name: Tool registry name (e.g., 'web_scrape_festival')
+        
+    Returns:
+        Tool instance shared by every caller in this process
+        
+    Raises:
+        KeyError: If tool name not found
+    """
+    tool = _tool_instances.get(name)
+    if tool is not None:
+        return tool
+    
+    if name not in TOOL_CLASSES:
+        raise KeyError(f"Tool '{name}' not found. Available tools: {list(TOOL_CLASSES.keys())}")
+    
+    with _tool_instances_lock:
+        # Another thread may have built it while we waited for the lock
+        tool = _tool_instances.get(name)
+        if tool is None:
+            tool = TOOL_CLASSES[name]()
+            _tool_instances[name] = tool
+    return tool
+
+def invalidate_tools(name: Optional[str] = None) -> None:
+    """
+    Drop cached tool instances so the next lookup rebuilds them.
+    
+    Use this after changing environment configuration (API keys, Supabase
+    credentials) that tools read at construction time.
+    
+    Args:
+        name: Tool registry name to invalidate; invalidates all tools if omitted
+    """
+    with _tool_instances_lock:
+        if name is None:
+            _tool_instances.clear()
+        else:
+            _tool_instances.pop(name, None)
+
 def get_all_tools() -> Dict[str, BaseTool]:
     """
     Returns a dictionary of all available custom tools.
@@ -407,52 +683,23 @@ def get_all_tools() -> Dict[str, BaseTool]:
     Returns:
         Dictionary mapping tool names to tool instances
     """
-    return {
-        # Festival Tools
-        "web_scrape_festival": WebScrapeFestivalTool(),
-        "rss_feed_generator": RSSFeedGeneratorTool(),
-        
-        # 3D Environment Tools
-        "threejs_scene_generator": ThreeDSceneGeneratorTool(),
-        "unity_export": UnityExportTool(),
-        
-        # Audio Tools
-        "audio_synthesis": AudioSynthesisTool(),
-        "web_audio_processor": WebAudioProcessorTool(),
-        
-        # Marketplace Tools
-        "supabase_marketplace": SupabaseMarketplaceTool(),
-        
-        # Gamification Tools
-        "game_mechanics": GameMechanicsTool(),
-        
-        # Analytics Tools
-        "analytics_pipeline": AnalyticsPipelineTool(),
-    }
+    return {name: get_tool(name) for name in TOOL_CLASSES}
 
 def get_tools_for_agent(agent_role: str) -> List[BaseTool]:
     """
     Get recommended tools for a specific agent role.
     
+    Only the tools declared for the role are built, and instances are shared
+    with any other agent that declares the same tool.
+    
     Args:
         agent_role: Agent role name
         
     Returns:
         List of recommended tools for the agent
     """
-    all_tools = get_all_tools()
-    
-    tool_mapping = {
-        "Festival Scouter": ["web_scrape_festival", "rss_feed_generator"],
-        "Virtual Festival Architect": ["threejs_scene_generator", "unity_export"],
-        "Beat Mixer and Remix Creator": ["audio_synthesis", "web_audio_processor"],
-        "EDM Fashion Designer and Marketplace Specialist": ["supabase_marketplace"],
-        "Community Engagement and Gamification Specialist": ["game_mechanics"],
-        "Analytics Architect": ["analytics_pipeline"],
-    }
-    
-    tool_names = tool_mapping.get(agent_role, [])
-    return [all_tools[name] for name in tool_names if name in all_tools]
+    tool_names = AGENT_TOOL_MAPPING.get(agent_role, [])
+    return [get_tool(name) for name in tool_names if name in TOOL_CLASSES]
 
 # =============================================================================
 # MAIN EXECUTION
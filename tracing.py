@@ -0,0 +1,443 @@
+"""
+EDM Shuffle Crew Tracing
+
+Lightweight spans for crew workflow runs. Each workflow run is one Trace whose
+spans nest as workflow -> task -> agent step / tool call, so a run shows which
+agent, task or tool is consuming the latency.
+
+Spans record wall time plus, where available:
+- tool_calls: tool _run invocations made under the span
+- tokens: LLM token usage reported by CrewAI (usage_metrics / token_usage)
+- output_chars: size of the span's output
+
+The current span is tracked in a context variable. Tool spans are only
+recorded when a trace is active, so tools called outside a workflow pay no
+tracing cost. DAG steps run on worker threads, which do not inherit the
+context, so task spans take their parent explicitly.
+
+Traces export to Chrome trace-event JSON (chrome://tracing, Perfetto) or to
+OTLP/JSON for OpenTelemetry collectors and viewers.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+TRACE_FORMATS = ("chrome", "otlp")
+SERVICE_NAME = "edm-shuffle-crew"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("edm_current_span", default=None)
+_current_recorder: ContextVar[Optional["CrewCallbackRecorder"]] = ContextVar("edm_current_recorder", default=None)
+
+# =============================================================================
+# SPANS AND TRACES
+# =============================================================================
+
+@dataclass
+class Span:
+    """
+    A timed operation within a trace.
+
+    Attributes:
+        name: Operation name (workflow, task step, agent role or tool name)
+        category: "workflow", "task", "agent_step" or "tool"
+        trace: Trace the span belongs to
+        span_id: 16 hex digit span ID
+        parent_id: Parent span ID, or None for the root
+        start: Start time in epoch seconds
+        end: End time in epoch seconds, None while running
+        thread_id: Thread the span ran on
+        attributes: Recorded measurements and labels
+    """
+    name: str
+    category: str
+    trace: "Trace" = field(repr=False)
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    thread_id: int = field(default_factory=threading.get_ident)
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.time()) - self.start
+
+class Trace:
+    """All spans of one workflow run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._by_id: Dict[str, Span] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Optional[Span]:
+        return self.spans[0] if self.spans else None
+
+    def _add(self, span: Span) -> Span:
+        with self._lock:
+            self.spans.append(span)
+            self._by_id[span.span_id] = span
+        return span
+
+    @contextmanager
+    def span(self, name: str, category: str, parent: Optional[Span] = None,
+             **attributes: Any) -> Iterator[Span]:
+        """
+        Record a span around a block and make it the current span.
+
+        Args:
+            name: Operation name
+            category: Span category
+            parent: Parent span; defaults to the current span of this trace
+            **attributes: Initial span attributes
+        """
+        if parent is None:
+            current = _current_span.get()
+            parent = current if current is not None and current.trace is self else None
+        span = self._add(Span(
+            name=name,
+            category=category,
+            trace=self,
+            parent_id=parent.span_id if parent else None,
+            attributes=dict(attributes),
+        ))
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.time()
+            _current_span.reset(token)
+
+    def record(self, name: str, category: str, parent: Optional[Span],
+               start: float, end: float, **attributes: Any) -> Span:
+        """Add an already finished span (e.g. from a CrewAI callback)."""
+        return self._add(Span(
+            name=name,
+            category=category,
+            trace=self,
+            parent_id=parent.span_id if parent else None,
+            start=start,
+            end=end,
+            thread_id=threading.get_ident(),
+            attributes=dict(attributes),
+        ))
+
+    def _ancestors(self, span: Span) -> List[Span]:
+        # Caller holds self._lock
+        parent = self._by_id.get(span.parent_id) if span.parent_id else None
+        chain = []
+        while parent is not None:
+            chain.append(parent)
+            parent = self._by_id.get(parent.parent_id) if parent.parent_id else None
+        return chain
+
+    def ancestors(self, span: Span) -> Iterator[Span]:
+        with self._lock:
+            return iter(self._ancestors(span))
+
+    def add_counters(self, span: Span, amounts: Dict[str, float], include_self: bool = True) -> None:
+        """
+        Add to numeric attributes on every ancestor of span (and on span itself).
+
+        Spans on other threads update the same ancestors, so the additions
+        are made under the trace lock.
+        """
+        with self._lock:
+            targets = self._ancestors(span)
+            if include_self:
+                targets.insert(0, span)
+            for target in targets:
+                for key, amount in amounts.items():
+                    target.attributes[key] = target.attributes.get(key, 0) + amount
+
+def current_span() -> Optional[Span]:
+    """The innermost active span in this context, if any."""
+    return _current_span.get()
+
+def add_counter(span: Span, key: str, amount: float = 1) -> None:
+    """Add to a numeric attribute on a span and every ancestor."""
+    span.trace.add_counters(span, {key: amount})
+
+def output_size(output: Any) -> int:
+    """Characters in the text form of an output (CrewOutput, str, ...)."""
+    try:
+        return len(str(output))
+    except Exception:
+        return 0
+
+def token_usage(*sources: Any) -> Dict[str, int]:
+    """
+    Token counts from CrewAI usage objects or dicts, first one that reports any.
+
+    Accepts Crew.usage_metrics (dict in older CrewAI, UsageMetrics model in
+    newer) and CrewOutput.token_usage.
+    """
+    keys = ("total_tokens", "prompt_tokens", "completion_tokens")
+    for source in sources:
+        if source is None:
+            continue
+        usage = {}
+        for key in keys:
+            value = source.get(key) if isinstance(source, dict) else getattr(source, key, None)
+            if isinstance(value, (int, float)):
+                usage[key] = int(value)
+        if usage.get("total_tokens"):
+            return usage
+    return {}
+
+# =============================================================================
+# INSTRUMENTATION
+# =============================================================================
+
+def trace_tool_run(run: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorator for BaseTool._run that records a tool span under the current span.
+
+    Outside an active trace the tool runs untraced.
+    """
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        parent = _current_span.get()
+        if parent is None:
+            return run(self, *args, **kwargs)
+        with parent.trace.span(getattr(self, "name", type(self).__name__), "tool", parent=parent) as span:
+            add_counter(parent, "tool_calls")
+            result = run(self, *args, **kwargs)
+            span.attributes["output_chars"] = output_size(result)
+            return result
+    return wrapper
+
+def _dispatch_step_callback(step_output: Any) -> None:
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.step_callback(step_output)
+
+def _dispatch_task_callback(task_output: Any) -> None:
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.task_callback(task_output)
+
+class CrewCallbackRecorder:
+    """
+    CrewAI step_callback / task_callback adapters that record spans.
+
+    CrewAI reports agent steps and finished tasks after the fact, so each
+    callback records a span from the previous callback (or the recorder's
+    creation) up to now.
+
+    A Crew only hands its step_callback to agents that have none, and agents
+    outlive a crew run, so the callbacks given to CrewAI are module-level
+    dispatchers that forward to the recorder active in the current context.
+    Wrap kickoff() in active() so this recorder receives them.
+    """
+
+    def __init__(self, parent: Span):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._step_mark = time.time()
+        self._task_mark = self._step_mark
+        self._tool_calls_mark = parent.attributes.get("tool_calls", 0)
+
+    def step_callback(self, step_output: Any) -> None:
+        now = time.time()
+        with self._lock:
+            start, self._step_mark = self._step_mark, now
+            tool_calls = self.parent.attributes.get("tool_calls", 0)
+            step_tool_calls, self._tool_calls_mark = tool_calls - self._tool_calls_mark, tool_calls
+        attributes = {
+            "step_type": type(step_output).__name__,
+            "tool_calls": step_tool_calls,
+            "output_chars": output_size(getattr(step_output, "output", None) or getattr(step_output, "text", None) or ""),
+        }
+        tool = getattr(step_output, "tool", None)
+        if tool:
+            attributes["tool"] = str(tool)
+        agent = self.parent.attributes.get("agent")
+        self.parent.trace.record(f"{agent or self.parent.name} step", "agent_step", self.parent,
+                                 start, now, **attributes)
+
+    def task_callback(self, task_output: Any) -> None:
+        now = time.time()
+        with self._lock:
+            start, self._task_mark = self._task_mark, now
+        agent = getattr(task_output, "agent", None)
+        description = str(getattr(task_output, "description", "") or "").strip()
+        self.parent.trace.record(
+            description.splitlines()[0][:80] if description else "task",
+            "task", self.parent, start, now,
+            agent=str(agent) if agent else None,
+            output_chars=output_size(getattr(task_output, "raw", None) or task_output),
+        )
+
+    @contextmanager
+    def active(self) -> Iterator["CrewCallbackRecorder"]:
+        """Route dispatched CrewAI callbacks in this context to this recorder."""
+        token = _current_recorder.set(self)
+        try:
+            yield self
+        finally:
+            _current_recorder.reset(token)
+
+    def crew_kwargs(self, tasks: bool = True) -> Dict[str, Any]:
+        """Keyword arguments wiring the callback dispatchers into a Crew."""
+        kwargs: Dict[str, Any] = {"step_callback": _dispatch_step_callback}
+        if tasks:
+            kwargs["task_callback"] = _dispatch_task_callback
+        return kwargs
+
+def record_crew_usage(span: Span, crew: Any, output: Any) -> None:
+    """Attach token usage and output size of a finished crew kickoff to a span."""
+    span.attributes["output_chars"] = output_size(output)
+    usage = token_usage(getattr(output, "token_usage", None), getattr(crew, "usage_metrics", None))
+    if usage:
+        span.attributes.update(usage)
+        span.trace.add_counters(span, usage, include_self=False)
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+def to_chrome_trace(traces: Iterable[Trace]) -> Dict[str, Any]:
+    """Chrome trace-event JSON: one process per trace, one track per thread."""
+    events: List[Dict[str, Any]] = []
+    for pid, trace in enumerate(traces, 1):
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                       "args": {"name": f"{trace.name} {trace.trace_id[:8]}"}})
+        for span in trace.spans:
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {"span_id": span.span_id, "parent_id": span.parent_id, **span.attributes},
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(traces: Iterable[Trace]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest with one resource for the crew."""
+    spans = []
+    for trace in traces:
+        for span in trace.spans:
+            attributes = [{"key": "edm.category", "value": {"stringValue": span.category}}]
+            attributes += [
+                {"key": f"edm.{key}", "value": _otlp_value(value)}
+                for key, value in span.attributes.items() if value is not None
+            ]
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(int(span.start * 1e9)),
+                "endTimeUnixNano": str(int((span.start + span.duration) * 1e9)),
+                "attributes": attributes,
+                "status": {"code": 2, "message": span.attributes["error"]} if "error" in span.attributes else {},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "edm_shuffle.tracing"}, "spans": spans}],
+        }]
+    }
+
+def export_traces(traces: Iterable[Trace], path: str, trace_format: str = "chrome") -> None:
+    """
+    Write traces to a local file.
+
+    Args:
+        traces: Traces to export
+        path: Output file, replaced atomically
+        trace_format: "chrome" (trace-event JSON) or "otlp" (OTLP/JSON)
+
+    Raises:
+        ValueError: If the format is not recognised
+    """
+    if trace_format not in TRACE_FORMATS:
+        raise ValueError(f"Unknown trace format '{trace_format}'. Use one of {TRACE_FORMATS}")
+    data = to_chrome_trace(traces) if trace_format == "chrome" else to_otlp(traces)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp_path, path)
+
+# =============================================================================
+# SUMMARY
+# =============================================================================
+
+def summarize_traces(traces: Iterable[Trace]) -> Dict[str, Any]:
+    """
+    Aggregate spans per workflow, per agent and per tool, slowest first.
+
+    Returns:
+        Dictionary with workflows, agents and tools lists; each entry has
+        count, total_sec, mean_sec, max_sec, tool_calls, total_tokens and
+        output_chars
+    """
+    groups: Dict[str, Dict[str, Dict[str, Any]]] = {"workflows": {}, "agents": {}, "tools": {}}
+    trace_count = 0
+    for trace in traces:
+        trace_count += 1
+        for span in trace.spans:
+            if span.category == "workflow":
+                group, key = "workflows", span.name
+            elif span.category == "task" and span.attributes.get("agent"):
+                group, key = "agents", span.attributes["agent"]
+            elif span.category == "tool":
+                group, key = "tools", span.name
+            else:
+                continue
+            entry = groups[group].setdefault(key, {
+                "name": key, "count": 0, "total_sec": 0.0, "max_sec": 0.0,
+                "tool_calls": 0, "total_tokens": 0, "output_chars": 0, "errors": 0,
+            })
+            duration = span.duration
+            entry["count"] += 1
+            entry["total_sec"] += duration
+            entry["max_sec"] = max(entry["max_sec"], duration)
+            entry["tool_calls"] += span.attributes.get("tool_calls", 0)
+            entry["total_tokens"] += span.attributes.get("total_tokens", 0)
+            entry["output_chars"] += span.attributes.get("output_chars", 0)
+            entry["errors"] += 1 if "error" in span.attributes else 0
+
+    summary: Dict[str, Any] = {"traces": trace_count}
+    for group, entries in groups.items():
+        rows = sorted(entries.values(), key=lambda entry: entry["total_sec"], reverse=True)
+        for row in rows:
+            row["mean_sec"] = row["total_sec"] / row["count"]
+        summary[group] = rows
+    return summary
@@ -1,79 +1,216 @@
 import functools
+import os
 from datetime import datetime
+import random
+import reprlib
+import threading
 import time
+import uuid
 from a_mem.store import MemoryStore
 
+from utils.event_sink import BatchingEventSink
+from utils.event_store import DEFAULT_EVENT_DB, LocalEventStore
+from utils.metrics import registry as metrics_registry
+
 # Initialize the MemoryStore for the Mystic Arcana namespace.
 # This ensures memory is isolated from other projects like BirthdayGen.
 store = MemoryStore(namespace="edm_shuffle")
 
+# Events are written to the store in batches from a background thread so
+# store latency stays off the caller's thread. Pending events are flushed
+# at exit; call flush_events() to wait for them explicitly.
+sink = BatchingEventSink(store)
+
+# Indexed local copy of every event for scripts/query_memory.py. Set
+# EDM_EVENT_DB to move it, or to "off" to disable it. The database and its
+# writer thread are created on the first event, not at import.
+local_store = None
+local_sink = None
+_local_sink_lock = threading.Lock()
+_local_sink_opened = False
+
+
+def _get_local_sink():
+    global local_store, local_sink, _local_sink_opened
+    if _local_sink_opened:
+        return local_sink
+    with _local_sink_lock:
+        if not _local_sink_opened:
+            event_db = os.getenv("EDM_EVENT_DB", DEFAULT_EVENT_DB)
+            if event_db != "off":
+                try:
+                    local_store = LocalEventStore(event_db, namespace="edm_shuffle")
+                    local_sink = BatchingEventSink(local_store)
+                except Exception as e:
+                    print(f"🔥 a_mem_logger Error: Failed to open local event store {event_db}. {e}")
+            _local_sink_opened = True
+    return local_sink
+
+
+# Bounds for argument summaries recorded by log_invocation
+DEFAULT_MAX_ARG_LENGTH = 200
+DEFAULT_MAX_ARGS = 10
+
 def log_event(user_id="system", event_type="system_event", payload={}):
-    """Directly logs a custom event to the EDM Shuffle memory store."""
+    """Queues a custom event for the EDM Shuffle memory store."""
     try:
         if not isinstance(payload, dict):
             payload = {"data": str(payload)}
 
-        store.record_event(
-            user_id=user_id,
-            event_type=event_type,
-            payload={**payload, "timestamp_utc": datetime.utcnow().isoformat()}
-        )
+        payload = {**payload, "timestamp_utc": datetime.utcnow().isoformat()}
+        sink.submit(user_id=user_id, event_type=event_type, payload=payload)
+        event_sink = _get_local_sink()
+        if event_sink:
+            event_sink.submit(user_id=user_id, event_type=event_type, payload=payload)
     except Exception as e:
         print(f"🔥 a_mem_logger Error: Failed to log event. {e}")
 
 
-def log_invocation(event_type="function_call", user_id="system"):
+def flush_events(timeout=None):
+    """Blocks until every queued event has been written to the memory store."""
+    flushed = sink.flush(timeout)
+    if local_sink:
+        flushed = local_sink.flush(timeout) and flushed
+    return flushed
+
+
+class TokenBucket:
+    """Allows up to `rate` events per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, count=1):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count:
+                self.tokens -= count
+                return True
+            return False
+
+
+_arg_repr = reprlib.Repr()
+_arg_repr.maxlevel = 2
+_arg_repr.maxstring = DEFAULT_MAX_ARG_LENGTH
+_arg_repr.maxother = DEFAULT_MAX_ARG_LENGTH
+
+
+def summarize_value(value, max_length=DEFAULT_MAX_ARG_LENGTH):
+    """Bounded description of an argument: truncated repr plus type and size."""
+    try:
+        # reprlib bounds the work for large containers instead of building
+        # the full repr and truncating it
+        text = _arg_repr.repr(value)
+    except Exception:
+        text = f"<unrepresentable {type(value).__name__}>"
+    if len(text) > max_length:
+        text = text[:max_length] + f"... ({len(text) - max_length} more chars)"
+    summary = {"type": type(value).__name__, "repr": text}
+    if isinstance(value, (str, bytes, list, tuple, dict, set, frozenset)):
+        summary["len"] = len(value)
+    return summary
+
+
+def summarize_arguments(args, kwargs, max_length=DEFAULT_MAX_ARG_LENGTH, max_items=DEFAULT_MAX_ARGS):
+    """Summaries of at most max_items positional and keyword arguments."""
+    summary = {
+        "args": [summarize_value(arg, max_length) for arg in args[:max_items]],
+        "kwargs": {
+            key: summarize_value(value, max_length)
+            for key, value in list(kwargs.items())[:max_items]
+        },
+    }
+    if len(args) > max_items or len(kwargs) > max_items:
+        summary["truncated"] = True
+    return summary
+
+
+def log_invocation(event_type="function_call", user_id="system", sample_rate=1.0,
+                   slow_threshold_sec=None, max_events_per_sec=None,
+                   max_arg_length=DEFAULT_MAX_ARG_LENGTH):
     """
     Decorator to log a function's invocation, arguments, and execution lifecycle.
+
+    Arguments are recorded as bounded summaries (type, size and a truncated
+    repr) rather than the raw objects.
+
+    To keep overhead down on hot functions:
+    - sample_rate: fraction of calls whose start/success events are recorded
+    - slow_threshold_sec: calls at least this slow are always recorded
+    - max_events_per_sec: token-bucket cap on sampled events for this function
+    Errors are always recorded. When the start event of an error or slow
+    call was not sampled, its argument summary is attached to the final event.
+
+    Every call, sampled or not, is added to the latency histograms in
+    utils.metrics.registry.
     """
     def decorator(func):
+        # One bucket per decorated function; a sampled call takes two tokens
+        # (start and success), so the bucket must hold at least two
+        bucket = (TokenBucket(max_events_per_sec, capacity=max(max_events_per_sec, 2))
+                  if max_events_per_sec else None)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             start_time = time.time()
             func_name = func.__name__
             
-            # Use a combination of args and kwargs for a simple invocation ID
-            invocation_id = f"{func_name}_{int(start_time)}"
-
-            # Log the start of the invocation
-            log_event(
-                user_id=user_id,
-                event_type=f"{event_type}_start",
-                payload={
-                    "invocation_id": invocation_id,
-                    "function": func_name,
-                    "args": args,
-                    "kwargs": kwargs
-                }
-            )
-            
-            try:
-                result = func(*args, **kwargs)
-                duration = time.time() - start_time
+            # Unique per call; the timestamp alone repeats within a second
+            invocation_id = f"{func_name}_{int(start_time)}_{uuid.uuid4().hex[:12]}"
+
+            # Both events of a sampled call must fit in the bucket
+            sampled = (sample_rate >= 1.0 or random.random() < sample_rate) and \
+                (bucket is None or bucket.take(2))
+
+            if sampled:
                 log_event(
                     user_id=user_id,
-                    event_type=f"{event_type}_success",
+                    event_type=f"{event_type}_start",
                     payload={
                         "invocation_id": invocation_id,
                         "function": func_name,
-                        "duration_sec": round(duration, 4),
-                        "result_type": str(type(result))
+                        **summarize_arguments(args, kwargs, max_arg_length)
                     }
                 )
-                return result
+            
+            try:
+                result = func(*args, **kwargs)
             except Exception as e:
                 duration = time.time() - start_time
-                log_event(
-                    user_id=user_id,
-                    event_type=f"{event_type}_error",
-                    payload={
-                        "invocation_id": invocation_id,
-                        "function": func_name,
-                        "duration_sec": round(duration, 4),
-                        "error_type": type(e).__name__,
-                        "error_message": str(e)
-                    }
-                )
+                metrics_registry.record(event_type, func_name, duration, error=True)
+                payload = {
+                    "invocation_id": invocation_id,
+                    "function": func_name,
+                    "duration_sec": round(duration, 4),
+                    "error_type": type(e).__name__,
+                    "error_message": str(e)[:max_arg_length]
+                }
+                if not sampled:
+                    payload.update(summarize_arguments(args, kwargs, max_arg_length))
+                log_event(user_id=user_id, event_type=f"{event_type}_error", payload=payload)
                 raise
+
+            duration = time.time() - start_time
+            metrics_registry.record(event_type, func_name, duration)
+            slow = slow_threshold_sec is not None and duration >= slow_threshold_sec
+            if sampled or slow:
+                payload = {
+                    "invocation_id": invocation_id,
+                    "function": func_name,
+                    "duration_sec": round(duration, 4),
+                    "result_type": str(type(result))
+                }
+                if slow:
+                    payload["slow"] = True
+                if not sampled:
+                    payload.update(summarize_arguments(args, kwargs, max_arg_length))
+                log_event(user_id=user_id, event_type=f"{event_type}_success", payload=payload)
+            return result
         return wrapper
     return decorator
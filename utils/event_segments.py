@@ -0,0 +1,253 @@
+import gzip
+import itertools
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Daily, compressed archive for events that have aged out of the local
+# SQLite store. Each UTC day is one JSON-lines segment file
+# (YYYY-MM-DD.jsonl.gz, or .jsonl.zst when zstandard is installed), so a
+# time-range query only opens the days it covers.
+#
+# Compaction (see scripts/compact_events.py) moves old events out of SQLite
+# into segments, rolls *_start/*_success pairs of older days up into
+# per-function duration summaries (YYYY-MM-DD.summary.json), and deletes
+# segments past the retention window.
+
+DEFAULT_ARCHIVE_DIR = os.path.join(".cache", "edm_events")
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+_EXTENSIONS = {COMPRESSION_GZIP: ".jsonl.gz", COMPRESSION_ZSTD: ".jsonl.zst"}
+_SEGMENT_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.jsonl\.(gz|zst)$")
+# log_invocation emits *_start; scripts/memlog.py emits command_run
+_START_SUFFIXES = ("_start", "_run")
+
+
+def event_day(event):
+    """UTC day of an event returned by LocalEventStore.query / iter_range."""
+    return datetime.fromisoformat(event["timestamp"]).astimezone(timezone.utc).date()
+
+
+class EventSegmentLog:
+    """
+    Directory of daily compressed event segments.
+    """
+
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR, compression=COMPRESSION_GZIP):
+        if compression == COMPRESSION_ZSTD and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"Unknown compression '{compression}'")
+        self.directory = directory
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+    # -- files ---------------------------------------------------------------
+
+    def days(self):
+        """Sorted days that have a segment file."""
+        found = set()
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                found.add(date.fromisoformat(match.group(1)))
+        return sorted(found)
+
+    def _existing_path(self, day):
+        for extension in _EXTENSIONS.values():
+            path = os.path.join(self.directory, f"{day.isoformat()}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def summary_path(self, day):
+        return os.path.join(self.directory, f"{day.isoformat()}.summary.json")
+
+    def _open_read(self, path):
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise ValueError(f"Reading {path} requires the zstandard package")
+            import io
+            return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+        return gzip.open(path, "rt", encoding="utf-8")
+
+    def read_day(self, day):
+        """Yield the events of one day (empty if the day has no segment)."""
+        path = self._existing_path(day)
+        if not path:
+            return
+        with self._open_read(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def write_day(self, day, events):
+        """Replace a day's segment atomically with the given events."""
+        old_path = self._existing_path(day)
+        path = os.path.join(self.directory, f"{day.isoformat()}{_EXTENSIONS[self.compression]}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            if self.compression == COMPRESSION_ZSTD:
+                with open(tmp_path, "wb") as raw:
+                    with zstandard.ZstdCompressor(level=10).stream_writer(raw) as writer:
+                        for event in events:
+                            writer.write((json.dumps(event, default=str) + "\n").encode("utf-8"))
+            else:
+                with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                    for event in events:
+                        f.write(json.dumps(event, default=str) + "\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if old_path and old_path != path:
+            os.remove(old_path)
+
+    def append_day(self, day, events):
+        """
+        Add events to a day's segment, merging with any existing file.
+
+        Events whose store id is already in the segment are skipped, so
+        re-appending after an interrupted compaction does not duplicate them.
+        Returns the number of events added.
+        """
+        existing = list(self.read_day(day))
+        seen = {event["id"] for event in existing if event.get("id") is not None}
+        added = [event for event in events if event.get("id") is None or event["id"] not in seen]
+        if not added:
+            return 0
+        merged = existing + added
+        merged.sort(key=lambda event: (event["timestamp"], event.get("id") or 0))
+        self.write_day(day, merged)
+        return len(added)
+
+    # -- queries -------------------------------------------------------------
+
+    def iter_events(self, since=None, until=None, event_type=None, user_id=None, invocation_id=None):
+        """
+        Yield archived events newest first, opening only the segments in range.
+
+        since / until are epoch seconds (inclusive / exclusive).
+        """
+        since_day = datetime.fromtimestamp(since, timezone.utc).date() if since is not None else None
+        until_day = datetime.fromtimestamp(until, timezone.utc).date() if until is not None else None
+        for day in reversed(self.days()):
+            if since_day and day < since_day:
+                break
+            if until_day and day > until_day:
+                continue
+            events = list(self.read_day(day))
+            for event in reversed(events):
+                stamp = datetime.fromisoformat(event["timestamp"]).timestamp()
+                if since is not None and stamp < since:
+                    continue
+                if until is not None and stamp >= until:
+                    continue
+                if event_type and event["event_type"] != event_type:
+                    continue
+                if user_id and event.get("user_id") != user_id:
+                    continue
+                if invocation_id and event.get("invocation_id") != invocation_id:
+                    continue
+                yield event
+
+    # -- compaction ----------------------------------------------------------
+
+    def roll_up_day(self, day):
+        """
+        Replace a day's *_start/*_success events with per-function summaries.
+
+        Success events already carry duration_sec, so their start events add
+        nothing once the day is summarized. Error events and every other
+        event type are kept as-is. Returns the number of events removed.
+        """
+        if os.path.exists(self.summary_path(day)):
+            return 0
+
+        kept, summaries, removed = [], {}, 0
+        for event in self.read_day(day):
+            event_type = event["event_type"]
+            payload = event.get("payload") or {}
+            if event_type.endswith(_START_SUFFIXES) and "invocation_id" in payload:
+                removed += 1
+                continue
+            if event_type.endswith(("_success", "_error")) and "duration_sec" in payload:
+                base = event_type.rsplit("_", 1)[0]
+                key = f"{base}:{payload.get('function')}"
+                summary = summaries.setdefault(key, {
+                    "event_type": base, "function": payload.get("function"),
+                    "calls": 0, "errors": 0, "total_duration_sec": 0.0,
+                    "min_duration_sec": None, "max_duration_sec": None,
+                })
+                duration = float(payload["duration_sec"])
+                summary["calls"] += 1
+                summary["total_duration_sec"] += duration
+                summary["min_duration_sec"] = duration if summary["min_duration_sec"] is None else min(summary["min_duration_sec"], duration)
+                summary["max_duration_sec"] = duration if summary["max_duration_sec"] is None else max(summary["max_duration_sec"], duration)
+                if event_type.endswith("_error"):
+                    summary["errors"] += 1
+                    kept.append(event)
+                else:
+                    removed += 1
+                continue
+            kept.append(event)
+
+        for summary in summaries.values():
+            summary["mean_duration_sec"] = summary["total_duration_sec"] / summary["calls"]
+
+        self.write_day(day, kept)
+        with open(self.summary_path(day), "w", encoding="utf-8") as f:
+            json.dump({"day": day.isoformat(), "functions": list(summaries.values())}, f, indent=2)
+        return removed
+
+    def delete_day(self, day):
+        path = self._existing_path(day)
+        if path:
+            os.remove(path)
+
+
+def compact(store, segments, hot_days=7, rollup_days=30, retention_days=180, today=None):
+    """
+    Enforce the event retention policy.
+
+    1. Events older than hot_days move from the SQLite store into daily
+       segments, one day at a time: each day is written to its segment and
+       then deleted from the store, so only one day is held in memory and a
+       rerun after a crash skips events the segment already has.
+    2. Segments older than rollup_days are rolled up into duration summaries.
+    3. Segments older than retention_days are deleted (summaries are kept).
+
+    Returns a dict of counts for each step.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    hot_cutoff = today - timedelta(days=hot_days)
+    cutoff_ts = datetime(hot_cutoff.year, hot_cutoff.month, hot_cutoff.day, tzinfo=timezone.utc).timestamp()
+
+    stats = {"archived": 0, "rolled_up_days": 0, "rolled_up_events": 0, "deleted_days": 0}
+
+    # iter_range yields oldest first, so each day's events are contiguous
+    for day, events in itertools.groupby(store.iter_range(until=cutoff_ts), key=event_day):
+        stats["archived"] += segments.append_day(day, list(events))
+        next_day = day + timedelta(days=1)
+        day_end_ts = datetime(next_day.year, next_day.month, next_day.day, tzinfo=timezone.utc).timestamp()
+        store.delete_before(min(day_end_ts, cutoff_ts))
+
+    rollup_cutoff = today - timedelta(days=rollup_days)
+    retention_cutoff = today - timedelta(days=retention_days)
+    for day in segments.days():
+        if day < retention_cutoff:
+            segments.delete_day(day)
+            stats["deleted_days"] += 1
+        elif day < rollup_cutoff and not os.path.exists(segments.summary_path(day)):
+            stats["rolled_up_events"] += segments.roll_up_day(day)
+            stats["rolled_up_days"] += 1
+    return stats
@@ -0,0 +1,146 @@
+import atexit
+import collections
+import threading
+import time
+
+# Background writer for the A-mem logger. Callers enqueue events and return
+# immediately; a daemon thread drains the queue in batches so memory store
+# latency never lands on the hot path.
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL_SEC = 1.0
+DEFAULT_MAX_QUEUE = 10000
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+
+
+class BatchingEventSink:
+    """
+    Queues events and writes them to a MemoryStore from a background thread.
+
+    A batch is written once batch_size events are queued or flush_interval_sec
+    has passed since the last write, whichever comes first. When the queue is
+    full, overflow="block" makes producers wait for space (backpressure) and
+    overflow="drop_oldest" discards the oldest queued event instead.
+    Pending events are flushed at interpreter exit.
+    """
+
+    def __init__(self, store, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval_sec=DEFAULT_FLUSH_INTERVAL_SEC,
+                 max_queue=DEFAULT_MAX_QUEUE, overflow=OVERFLOW_DROP_OLDEST):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy '{overflow}'")
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.dropped = 0
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="a-mem-event-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, user_id, event_type, payload):
+        """Queue an event for the background writer."""
+        with self._cond:
+            if self._closed:
+                # Late events after shutdown are written synchronously
+                self._write([(user_id, event_type, payload)])
+                return
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == OVERFLOW_BLOCK:
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        # Closed while waiting: the writer may already have
+                        # drained its last batch, so write this one directly
+                        self._write([(user_id, event_type, payload)])
+                        return
+                else:
+                    self._queue.popleft()
+                    self.dropped += 1
+            self._queue.append((user_id, event_type, payload))
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every event queued so far has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        """Flush pending events and stop the writer thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self.dropped:
+            print(f"⚠️ a_mem_logger: dropped {self.dropped} events because the queue was full")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval_sec
+                while (not self._closed and not self._flush_requested
+                       and len(self._queue) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        if self._queue:
+                            break
+                        deadline = time.monotonic() + self.flush_interval_sec
+                        remaining = self.flush_interval_sec
+                    self._cond.wait(remaining)
+
+                if not self._queue:
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    if self._closed:
+                        return
+                    continue
+
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                # Wake producers blocked on a full queue
+                self._cond.notify_all()
+
+            self._write(batch)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _write(self, batch):
+        record_events = getattr(self.store, "record_events", None)
+        try:
+            if record_events is not None:
+                record_events([
+                    {"user_id": user_id, "event_type": event_type, "payload": payload}
+                    for user_id, event_type, payload in batch
+                ])
+                return
+        except Exception as e:
+            print(f"🔥 a_mem_logger Error: Failed to write event batch. {e}")
+            return
+
+        for user_id, event_type, payload in batch:
+            try:
+                self.store.record_event(user_id=user_id, event_type=event_type, payload=payload)
+            except Exception as e:
+                print(f"🔥 a_mem_logger Error: Failed to log event. {e}")
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+# Local, indexed copy of the A-mem event stream. Events are kept in SQLite
+# with an index on (namespace, event_type, user_id, ts) so that
+# scripts/query_memory.py can filter by type, user, time range and
+# invocation without loading and scanning every event.
+
+DEFAULT_EVENT_DB = os.path.join(".cache", "edm_events.sqlite3")
+DEFAULT_PAGE_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    user_id TEXT,
+    ts REAL NOT NULL,
+    invocation_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_lookup ON events (namespace, event_type, user_id, ts);
+CREATE INDEX IF NOT EXISTS events_time ON events (namespace, ts);
+CREATE INDEX IF NOT EXISTS events_invocation ON events (invocation_id) WHERE invocation_id IS NOT NULL;
+"""
+
+
+def _event_time(payload):
+    """Epoch seconds from the payload's timestamp_utc, falling back to now."""
+    stamp = payload.get("timestamp_utc") if isinstance(payload, dict) else None
+    if stamp:
+        try:
+            return datetime.fromisoformat(stamp).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+def encode_cursor(ts, event_id):
+    return f"{ts!r}:{event_id}"
+
+
+def decode_cursor(cursor):
+    ts, _, event_id = cursor.rpartition(":")
+    return float(ts), int(event_id)
+
+
+class LocalEventStore:
+    """
+    SQLite event store with the same record_event interface as MemoryStore.
+    """
+
+    def __init__(self, path=DEFAULT_EVENT_DB, namespace="edm_shuffle"):
+        self.path = path
+        self.namespace = namespace
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def record_event(self, user_id, event_type, payload):
+        self.record_events([{"user_id": user_id, "event_type": event_type, "payload": payload}])
+
+    def record_events(self, events):
+        """Insert a batch of events in one transaction."""
+        rows = [
+            (
+                self.namespace,
+                event["event_type"],
+                event.get("user_id"),
+                _event_time(event.get("payload")),
+                (event.get("payload") or {}).get("invocation_id"),
+                json.dumps(event.get("payload") or {}, default=str),
+            )
+            for event in events
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO events (namespace, event_type, user_id, ts, invocation_id, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def query(self, event_type=None, user_id=None, since=None, until=None,
+              invocation_id=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Newest-first page of events matching every given filter.
+
+        Args:
+            event_type: Exact event type (e.g. "function_call_error")
+            user_id: Exact user ID
+            since / until: Epoch-second bounds on the event time (inclusive / exclusive)
+            invocation_id: Events of one wrapped call or workflow run
+            limit: Page size
+            cursor: next_cursor from the previous page
+
+        Returns:
+            (events, next_cursor) where next_cursor is None on the last page
+        """
+        clauses = ["namespace = ?"]
+        params = [self.namespace]
+        if event_type:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if invocation_id:
+            clauses.append("invocation_id = ?")
+            params.append(invocation_id)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if cursor:
+            # Keyset pagination: resume strictly after the last row returned
+            cursor_ts, cursor_id = decode_cursor(cursor)
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            params.extend([cursor_ts, cursor_ts, cursor_id])
+
+        sql = (
+            "SELECT id, event_type, user_id, ts, invocation_id, payload FROM events "
+            f"WHERE {' AND '.join(clauses)} ORDER BY ts DESC, id DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit + 1]).fetchall()
+
+        events = [self._row_to_event(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else None
+        return events, next_cursor
+
+    def iter_range(self, since=None, until=None, batch_size=1000):
+        """Yield every event in [since, until) oldest first, reading in batches."""
+        clauses = ["namespace = ?"]
+        params = [self.namespace]
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        last = None
+        while True:
+            page_clauses, page_params = list(clauses), list(params)
+            if last:
+                page_clauses.append("(ts > ? OR (ts = ? AND id > ?))")
+                page_params.extend([last[0], last[0], last[1]])
+            sql = (
+                "SELECT id, event_type, user_id, ts, invocation_id, payload FROM events "
+                f"WHERE {' AND '.join(page_clauses)} ORDER BY ts, id LIMIT ?"
+            )
+            with self._lock:
+                rows = self._conn.execute(sql, page_params + [batch_size]).fetchall()
+            for row in rows:
+                yield self._row_to_event(row)
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][3], rows[-1][0])
+
+    def delete_before(self, until):
+        """Delete events older than until (epoch seconds); returns the row count."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM events WHERE namespace = ? AND ts < ?", (self.namespace, until)
+            )
+        return cursor.rowcount
+
+    def _row_to_event(self, row):
+        return {
+            "id": row[0],
+            "namespace": self.namespace,
+            "event_type": row[1],
+            "user_id": row[2],
+            "timestamp": datetime.fromtimestamp(row[3], timezone.utc).isoformat(),
+            "invocation_id": row[4],
+            "payload": json.loads(row[5]),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
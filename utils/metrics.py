@@ -0,0 +1,354 @@
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# In-process latency metrics fed by log_invocation. Every wrapped call is
+# recorded here (sampling only applies to events), so percentiles stay exact
+# to the histogram's relative accuracy even when events are sampled.
+#
+# Histograms use logarithmic buckets (DDSketch style): each bucket covers
+# values within RELATIVE_ACCURACY of each other, so quantiles have bounded
+# relative error, memory grows with the log of the value range, and two
+# histograms merge by adding bucket counts.
+
+RELATIVE_ACCURACY = 0.01
+DEFAULT_WINDOW_SEC = 60
+DEFAULT_MAX_WINDOWS = 60
+REPORT_QUANTILES = (0.5, 0.95, 0.99)
+# Durations below this are counted in the zero bucket
+MIN_TRACKED_SEC = 1e-6
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+class LatencyHistogram:
+    """Mergeable log-bucketed histogram of durations in seconds."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value < MIN_TRACKED_SEC:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / _LOG_GAMMA)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 <= q <= 1), or None when empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket in relative terms, clamped to the observed range
+                estimate = 2 * _GAMMA ** index / (_GAMMA + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data["buckets"].items()}
+        histogram.zero_count = data["zero_count"]
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class FunctionStats:
+    """Latency histogram and error count for one (event_type, function)."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.errors += other.errors
+        return self
+
+    def to_dict(self):
+        return {"latency": self.latency.to_dict(), "errors": self.errors}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.latency = LatencyHistogram.from_dict(data["latency"])
+        stats.errors = data["errors"]
+        return stats
+
+
+class MetricsRegistry:
+    """
+    Per-function latency and error metrics in fixed time windows.
+
+    Calls are added to the current window_sec window; the last max_windows
+    windows are kept for windowed reports and an all-time total is kept
+    for Prometheus export.
+    """
+
+    def __init__(self, window_sec=DEFAULT_WINDOW_SEC, max_windows=DEFAULT_MAX_WINDOWS):
+        self.window_sec = window_sec
+        self.max_windows = max_windows
+        self.started_at = time.time()
+        self._windows = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, event_type, function, duration_sec, error=False, now=None):
+        now = time.time() if now is None else now
+        window = int(now // self.window_sec)
+        key = (event_type, function)
+        with self._lock:
+            slot = self._windows.get(window)
+            if slot is None:
+                slot = self._windows[window] = {}
+                for old in sorted(self._windows)[:-self.max_windows]:
+                    del self._windows[old]
+            for stats in (slot.setdefault(key, FunctionStats()), self._totals.setdefault(key, FunctionStats())):
+                stats.latency.record(duration_sec)
+                if error:
+                    stats.errors += 1
+
+    def snapshot(self, window_sec=None, now=None):
+        """
+        Merged stats per (event_type, function).
+
+        Args:
+            window_sec: Only include the most recent windows covering this many
+                seconds; None for everything since the registry started
+
+        Returns:
+            (stats, covered_sec) where stats maps (event_type, function) to FunctionStats
+        """
+        now = time.time() if now is None else now
+        merged = {}
+        with self._lock:
+            if window_sec is None:
+                sources = [self._totals]
+                covered = now - self.started_at
+            else:
+                first = int(now // self.window_sec) - max(1, math.ceil(window_sec / self.window_sec)) + 1
+                sources = [slot for window, slot in self._windows.items() if window >= first]
+                covered = min(window_sec, now - self.started_at)
+            for source in sources:
+                for key, stats in source.items():
+                    merged.setdefault(key, FunctionStats()).merge(stats)
+        return merged, max(covered, 1e-9)
+
+    def prometheus_text(self):
+        stats, _ = self.snapshot()
+        return to_prometheus(stats)
+
+    def dump(self, path):
+        """
+        Write the all-time totals and the kept windows as JSON (atomically)
+        for scripts/metrics_report.py.
+        """
+        stats, covered = self.snapshot()
+        with self._lock:
+            windows = [
+                {"start": window * self.window_sec, "functions": _stats_entries(slot)}
+                for window, slot in sorted(self._windows.items())
+            ]
+        data = {
+            "started_at": self.started_at,
+            "covered_sec": covered,
+            "window_sec": self.window_sec,
+            "functions": _stats_entries(stats),
+            "windows": windows,
+        }
+        _atomic_write(path, json.dumps(data))
+
+
+def _stats_entries(stats):
+    return [
+        {"event_type": event_type, "function": function, **function_stats.to_dict()}
+        for (event_type, function), function_stats in stats.items()
+    ]
+
+
+def _merge_entries(merged, entries):
+    for entry in entries:
+        key = (entry["event_type"], entry["function"])
+        merged.setdefault(key, FunctionStats()).merge(FunctionStats.from_dict(entry))
+
+
+def load_snapshots(paths, since=None, until=None):
+    """
+    Merge snapshot files written by MetricsRegistry.dump (e.g. one per process).
+
+    Without since / until the all-time totals are merged. With them, only the
+    windows starting in [since, until) are merged, so windowed reports come
+    from the full histograms rather than from sampled events. Snapshots keep
+    the last max_windows windows of each process.
+    """
+    merged, covered = {}, 0.0
+    covered_windows = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if since is None and until is None:
+            covered = max(covered, data["covered_sec"])
+            _merge_entries(merged, data["functions"])
+            continue
+        for window in data.get("windows", []):
+            if since is not None and window["start"] < since:
+                continue
+            if until is not None and window["start"] >= until:
+                continue
+            covered_windows.add((window["start"], data["window_sec"]))
+            _merge_entries(merged, window["functions"])
+    if covered_windows:
+        covered = sum(window_sec for _, window_sec in covered_windows)
+    return merged, max(covered, 1e-9)
+
+
+def report_rows(stats, covered_sec):
+    """One row per function: calls, rate, error rate and latency percentiles."""
+    rows = []
+    for (event_type, function), function_stats in sorted(stats.items()):
+        latency = function_stats.latency
+        row = {
+            "event_type": event_type,
+            "function": function,
+            "calls": latency.count,
+            "calls_per_sec": latency.count / covered_sec,
+            "errors": function_stats.errors,
+            "error_rate": function_stats.errors / latency.count if latency.count else 0.0,
+            "mean_sec": latency.total / latency.count if latency.count else None,
+            "max_sec": latency.max,
+        }
+        for q in REPORT_QUANTILES:
+            row[f"p{round(q * 100)}_sec"] = latency.quantile(q)
+        rows.append(row)
+    return rows
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def to_prometheus(stats):
+    """Prometheus text exposition of the given stats."""
+    lines = [
+        "# HELP edm_function_duration_seconds Latency of functions wrapped by log_invocation.",
+        "# TYPE edm_function_duration_seconds summary",
+    ]
+    for (event_type, function), function_stats in sorted(stats.items()):
+        labels = f'event_type="{_label(event_type)}",function="{_label(function)}"'
+        latency = function_stats.latency
+        for q in REPORT_QUANTILES:
+            value = latency.quantile(q)
+            lines.append(f'edm_function_duration_seconds{{{labels},quantile="{q}"}} {value if value is not None else "NaN"}')
+        lines.append(f"edm_function_duration_seconds_sum{{{labels}}} {latency.total}")
+        lines.append(f"edm_function_duration_seconds_count{{{labels}}} {latency.count}")
+    lines.append("# HELP edm_function_errors_total Calls wrapped by log_invocation that raised.")
+    lines.append("# TYPE edm_function_errors_total counter")
+    for (event_type, function), function_stats in sorted(stats.items()):
+        labels = f'event_type="{_label(event_type)}",function="{_label(function)}"'
+        lines.append(f"edm_function_errors_total{{{labels}}} {function_stats.errors}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(registry, path):
+    """Write the registry in Prometheus text format, e.g. for node_exporter's textfile collector."""
+    _atomic_write(path, registry.prometheus_text())
+
+
+def serve_prometheus(render, port, host="127.0.0.1"):
+    """
+    Serve /metrics from a daemon thread; returns the HTTP server.
+
+    render is called on every scrape and returns the exposition text.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="edm-metrics-http", daemon=True).start()
+    return server
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Process-wide registry used by log_invocation.
+# EDM_METRICS_FILE: dump a JSON snapshot there at exit (for metrics_report.py);
+#   "{pid}" in the path is replaced so concurrent processes keep separate files
+# EDM_METRICS_PROM_FILE: write Prometheus text there at exit
+# EDM_METRICS_PORT: serve Prometheus text on http://127.0.0.1:<port>/metrics;
+#   only the first process to bind the port serves it, the others log a warning
+registry = MetricsRegistry()
+
+if os.getenv("EDM_METRICS_FILE"):
+    atexit.register(registry.dump, os.environ["EDM_METRICS_FILE"].replace("{pid}", str(os.getpid())))
+if os.getenv("EDM_METRICS_PROM_FILE"):
+    atexit.register(write_prometheus, registry, os.environ["EDM_METRICS_PROM_FILE"])
+if os.getenv("EDM_METRICS_PORT"):
+    try:
+        serve_prometheus(registry.prometheus_text, int(os.environ["EDM_METRICS_PORT"]))
+    except (OSError, ValueError) as e:
+        print(f"⚠️ metrics: not serving EDM_METRICS_PORT={os.environ['EDM_METRICS_PORT']}: {e}")
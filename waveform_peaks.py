@@ -0,0 +1,277 @@
+"""
+EDM Shuffle Waveform Peak Pyramids
+
+Precomputes the min/max peaks the mix station draws for each stem, so the
+browser can render waveforms without decoding audio:
+- the base level holds the min and max of every BASE_SAMPLES_PER_PIXEL
+  samples (all channels combined)
+- each further level halves the resolution by reducing adjacent pairs of the
+  level below, down to a few hundred pixels for the whole file
+- every level is written as its own file in the audiowaveform binary format
+  (version 1: 20-byte header, then interleaved int8 or int16 min/max pairs),
+  which peaks.js can load directly
+- an index (manifest.peaks.json) lists each stem's levels, so the front end
+  fetches only the zoom level it needs
+
+Downsampling is vectorized with NumPy reshapes and reductions, and stems are
+processed across CPU cores.
+
+Usage:
+    python waveform_peaks.py public/soundpacks --workers 8 --bits 8
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import struct
+
+import numpy as np
+
+from analysis_cache import DEFAULT_CACHE_PATH, AnalysisCache, hash_file
+from audio_analysis import AUDIO_EXTENSIONS, PEAKS_DIR_SUFFIX, find_audio_files, write_json_atomic
+from audio_io import AudioDecodeError, load_audio
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump whenever the peak files change so existing sidecars are regenerated
+PEAKS_VERSION = "1"
+BASE_SAMPLES_PER_PIXEL = 256
+# Stop adding coarser levels once a level is this narrow
+MIN_LEVEL_PIXELS = 512
+INDEX_NAME = "manifest.peaks.json"
+DAT_VERSION = 1
+DAT_FLAG_8_BIT = 0x1
+DAT_HEADER = struct.Struct("<iIiiI")
+
+# =============================================================================
+# PYRAMID
+# =============================================================================
+
+def base_peaks(audio: np.ndarray, samples_per_pixel: int = BASE_SAMPLES_PER_PIXEL) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-pixel minimum and maximum over all channels.
+
+    Args:
+        audio: Samples of shape (frames,) or (frames, channels)
+        samples_per_pixel: Samples summarized by each pixel
+
+    Returns:
+        (mins, maxs) arrays of ceil(frames / samples_per_pixel) values
+    """
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    pixels = -(-len(audio) // samples_per_pixel)
+    if pixels == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    full = len(audio) // samples_per_pixel
+    mins = np.empty(pixels, dtype=np.float32)
+    maxs = np.empty(pixels, dtype=np.float32)
+    blocks = audio[:full * samples_per_pixel].reshape(full, -1)
+    mins[:full] = blocks.min(axis=1)
+    maxs[:full] = blocks.max(axis=1)
+    if full < pixels:
+        rest = audio[full * samples_per_pixel:]
+        mins[full], maxs[full] = rest.min(), rest.max()
+    return mins, maxs
+
+def halve(mins: np.ndarray, maxs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Next pyramid level: reduce adjacent pixel pairs (an odd last pixel stands alone)."""
+    if len(mins) % 2:
+        mins = np.append(mins, mins[-1])
+        maxs = np.append(maxs, maxs[-1])
+    return mins.reshape(-1, 2).min(axis=1), maxs.reshape(-1, 2).max(axis=1)
+
+def peak_pyramid(audio: np.ndarray, base_samples_per_pixel: int = BASE_SAMPLES_PER_PIXEL,
+                 min_pixels: int = MIN_LEVEL_PIXELS) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    All pyramid levels, finest first.
+
+    Returns:
+        List of (samples_per_pixel, mins, maxs)
+    """
+    mins, maxs = base_peaks(audio, base_samples_per_pixel)
+    levels = [(base_samples_per_pixel, mins, maxs)]
+    while len(mins) > min_pixels:
+        mins, maxs = halve(mins, maxs)
+        levels.append((levels[-1][0] * 2, mins, maxs))
+    return levels
+
+def quantize(values: np.ndarray, bits: int) -> np.ndarray:
+    """Scale [-1, 1] floats to int8 or int16, clipping anything louder."""
+    if bits == 8:
+        return np.clip(np.round(values * 127.0), -128, 127).astype(np.int8)
+    if bits == 16:
+        return np.clip(np.round(values * 32767.0), -32768, 32767).astype("<i2")
+    raise ValueError(f"bits must be 8 or 16, not {bits}")
+
+def encode_dat(mins: np.ndarray, maxs: np.ndarray, sample_rate: int, samples_per_pixel: int, bits: int) -> bytes:
+    """One pyramid level in the audiowaveform version 1 binary format."""
+    pairs = np.empty(len(mins) * 2, dtype=np.int8 if bits == 8 else "<i2")
+    pairs[0::2] = quantize(mins, bits)
+    pairs[1::2] = quantize(maxs, bits)
+    flags = DAT_FLAG_8_BIT if bits == 8 else 0
+    return DAT_HEADER.pack(DAT_VERSION, flags, sample_rate, samples_per_pixel, len(mins)) + pairs.tobytes()
+
+def decode_dat(data: bytes) -> Dict[str, Any]:
+    """Parse a file written by encode_dat (for checks and tooling)."""
+    version, flags, sample_rate, samples_per_pixel, length = DAT_HEADER.unpack_from(data)
+    dtype = np.int8 if flags & DAT_FLAG_8_BIT else "<i2"
+    pairs = np.frombuffer(data, dtype=dtype, offset=DAT_HEADER.size, count=length * 2)
+    return {
+        "version": version,
+        "sample_rate": sample_rate,
+        "samples_per_pixel": samples_per_pixel,
+        "mins": pairs[0::2],
+        "maxs": pairs[1::2],
+    }
+
+# =============================================================================
+# FILES
+# =============================================================================
+
+def write_peaks(path: str, output_dir: str, bits: int = 8) -> Dict[str, Any]:
+    """
+    Decode an audio file and write its pyramid, one .dat file per level.
+
+    Args:
+        path: Audio file
+        output_dir: Directory for the level files (created if needed)
+        bits: Sample width of the peak values (8 or 16)
+
+    Returns:
+        Index entry: sample rate, duration and the levels with their file names
+    """
+    audio, sample_rate = load_audio(path)
+    os.makedirs(output_dir, exist_ok=True)
+    levels = []
+    for samples_per_pixel, mins, maxs in peak_pyramid(audio):
+        name = f"{samples_per_pixel}.dat"
+        data = encode_dat(mins, maxs, sample_rate, samples_per_pixel, bits)
+        tmp_path = os.path.join(output_dir, name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(output_dir, name))
+        levels.append({"samples_per_pixel": samples_per_pixel, "pixels": len(mins), "file": name, "bytes": len(data)})
+    return {
+        "sample_rate": sample_rate,
+        "duration": round(len(audio) / sample_rate, 3),
+        "bits": bits,
+        "levels": levels,
+    }
+
+def _peaks_task(args: Tuple[str, str, int]) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """Worker entry point: never raises, so one bad file does not stop the pool."""
+    path, output_dir, bits = args
+    try:
+        return path, write_peaks(path, output_dir, bits), None
+    except (AudioDecodeError, OSError, ValueError) as e:
+        return path, None, str(e)
+
+def write_peaks_parallel(jobs: Iterable[Tuple[str, str]], bits: int = 8,
+                         workers: Optional[int] = None) -> Iterable[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Write pyramids for (audio path, output dir) pairs across processes.
+
+    Yields:
+        (path, index entry, error) in input order
+    """
+    tasks = [(path, output_dir, bits) for path, output_dir in jobs]
+    if not tasks:
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            yield _peaks_task(task)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        yield from executor.map(_peaks_task, tasks)
+
+def load_index(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def build_peaks(root: str, bits: int = 8, workers: Optional[int] = None,
+                cache: Optional[AnalysisCache] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Write peak pyramids for every audio file under a directory and update the index.
+
+    Files whose content hash, bit depth and PEAKS_VERSION match the existing
+    index entry (and whose level files still exist) are skipped.
+
+    Args:
+        root: Soundpack or track directory; level files go to
+            <root>/<file>.peaks/ and the index to <root>/manifest.peaks.json
+        bits: Sample width of the peak values (8 or 16)
+        workers: Worker processes (defaults to the CPU count)
+        cache: Analysis cache used to avoid rehashing unchanged files
+        force: Regenerate everything
+
+    Returns:
+        The index contents
+    """
+    index_path = os.path.join(root, INDEX_NAME)
+    previous = load_index(index_path)
+    previous_files = previous.get("files", {}) if previous.get("peaks_version") == PEAKS_VERSION else {}
+    files = find_audio_files(root)
+
+    entries: Dict[str, Any] = {}
+    pending: List[str] = []
+    hashes: Dict[str, str] = {}
+    for relative in files:
+        path = os.path.join(root, relative)
+        hashes[relative] = cache.content_hash(path) if cache is not None else hash_file(path)
+        entry = previous_files.get(relative)
+        output_dir = path + PEAKS_DIR_SUFFIX
+        if (not force and entry and entry.get("content_hash") == hashes[relative] and entry.get("bits") == bits
+                and all(os.path.exists(os.path.join(output_dir, level["file"])) for level in entry["levels"])):
+            entries[relative] = entry
+        else:
+            pending.append(relative)
+
+    logger.info(f"📈 Writing peaks for {len(pending)} of {len(files)} file(s) in {root}")
+    errors: Dict[str, str] = {}
+    jobs = [(os.path.join(root, relative), os.path.join(root, relative) + PEAKS_DIR_SUFFIX) for relative in pending]
+    for relative, (_, entry, error) in zip(pending, write_peaks_parallel(jobs, bits, workers)):
+        if error:
+            logger.warning(f"⚠️ Could not write peaks for {relative}: {error}")
+            errors[relative] = error
+            continue
+        entries[relative] = {
+            **entry,
+            "content_hash": hashes[relative],
+            "directory": relative + PEAKS_DIR_SUFFIX,
+        }
+
+    index = {
+        "peaks_version": PEAKS_VERSION,
+        "format": "audiowaveform-dat-v1",
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "files": {relative: entries[relative] for relative in files if relative in entries},
+        "errors": errors,
+    }
+    write_json_atomic(index_path, index)
+    logger.info(f"✅ Peaks index covers {len(index['files'])} file(s) ({len(errors)} error(s))")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Write multi-resolution waveform peaks for audio files")
+    parser.add_argument("root", nargs="?", default=os.path.join("public", "soundpacks"),
+                        help=f"Directory of audio files ({', '.join(AUDIO_EXTENSIONS)})")
+    parser.add_argument("--bits", type=int, choices=[8, 16], default=8, help="Peak sample width")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--cache", default=os.getenv("AUDIO_ANALYSIS_CACHE", DEFAULT_CACHE_PATH),
+                        help="Analysis cache database used for content hashes (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Regenerate peaks for every file")
+    args = parser.parse_args()
+    with AnalysisCache(args.cache) as cache:
+        build_peaks(args.root, args.bits, args.workers, cache, args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+EDM Shuffle Workflow DAG Executor
+
+Runs crew workflow steps as a dependency graph instead of a fixed sequence.
+Each step declares the steps it depends on; a step is submitted to the worker
+pool as soon as all of its dependencies have finished, so independent steps
+run concurrently and end-to-end latency follows the critical path rather than
+the sum of every step.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+
+@dataclass
+class DagStep:
+    """
+    A workflow step.
+
+    Attributes:
+        name: Unique step name
+        run: Callable receiving a dict of dependency name -> result
+        depends_on: Names of steps whose results this step needs
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    depends_on: List[str] = field(default_factory=list)
+
+@dataclass
+class DagResult:
+    """
+    Outcome of a DAG run.
+
+    Attributes:
+        results: Step name -> return value for steps that succeeded
+        errors: Step name -> error message for steps that raised
+        skipped: Steps not run because a dependency failed
+    """
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.skipped
+
+def validate_dag(steps: List[DagStep]) -> None:
+    """
+    Check that step names are unique, dependencies exist and there are no cycles.
+
+    Raises:
+        ValueError: If the graph is invalid
+    """
+    names = [step.name for step in steps]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate step names in workflow: {names}")
+
+    by_name = {step.name: step for step in steps}
+    for step in steps:
+        missing = [dep for dep in step.depends_on if dep not in by_name]
+        if missing:
+            raise ValueError(f"Step '{step.name}' depends on unknown steps: {missing}")
+
+    visiting, done = set(), set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle detected at step '{name}'")
+        visiting.add(name)
+        for dep in by_name[name].depends_on:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in names:
+        visit(name)
+
+def run_dag(steps: List[DagStep], max_workers: int = DEFAULT_MAX_WORKERS) -> DagResult:
+    """
+    Execute steps on a worker pool, honouring declared dependencies.
+
+    A step that raises is recorded in DagResult.errors; steps depending on it
+    (directly or transitively) are skipped, while unrelated branches keep
+    running.
+
+    Args:
+        steps: Workflow steps
+        max_workers: Maximum number of steps running at once
+
+    Returns:
+        DagResult with per-step results, errors and skipped steps
+
+    Raises:
+        ValueError: If the graph is invalid
+    """
+    validate_dag(steps)
+    result = DagResult()
+    pending = {step.name: step for step in steps}
+    running: Dict[Future, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name, step in list(pending.items()):
+                if any(dep in result.errors or dep in result.skipped for dep in step.depends_on):
+                    logger.warning(f"⚠️ Skipping step '{name}': a dependency failed")
+                    result.skipped.append(name)
+                    del pending[name]
+                elif all(dep in result.results for dep in step.depends_on):
+                    inputs = {dep: result.results[dep] for dep in step.depends_on}
+                    logger.info(f"Starting workflow step '{name}'")
+                    running[executor.submit(step.run, inputs)] = name
+                    del pending[name]
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    result.results[name] = future.result()
+                    logger.info(f"✅ Workflow step '{name}' completed")
+                except Exception as e:
+                    logger.error(f"❌ Workflow step '{name}' failed: {str(e)}")
+                    result.errors[name] = str(e)
+
+    return result